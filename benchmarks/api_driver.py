@@ -0,0 +1,78 @@
+"""Dispara as rotas quentes da API em processo, via transporte ASGI do httpx.
+
+Usado por ``benchmarks.suite``; requer um banco gerado por ``benchmarks.datagen``.
+"""
+import asyncio
+import random
+import time
+
+import httpx
+
+from src.telegram_food_boot.api.auth import create_access_token
+from src.telegram_food_boot.api.main import app, startup_event, shutdown_event
+
+from .datagen import username
+from .stats import summarize
+
+PREFIX = '/api/v1'
+
+
+def _request(route, user_id, rng):
+    """Método, caminho e corpo de uma requisição do cenário."""
+    if route == 'meals':
+        return 'POST', '/meals', {'meal_type': rng.choice(('breakfast', 'lunch', 'dinner', 'snack')),
+                                  'food_id': rng.randrange(1, 598), 'quantity': rng.choice((50, 100, 150))}
+    if route == 'meals_batch':
+        meal_type = rng.choice(('breakfast', 'lunch', 'dinner', 'snack'))
+        return 'POST', '/meals/batch', [{'meal_type': meal_type, 'food_id': rng.randrange(1, 598),
+                                         'quantity': rng.choice((50, 100, 150))} for _ in range(rng.randrange(2, 6))]
+    if route == 'water':
+        return 'POST', '/water', {'amount': rng.choice((200, 250, 500))}
+    if route == 'summary':
+        return 'GET', f'/summary/{user_id}', None
+    if route == 'stats':
+        return 'GET', f"/stats/{user_id}?bucket={rng.choice(('day', 'week', 'month'))}", None
+    if route == 'export':
+        return 'GET', f"/export/{user_id}?format={rng.choice(('ndjson', 'csv'))}", None
+    if route == 'calculations':
+        return 'POST', '/calculations', {'calc_type': 'tdee', 'weight': rng.randrange(50, 110), 'height': 175,
+                                         'age': 30, 'gender': 'male', 'activity_level': 'moderate'}
+    if route == 'goals':
+        return 'POST', '/goals', {'nutrient': 'energy_kcal', 'value': rng.choice((1800, 2000, 2200))}
+    raise ValueError(f"Unknown route {route}")
+
+
+ROUTES = ('meals', 'meals_batch', 'water', 'summary', 'stats', 'export', 'calculations', 'goals')
+
+
+async def run(users, requests, concurrency, routes=ROUTES, seed=7):
+    """Executa ``requests`` chamadas por rota com ``concurrency`` clientes; retorna estatísticas por rota."""
+    await startup_event()
+    tokens = {user_id: create_access_token(username(user_id)) for user_id in range(1, users + 1)}
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench' + PREFIX) as client:
+            for route in routes:
+                rng = random.Random(seed)
+                samples, errors = [], 0
+
+                async def worker(count):
+                    nonlocal errors
+                    for _ in range(count):
+                        user_id = rng.randrange(1, users + 1)
+                        method, path, body = _request(route, user_id, rng)
+                        t0 = time.perf_counter()
+                        response = await client.request(method, path, json=body,
+                                                        headers={'Authorization': f'Bearer {tokens[user_id]}'})
+                        samples.append((time.perf_counter() - t0) * 1000)
+                        if response.status_code != 200:
+                            errors += 1
+
+                shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+                t0 = time.perf_counter()
+                await asyncio.gather(*(worker(count) for count in shares))
+                results[f"api.{route}"] = summarize(samples, time.perf_counter() - t0, errors)
+    finally:
+        await shutdown_event()
+    return results
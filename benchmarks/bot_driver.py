@@ -0,0 +1,110 @@
+"""Chama os handlers do bot com Update/Context falsos, sem rede.
+
+Usado por ``benchmarks.suite``; requer um banco gerado por ``benchmarks.datagen``.
+As operações usam o DirectBackend e as respostas passam pela fila de envio
+(com limites de taxa desativados), até um bot falso que só registra o texto.
+"""
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from src.telegram_food_boot import bot
+from src.telegram_food_boot.backends import DirectBackend
+from src.telegram_food_boot.send_queue import SendQueue
+from src.telegram_food_boot.shards import get_router
+from src.telegram_food_boot.writer import close_writer
+
+from .stats import summarize
+
+UNLIMITED = 1e9
+FAILURE_MARKERS = ('Erro', 'Você precisa estar logado', 'Use:')
+
+
+class FakeBot:
+    """Substitui telegram.Bot: guarda a última mensagem de cada chat."""
+
+    def __init__(self):
+        self.last_text = {}
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.last_text[chat_id] = text
+        return SimpleNamespace(chat_id=chat_id, text=text)
+
+    async def send_document(self, chat_id, document, filename, **kwargs):
+        # Lê o arquivo como o upload faria
+        self.last_text[chat_id] = f"{filename}: {len(document.read())} bytes"
+        return SimpleNamespace(chat_id=chat_id, document=filename)
+
+
+def _scenario(name, rng):
+    """Handler, argumentos do comando e texto da mensagem de um cenário."""
+    if name == 'water':
+        return bot.water_handler, [str(rng.choice((200, 250, 500)))], None
+    if name == 'summary':
+        return bot.summary_handler, [], None
+    if name == 'meal':
+        return bot.meal_quantity_handler, [], str(rng.choice((50, 100, 150)))
+    if name == 'quick_meal':
+        return bot.quick_meal_handler, [], rng.choice((
+            'almoço: arroz integral 150g, feijão 100g, frango 120g',
+            'café da manhã: pão francês 50g, leite integral 200ml, banana 80g',
+            'jantar: batata 200g e carne 150g'))
+    if name == 'export':
+        return bot.export_handler, [rng.choice(('ndjson', 'csv'))], None
+    if name == 'calculations':
+        return bot.calc_handler, ['tdee', str(rng.randrange(50, 110)), '175', '30', 'male', 'moderate'], None
+    if name == 'goals':
+        return bot.goal_handler, ['energy_kcal', str(rng.choice((1800, 2000, 2200)))], None
+    if name == 'foods':
+        return bot.foods_handler, [str(rng.randrange(1, 20))], None
+    if name == 'search':
+        return bot.search_handler, [rng.choice(('arroz', 'feijao', 'frango', 'banana', 'leite integ'))], None
+    raise ValueError(f"Unknown scenario {name}")
+
+
+SCENARIOS = ('water', 'summary', 'meal', 'quick_meal', 'export', 'calculations', 'goals', 'foods', 'search')
+
+
+async def run(users, requests, concurrency, scenarios=SCENARIOS, seed=11):
+    """Executa ``requests`` chamadas por handler com ``concurrency`` usuários simultâneos."""
+    await get_router().open()
+    fake_bot = FakeBot()
+    send_queue = SendQueue(global_rate=UNLIMITED, chat_rate=UNLIMITED, chat_burst=UNLIMITED)
+    application = SimpleNamespace(bot_data={'backend': DirectBackend(), 'send_queue': send_queue})
+    user_data = {user_id: {} for user_id in range(1, users + 1)}
+    results = {}
+    try:
+        for name in scenarios:
+            rng = random.Random(seed)
+            samples, errors = [], 0
+
+            async def worker(count):
+                nonlocal errors
+                for _ in range(count):
+                    user_id = rng.randrange(1, users + 1)
+                    handler, args, text = _scenario(name, rng)
+                    data = user_data[user_id]
+                    if name == 'meal':
+                        data['meals'] = {'meal_type': 'lunch', 'food_id': rng.randrange(1, 598)}
+                    update = SimpleNamespace(
+                        effective_user=SimpleNamespace(id=user_id, first_name=f'user{user_id}'),
+                        effective_chat=SimpleNamespace(id=user_id),
+                        message=SimpleNamespace(text=text),
+                        callback_query=None)
+                    context = SimpleNamespace(args=args, user_data=data, bot=fake_bot,
+                                              application=application, bot_data=application.bot_data)
+                    t0 = time.perf_counter()
+                    await handler(update, context)
+                    samples.append((time.perf_counter() - t0) * 1000)
+                    if fake_bot.last_text.get(user_id, '').startswith(FAILURE_MARKERS):
+                        errors += 1
+
+            shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+            t0 = time.perf_counter()
+            await asyncio.gather(*(worker(count) for count in shares))
+            results[f"bot.{name}"] = summarize(samples, time.perf_counter() - t0, errors)
+    finally:
+        await send_queue.stop()
+        await close_writer()
+    return results
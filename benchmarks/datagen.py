@@ -0,0 +1,98 @@
+"""Gera dados sintéticos: N usuários × M dias de refeições, água e metas.
+
+Uso (na raiz do projeto):
+
+    python -m benchmarks.datagen --users 1000 --days 30
+
+Grava no banco configurado (DB_PATH, padrão nutribot.db, e os shards de
+DB_SHARDS). Os usuários se chamam user1..userN com a senha "senha123" e o
+user_id do Telegram igual ao do banco, já autenticados para o bot. Os dias
+terminam hoje, para que os resumos do dia tenham dados.
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+import aiosqlite
+
+from src.telegram_food_boot.aggregates import rebuild_daily_totals
+from src.telegram_food_boot.database import init_db
+from src.telegram_food_boot.shards import get_router, close_router
+
+PASSWORD = 'senha123'
+MEAL_TYPES = ('breakfast', 'lunch', 'dinner', 'snack')
+GOALS = (('energy_kcal', 2000), ('protein_g', 80), ('carbohydrate_g', 250), ('fiber_g', 25))
+FOOD_IDS = 597
+
+
+def username(user_id):
+    return f"user{user_id}"
+
+
+def _user_rows(user_id, days, meals_per_day, rng, today):
+    meals, water = [], []
+    for offset in range(days):
+        day = today - timedelta(days=days - 1 - offset)
+        for _ in range(meals_per_day):
+            moment = day + timedelta(minutes=rng.randrange(6 * 60, 23 * 60))
+            meals.append((user_id, rng.choice(MEAL_TYPES), rng.randrange(1, FOOD_IDS + 1),
+                          rng.choice((50, 100, 150, 200)), moment.strftime('%Y-%m-%d %H:%M:%S')))
+        for _ in range(rng.randrange(2, 5)):
+            moment = day + timedelta(minutes=rng.randrange(6 * 60, 23 * 60))
+            water.append((user_id, rng.choice((200, 250, 500)), moment.strftime('%Y-%m-%d %H:%M:%S')))
+    goals = [(user_id, nutrient, value) for nutrient, value in GOALS]
+    return meals, water, goals
+
+
+async def generate(users, days, meals_per_day=4, seed=42):
+    """Popula o banco global e os shards; retorna o número de refeições geradas."""
+    from src.telegram_food_boot.api.dependencies import get_password_hash
+
+    await init_db()
+    router = get_router()
+    rng = random.Random(seed)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    password_hash = get_password_hash(PASSWORD)  # bcrypt é lento: um hash para todos
+
+    with sqlite3.connect(router.global_pool.path) as db:
+        db.executemany('INSERT OR REPLACE INTO users (user_id, username, password_hash) VALUES (?, ?, ?)',
+                       ((i, username(i), password_hash) for i in range(1, users + 1)))
+        db.executemany('INSERT OR REPLACE INTO user_tokens (user_id, access_token) VALUES (?, ?)',
+                       ((i, f"bench-token-{i}") for i in range(1, users + 1)))
+
+    by_shard = {}
+    for user_id in range(1, users + 1):
+        pool = router.pool_for(user_id)
+        meals, water, goals = by_shard.setdefault(pool.path, ([], [], []))
+        user_meals, user_water, user_goals = _user_rows(user_id, days, meals_per_day, rng, today)
+        meals += user_meals
+        water += user_water
+        goals += user_goals
+    for path, (meals, water, goals) in by_shard.items():
+        with sqlite3.connect(path) as db:
+            db.executemany('INSERT INTO meals (user_id, meal_type, food_id, quantity, timestamp) VALUES (?, ?, ?, ?, ?)', meals)
+            db.executemany('INSERT INTO water (user_id, amount, date) VALUES (?, ?, ?)', water)
+            db.executemany('INSERT OR REPLACE INTO goals (user_id, nutrient, value) VALUES (?, ?, ?)', goals)
+        async with aiosqlite.connect(path) as db:
+            await db.execute('BEGIN')
+            await rebuild_daily_totals(db)
+            await db.commit()
+    await close_router()
+    return sum(len(meals) for meals, _, _ in by_shard.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--meals-per-day', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    meals = asyncio.run(generate(args.users, args.days, args.meals_per_day, args.seed))
+    print(f"Generated {args.users} users, {args.days} days, {meals} meals")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Estatísticas, relatório e comparação com a linha de base dos benchmarks."""
+import json
+import math
+
+
+def percentile(ordered, fraction):
+    """Percentil (método do posto mais próximo) de uma lista já ordenada."""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize(samples, elapsed, errors=0):
+    """Resume latências (ms) e a duração total (s) de um cenário."""
+    ordered = sorted(samples)
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'throughput': round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(ordered, 0.50), 3),
+        'p95_ms': round(percentile(ordered, 0.95), 3),
+        'p99_ms': round(percentile(ordered, 0.99), 3),
+    }
+
+
+def print_table(results, baseline=None):
+    header = f"{'scenario':<18} {'req/s':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'errors':>6}"
+    if baseline:
+        header += f" {'Δp95':>8} {'Δreq/s':>8}"
+    print(header)
+    for name, stats in results.items():
+        line = (f"{name:<18} {stats['throughput']:>9.1f} {stats['p50_ms']:>9.3f} "
+                f"{stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f} {stats['errors']:>6}")
+        base = (baseline or {}).get(name)
+        if base:
+            line += f" {_delta(stats['p95_ms'], base['p95_ms']):>8} {_delta(stats['throughput'], base['throughput']):>8}"
+        print(line)
+
+
+def _delta(current, base):
+    if not base:
+        return 'n/a'
+    return f"{(current - base) / base * 100:+.0f}%"
+
+
+def find_regressions(results, baseline, tolerance, min_delta_ms=1.0):
+    """Cenários com p95 acima ou vazão abaixo da linha de base além da tolerância (fração).
+
+    Diferenças de p95 menores que ``min_delta_ms`` são ruído e não contam.
+    """
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if stats['errors'] > base.get('errors', 0):
+            regressions.append(f"{name}: {stats['errors']} errors (baseline {base.get('errors', 0)})")
+        if (stats['p95_ms'] > base['p95_ms'] * (1 + tolerance)
+                and stats['p95_ms'] - base['p95_ms'] >= min_delta_ms):
+            regressions.append(f"{name}: p95 {stats['p95_ms']:.3f} ms vs {base['p95_ms']:.3f} ms")
+        if base['throughput'] and stats['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append(f"{name}: {stats['throughput']:.1f} req/s vs {base['throughput']:.1f} req/s")
+    return regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save(path, report):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+        f.write('\n')
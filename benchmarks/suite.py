@@ -0,0 +1,113 @@
+"""Suíte de benchmarks das rotas da API e dos handlers do bot.
+
+Uso (na raiz do projeto):
+
+    python -m benchmarks.suite --users 500 --days 30 --requests 2000 --concurrency 50 \\
+        --output bench.json --baseline benchmarks/baseline.json
+
+Gera um banco sintético em um diretório temporário, mede cada rota e cada
+handler (vazão e latência p50/p95/p99), grava o relatório em JSON e, com
+--baseline, compara com uma execução anterior: termina com código 1 se
+algum cenário piorar além de --tolerance. Use --save-baseline para
+atualizar a linha de base (os números dependem da máquina).
+"""
+import argparse
+import asyncio
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime
+
+from . import stats
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configure(tmp, shards):
+    """Aponta a aplicação para arquivos temporários; precisa rodar antes de importar o pacote."""
+    os.environ['DB_PATH'] = os.path.join(tmp, 'nutribot.db')
+    os.environ['DB_SHARDS'] = str(shards)
+    os.environ['DB_SHARD_PATH'] = os.path.join(tmp, 'nutribot.shard{n}.db')
+    os.environ.setdefault('FOOD_TABLE_PATH', os.path.join(ROOT, 'tabela_alimentos.json'))
+    os.environ['FOOD_SNAPSHOT_PATH'] = os.path.join(tmp, 'tabela_alimentos.snapshot')
+    os.environ['FOOD_STORE_PATH'] = os.path.join(tmp, 'tabela_alimentos.cols')
+    os.environ.setdefault('SECRET_KEY', 'benchmark-secret')
+    os.environ.setdefault('ALGORITHM', 'HS256')
+
+
+async def run(args):
+    from . import api_driver, bot_driver, datagen
+    from src.telegram_food_boot.shards import close_router
+
+    meals = await datagen.generate(args.users, args.days)
+    print(f"Generated {args.users} users x {args.days} days ({meals} meals)")
+    results = {}
+    if args.only in (None, 'api'):
+        results.update(await api_driver.run(args.users, args.requests, args.concurrency))
+        await close_router()
+    if args.only in (None, 'bot'):
+        results.update(await bot_driver.run(args.users, args.requests, args.concurrency))
+        await close_router()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--requests', type=int, default=2000, help='chamadas por cenário')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--shards', type=int, default=0)
+    parser.add_argument('--only', choices=('api', 'bot'))
+    parser.add_argument('--output', help='arquivo JSON do relatório')
+    parser.add_argument('--baseline', help='relatório JSON usado como linha de base')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='piora máxima aceita em p95 e vazão (fração, padrão 0.25)')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='ignora pioras de p95 menores que isto (ms, padrão 1.0)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='grava o relatório em --baseline em vez de comparar')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(tmp, args.shards)
+        results = asyncio.run(run(args))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'users': args.users,
+            'days': args.days,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'shards': args.shards,
+        },
+        'results': results,
+    }
+    if args.output:
+        stats.save(args.output, report)
+
+    baseline = None
+    if args.baseline and not args.save_baseline and os.path.exists(args.baseline):
+        baseline = stats.load(args.baseline)['results']
+    stats.print_table(results, baseline)
+
+    if args.baseline and args.save_baseline:
+        stats.save(args.baseline, report)
+        print(f"Baseline saved to {args.baseline}")
+    elif baseline is not None:
+        regressions = stats.find_regressions(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Mede a latência de get_daily_summary conforme a tabela meals cresce.
+
+Uso (na raiz do projeto):
+
+    python -m benchmarks.summary_scaling --sizes 10000,100000,1000000,10000000
+
+Para cada tamanho, gera um banco temporário com N refeições distribuídas entre
+usuários e dias, aplica as migrações e mede o resumo diário de um usuário.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import aiosqlite
+
+from src.telegram_food_boot.database import get_daily_summary
+from src.telegram_food_boot.migrations import run_migrations
+
+USERS = 1000
+MEALS_PER_DAY = 5
+
+
+def populate(path, rows):
+    """Gera N refeições sintéticas (sem índices, como um banco legado)."""
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    days = max(rows // (USERS * MEALS_PER_DAY), 1)
+    with sqlite3.connect(path) as db:
+        db.execute('''CREATE TABLE meals
+                      (user_id INTEGER, meal_type TEXT, food_id INTEGER, quantity REAL, timestamp TEXT)''')
+
+        def generate():
+            for i in range(rows):
+                day = start + timedelta(days=i % days,
+                                        minutes=rng.randrange(24 * 60))
+                yield (rng.randrange(1, USERS + 1), 'lunch', rng.randrange(1, 598),
+                       rng.choice((50, 100, 150, 200)), day.strftime('%Y-%m-%d %H:%M:%S'))
+        db.executemany('INSERT INTO meals VALUES (?, ?, ?, ?, ?)', generate())
+    return (start + timedelta(days=days // 2)).strftime('%Y-%m-%d')
+
+
+async def measure(path, date, repeat):
+    async with aiosqlite.connect(path) as db:
+        await run_migrations(db)
+        await get_daily_summary(1, date, db)  # aquece cache de páginas e catálogo
+        samples = []
+        for i in range(repeat):
+            t0 = time.perf_counter()
+            await get_daily_summary(1 + i % USERS, date, db)
+            samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    print(f"{'rows':>10} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            date = populate(path, size)
+            p50, p95 = asyncio.run(measure(path, date, args.repeat))
+            print(f"{size:>10} {p50:>10.3f} {p95:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
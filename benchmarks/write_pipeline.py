@@ -0,0 +1,94 @@
+"""Compara commits por linha com o escritor em lote (group commit), com e sem shards.
+
+Uso (na raiz do projeto):
+
+    python -m benchmarks.write_pipeline --clients 200 --writes 25 --shards 1,2,4
+
+Cada cliente registra refeições em sequência, como usuários concorrentes
+registrando o almoço ao meio-dia. Mede vazão e latência por escrita; com
+N shards, cada shard tem seu próprio escritor em lote.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from functools import partial
+
+import aiosqlite
+
+from src.telegram_food_boot.database import save_meal
+from src.telegram_food_boot.migrations import run_migrations
+from src.telegram_food_boot.pool import ConnectionPool
+from src.telegram_food_boot.shards import ShardRouter
+from src.telegram_food_boot.writer import GroupCommitWriter
+
+
+async def per_row(pool, user_id):
+    async with pool.writer() as db:
+        await save_meal(user_id, 'lunch', 1, 100, db)
+
+
+async def grouped(writer, user_id):
+    await writer.submit(partial(save_meal, user_id, 'lunch', 1, 100, commit=False))
+
+
+async def sharded(router, writers, user_id):
+    await writers[router.pool_for(user_id)].submit(partial(save_meal, user_id, 'lunch', 1, 100, commit=False))
+
+
+async def run(path, mode, clients, writes, shards=1):
+    if shards > 1:
+        router = ShardRouter(path, [f"{path}.shard{n}" for n in range(shards)])
+        paths = [pool.path for pool in router.shard_pools]
+    else:
+        paths = [path]
+    for db_path in paths:
+        async with aiosqlite.connect(db_path) as db:
+            await run_migrations(db)
+    if shards > 1:
+        writers = {pool: GroupCommitWriter(pool) for pool in router.shard_pools}
+        write = partial(sharded, router, writers)
+    else:
+        pool = ConnectionPool(path, size=1)
+        writer = GroupCommitWriter(pool)
+        writers = {pool: writer}
+        write = partial(per_row, pool) if mode == 'per-row' else partial(grouped, writer)
+    latencies = []
+
+    async def client(user_id):
+        for _ in range(writes):
+            t0 = time.perf_counter()
+            await write(user_id)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    elapsed = time.perf_counter() - t0
+    for pool, writer in writers.items():
+        await writer.stop()
+        await pool.close()
+    latencies.sort()
+    return (len(latencies) / elapsed, statistics.median(latencies),
+            latencies[int(len(latencies) * 0.99) - 1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--writes', type=int, default=25)
+    parser.add_argument('--shards', default='1',
+                        help='números de shards a testar no modo em lote, separados por vírgula')
+    args = parser.parse_args()
+    runs = [('per-row', 1)] + [('grouped', int(n)) for n in args.shards.split(',')]
+    print(f"{'mode':>8} {'shards':>6} {'writes/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for mode, shards in runs:
+        with tempfile.TemporaryDirectory() as tmp:
+            rate, p50, p99 = asyncio.run(
+                run(os.path.join(tmp, 'bench.db'), mode, args.clients, args.writes, shards))
+            print(f"{mode:>8} {shards:>6} {rate:>10.0f} {p50:>10.2f} {p99:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import sys
+import numpy as np
+import aiosqlite
+from .nutrients import get_matrix
+
+logger = logging.getLogger(__name__)
+
+# Os nutrientes de daily_totals ficam em um BLOB de float64 na ordem de
+# catalog.nutrient_fields; quando a tabela de alimentos muda, init_db recalcula
+# os totais junto com a tabela foods.
+CREATE_DAILY_TOTALS = '''CREATE TABLE IF NOT EXISTS daily_totals
+    (user_id INTEGER NOT NULL, day TEXT NOT NULL, meal_count INTEGER NOT NULL DEFAULT 0,
+     water REAL NOT NULL DEFAULT 0, nutrients BLOB, PRIMARY KEY (user_id, day))'''
+
+ADD_MEAL_SQL = '''INSERT INTO daily_totals (user_id, day, meal_count, water, nutrients) VALUES (?, ?, ?, 0, ?)
+    ON CONFLICT (user_id, day) DO UPDATE SET meal_count = meal_count + excluded.meal_count,
+    nutrients = vec_add(nutrients, excluded.nutrients)'''
+
+ADD_WATER_SQL = '''INSERT INTO daily_totals (user_id, day, meal_count, water, nutrients) VALUES (?, ?, 0, ?, NULL)
+    ON CONFLICT (user_id, day) DO UPDATE SET water = water + excluded.water'''
+
+REBUILD_CHUNK = 10000
+
+
+def vec_add(a, b):
+    """Função SQL: soma dois vetores float64 serializados (NULL conta como zero)."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if len(a) != len(b):
+        raise ValueError(f"Nutrient vectors of different sizes ({len(a)} and {len(b)} bytes): rebuild daily_totals")
+    return (np.frombuffer(a) + np.frombuffer(b)).tobytes()
+
+
+def pack(vector):
+    return np.asarray(vector, dtype=np.float64).tobytes()
+
+
+def unpack(blob):
+    """Converte o BLOB de nutrientes em {nutriente: total}."""
+    matrix = get_matrix()
+    if blob is None:
+        return dict.fromkeys(matrix.fields, 0.0)
+    if len(blob) != 8 * len(matrix.fields):
+        raise ValueError(f"daily_totals has {len(blob) // 8} nutrients, the food table has {len(matrix.fields)}: "
+                         f"rebuild daily_totals")
+    return matrix.as_dict(np.frombuffer(blob))
+
+
+async def add_meal(db, user_id, day, food_id, quantity):
+    """Soma uma refeição ao total do dia (na transação corrente, sem commit)."""
+    await add_meals(db, user_id, day, [food_id], [quantity])
+
+
+async def add_meals(db, user_id, day, food_ids, quantities):
+    """Soma várias refeições do mesmo dia ao total com um único UPSERT (sem commit)."""
+    vector = get_matrix().totals(food_ids, quantities)
+    await db.execute(ADD_MEAL_SQL, (user_id, day, len(food_ids), pack(vector)))
+
+
+async def add_water(db, user_id, day, amount):
+    """Soma água ao total do dia (na transação corrente, sem commit)."""
+    await db.execute(ADD_WATER_SQL, (user_id, day, amount))
+
+
+async def get_daily_totals(db, user_id, day):
+    """Retorna (meal_count, water, {nutriente: total}) do dia, ou None se não houver registros."""
+    async with db.execute('SELECT meal_count, water, nutrients FROM daily_totals WHERE user_id = ? AND day = ?',
+                          (user_id, day)) as cursor:
+        row = await cursor.fetchone()
+    if row is None:
+        return None
+    return row[0], row[1], unpack(row[2])
+
+
+async def rebuild_daily_totals(db):
+    """Recalcula daily_totals a partir das tabelas meals e water (sem commit)."""
+    matrix = get_matrix()
+    await db.execute('DELETE FROM daily_totals')
+    async with db.execute('''SELECT user_id, substr(timestamp, 1, 10) AS day, food_id, SUM(quantity), COUNT(*)
+                             FROM meals GROUP BY user_id, day, food_id ORDER BY user_id, day''') as cursor:
+        key, food_ids, quantities, count = None, [], [], 0
+        rows = []
+        while True:
+            chunk = await cursor.fetchmany(REBUILD_CHUNK)
+            for user_id, day, food_id, quantity, meals in chunk:
+                if (user_id, day) != key:
+                    if key is not None:
+                        rows.append((*key, count, pack(matrix.totals(food_ids, quantities))))
+                    key, food_ids, quantities, count = (user_id, day), [], [], 0
+                food_ids.append(food_id)
+                quantities.append(quantity)
+                count += meals
+            if rows:
+                await db.executemany('INSERT INTO daily_totals (user_id, day, meal_count, water, nutrients) VALUES (?, ?, ?, 0, ?)', rows)
+                rows = []
+            if not chunk:
+                break
+        if key is not None:
+            await db.execute('INSERT INTO daily_totals (user_id, day, meal_count, water, nutrients) VALUES (?, ?, ?, 0, ?)',
+                             (*key, count, pack(matrix.totals(food_ids, quantities))))
+    await db.execute('''INSERT INTO daily_totals (user_id, day, meal_count, water, nutrients)
+                        SELECT user_id, substr(date, 1, 10) AS day, 0, SUM(amount), NULL FROM water WHERE true
+                        GROUP BY user_id, day
+                        ON CONFLICT (user_id, day) DO UPDATE SET water = excluded.water''')
+
+
+async def _rebuild(path):
+    async with aiosqlite.connect(path) as db:
+        await db.execute('BEGIN')
+        await rebuild_daily_totals(db)
+        await db.commit()
+        async with db.execute('SELECT COUNT(*) FROM daily_totals') as cursor:
+            logger.info(f"Rebuilt daily_totals: {(await cursor.fetchone())[0]} rows")
+
+
+if __name__ == '__main__':
+    # Uso: python -m src.telegram_food_boot.aggregates rebuild
+    from .shards import ShardRouter
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:] != ['rebuild']:
+        sys.exit("Uso: python -m src.telegram_food_boot.aggregates rebuild")
+    for pool in ShardRouter().shard_pools:
+        asyncio.run(_rebuild(pool.path))
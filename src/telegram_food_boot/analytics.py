@@ -0,0 +1,108 @@
+import logging
+from datetime import datetime, timedelta
+from .food_store import get_food_store
+from .utils import SUMMARY_NUTRIENTS
+
+logger = logging.getLogger(__name__)
+
+# A tabela foods (um registro por alimento, uma coluna REAL por nutriente, valores
+# por grama) é recriada por sync_foods a partir do arquivo colunar, já que as colunas
+# dependem da tabela de alimentos; a versão carregada fica em food_table_version.
+CREATE_FOOD_TABLE_VERSION = '''CREATE TABLE IF NOT EXISTS food_table_version
+    (id INTEGER PRIMARY KEY CHECK (id = 1), version TEXT NOT NULL)'''
+
+# Início do período de cada dia 'YYYY-MM-DD' (semanas começam na segunda-feira)
+BUCKETS = {
+    'day': 'day',
+    'week': "date(day, 'weekday 0', '-6 days')",
+    'month': "substr(day, 1, 7) || '-01'",
+}
+
+MAX_RANGE_DAYS = 366
+
+# Totais por dia (refeições pelo índice (user_id, timestamp) juntando foods, água
+# pelo índice (user_id, date)), reagrupados por período. Os campos {sums},
+# {totals} e {met} recebem uma expressão por nutriente pedido.
+STATS_SQL = '''WITH meal_days AS (
+        SELECT substr(m.timestamp, 1, 10) AS day, COUNT(*) AS meals{sums}
+        FROM meals m LEFT JOIN foods f ON f.food_id = m.food_id
+        WHERE m.user_id = ? AND m.timestamp >= ? AND m.timestamp < ? GROUP BY day),
+    water_days AS (
+        SELECT substr(date, 1, 10) AS day, TOTAL(amount) AS water FROM water
+        WHERE user_id = ? AND date >= ? AND date < ? GROUP BY day),
+    days AS (SELECT day FROM meal_days UNION SELECT day FROM water_days)
+    SELECT {bucket} AS bucket, COUNT(d.day), TOTAL(d.meals), COUNT(w.day), TOTAL(w.water){totals}{met}
+    FROM days LEFT JOIN meal_days d USING (day) LEFT JOIN water_days w USING (day)
+    GROUP BY bucket ORDER BY bucket'''
+
+GOALS_SQL = 'SELECT nutrient, value FROM goals WHERE user_id = ?'
+
+
+def _column(field):
+    """Nome de coluna SQL para um nutriente (há nomes como '18:2 n-6_g')."""
+    return '"' + field.replace('"', '""') + '"'
+
+
+async def sync_foods(db):
+    """Recria a tabela foods se a versão carregada for diferente da tabela de alimentos atual.
+
+    Retorna True se a tabela foi recarregada (sem commit).
+    """
+    store = get_food_store()
+    async with db.execute('SELECT version FROM food_table_version WHERE id = 1') as cursor:
+        row = await cursor.fetchone()
+    if row is not None and row[0] == store.version:
+        return False
+    await db.execute('DROP TABLE IF EXISTS foods')
+    columns = ', '.join(f'{_column(field)} REAL NOT NULL' for field in store.fields)
+    await db.execute(f'CREATE TABLE foods (food_id INTEGER PRIMARY KEY, {columns})')
+    await db.executemany(f"INSERT INTO foods VALUES (?{', ?' * len(store.fields)})",
+                         zip(store.ids.tolist(), *store.values.tolist()))
+    await db.execute('INSERT OR REPLACE INTO food_table_version (id, version) VALUES (1, ?)', (store.version,))
+    logger.info(f"Loaded food table {store.version} into foods")
+    return True
+
+
+async def get_stats(user_id, start_date, end_date, bucket, db):
+    """Agrega nutrientes, água e adesão às metas por dia, semana ou mês entre duas datas (inclusive).
+
+    Tudo é agrupado no SQLite em uma única consulta; só as linhas já
+    agregadas por período chegam ao Python. A adesão compara a média por dia
+    com refeições à meta e conta os dias em que a meta foi atingida.
+    """
+    end = (datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    async with db.execute(GOALS_SQL, (user_id,)) as cursor:
+        goals = dict(await cursor.fetchall())
+    fields = set(get_food_store().fields)
+    nutrients = [*SUMMARY_NUTRIENTS, *(nutrient for nutrient in goals if nutrient not in SUMMARY_NUTRIENTS)]
+    nutrients = [nutrient for nutrient in nutrients if nutrient in fields]
+    tracked = [nutrient for nutrient in goals if nutrient in fields]
+    sql = STATS_SQL.format(
+        bucket=BUCKETS[bucket],
+        sums=''.join(f', TOTAL(m.quantity * f.{_column(nutrient)}) AS n{i}' for i, nutrient in enumerate(nutrients)),
+        totals=''.join(f', TOTAL(d.n{i})' for i in range(len(nutrients))),
+        met=''.join(f', TOTAL(d.n{nutrients.index(nutrient)} >= ?)' for nutrient in tracked))
+    params = (user_id, start_date, end, user_id, start_date, end, *(goals[nutrient] for nutrient in tracked))
+    async with db.execute(sql, params) as cursor:
+        rows = await cursor.fetchall()
+
+    buckets = []
+    for start, days_logged, meals, water_days, water, *values in rows:
+        totals = dict(zip(nutrients, values))
+        met = dict(zip(tracked, values[len(nutrients):]))
+        adherence = {}
+        for nutrient, goal in goals.items():
+            average = totals.get(nutrient, 0.0) / days_logged if days_logged else 0.0
+            adherence[nutrient] = {'goal': goal, 'total': totals.get(nutrient, 0.0), 'daily_average': average,
+                                   'percentage': average / goal * 100 if goal > 0 else 0.0,
+                                   'days_met': int(met.get(nutrient, 0))}
+        buckets.append({
+            'start': start,
+            'days_logged': days_logged,
+            'meals': int(meals),
+            'nutrients': {nutrient: totals.get(nutrient, 0.0) for nutrient in SUMMARY_NUTRIENTS},
+            'water': {'total': water, 'days': water_days,
+                      'daily_average': water / water_days if water_days else 0.0},
+            'goals': adherence,
+        })
+    return {'from': start_date, 'to': end_date, 'bucket': bucket, 'goals': goals, 'buckets': buckets}
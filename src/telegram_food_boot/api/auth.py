@@ -2,23 +2,48 @@ from jose import JWTError, jwt
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
+from typing import Optional
 from ..config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 import aiosqlite
+from ..identity import get_identity_cache
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def decode_token(token: str):
+    cache = get_identity_cache().token_claims
+    payload = cache.get(token)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        cache.set(token, payload, expires_at=payload.get("exp"))
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.InvalidTokenError:
+    except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
 async def get_user_id_from_username(username: str, db: aiosqlite.Connection):
+    cache = get_identity_cache().user_ids
+    user_id = cache.get(username)
+    if user_id is not None:
+        return user_id
     query = await db.execute("SELECT user_id FROM users WHERE username = ?", (username,))
     user = await query.fetchone()
-    return user[0] if user else None
+    if not user:
+        return None
+    cache.set(username, user[0])
+    return user[0]
+
+
+def create_access_token(data: str, expires_delta: Optional[timedelta] = None):
+    to_encode = {"sub": data}
+    if expires_delta:
+        expire = datetime.utcnow() + expires_delta
+    else:
+        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire})
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
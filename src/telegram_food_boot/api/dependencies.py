@@ -1,24 +1,31 @@
-import aiosqlite
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from aiosqlite import Connection
-from .auth import decode_token, get_user_id_from_username  # Updated import
+from .auth import decode_token, get_user_id_from_username, pwd_context
+from ..identity import get_identity_cache
+from ..shards import get_router
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login")
 
 
 async def get_db():
-    db = await aiosqlite.connect("nutribot.db")
-    try:
+    async with get_router().global_pool.writer() as db:
         yield db
-    finally:
-        await db.close()
 
 
-def get_user_id(token: str = Depends(oauth2_scheme), db: Connection = Depends(get_db)):
+async def get_read_db():
+    async with get_router().global_pool.reader() as db:
+        yield db
+
+
+async def get_user_id(token: str = Depends(oauth2_scheme)):
     payload = decode_token(token)
     username = payload.get("sub")
-    user_id = get_user_id_from_username(username, db)
+    # A conexão é devolvida antes da rota rodar: mantê-la durante a requisição
+    # esgota o pool global quando a rota também lê dele (banco sem shards).
+    user_id = get_identity_cache().user_ids.get(username)
+    if user_id is None:
+        async with get_router().global_pool.reader() as db:
+            user_id = await get_user_id_from_username(username, db)
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token or user")
     return user_id
@@ -1,6 +1,10 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Response
 from .routes import router
+from .. import metrics
 from ..database import init_db
+from ..shards import close_router
+from ..writer import close_writer
 
 app = FastAPI(
     title="NutriBot API",
@@ -8,6 +12,42 @@ app = FastAPI(
 )
 app.include_router(router, prefix="/api/v1")
 
+
+class MetricsMiddleware:
+    """Middleware ASGI que registra a duração de cada requisição HTTP pelo template da rota."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # O roteador grava a rota casada no scope; o template mantém a cardinalidade baixa
+            route = scope.get("route")
+            metrics.HTTP_REQUEST_DURATION.labels(
+                scope["method"], route.path if route else "<unmatched>", str(status),
+            ).observe(time.perf_counter() - start)
+
+
+app.add_middleware(MetricsMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # Inicializar banco de dados ao iniciar
 
 
@@ -17,3 +57,9 @@ async def startup_event():
 
     # Incluir rotas
     app.include_router(router)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_writer()
+    await close_router()
@@ -3,25 +3,25 @@ from typing import Optional
 
 
 class MealCreate(BaseModel):
-    user_id: int
+    user_id: Optional[int] = None
     meal_type: str
     food_id: int
     quantity: float
 
 
 class GoalCreate(BaseModel):
-    user_id: int
+    user_id: Optional[int] = None
     nutrient: str
     value: float
 
 
 class WaterCreate(BaseModel):
-    user_id: int
+    user_id: Optional[int] = None
     amount: float
 
 
 class CalculationCreate(BaseModel):
-    user_id: int
+    user_id: Optional[int] = None
     calc_type: str
     weight: float
     height: Optional[float] = None
@@ -31,7 +31,7 @@ class CalculationCreate(BaseModel):
 
 
 class ReminderCreate(BaseModel):
-    user_id: int
+    user_id: Optional[int] = None
     type: str
     time: str
 
@@ -49,6 +49,17 @@ class TipResponse(BaseModel):
     tip: str
 
 
+class FoodResult(BaseModel):
+    id: int
+    description: str
+    category: str
+    energy_kcal: float
+    protein_g: float
+    lipid_g: float
+    carbohydrate_g: float
+    fiber_g: float
+
+
 class UserCreate(BaseModel):
     username: str
     password: str
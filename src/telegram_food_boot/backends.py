@@ -0,0 +1,144 @@
+import aiosqlite
+import httpx
+from . import services
+from .config import SUMMARY_CACHE_SIZE
+from .identity import TTLCache
+from .services import ServiceError
+
+
+class BackendError(Exception):
+    """Falha ao executar uma operação do bot no backend (API ou serviço local)."""
+
+
+class RemoteBackend:
+    """Executa as operações do bot chamando a API HTTP."""
+
+    def __init__(self, api_client):
+        self.api_client = api_client
+        # Último resumo (etag, resumo) por usuário, revalidado com If-None-Match
+        self._summaries = TTLCache(SUMMARY_CACHE_SIZE)
+
+    async def _call(self, method, path, token=None, **kwargs):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        try:
+            response = await self.api_client.request(method, path, headers=headers, **kwargs)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            raise BackendError(str(e)) from e
+
+    async def record_meal(self, user_id, token, meal_type, food_id, quantity):
+        data = await self._call("POST", "/meals", token, json={
+            "meal_type": meal_type, "food_id": food_id, "quantity": quantity})
+        return data["message"]
+
+    async def record_meals(self, user_id, token, items):
+        data = await self._call("POST", "/meals/batch", token, json=[
+            {"meal_type": meal_type, "food_id": food_id, "quantity": quantity}
+            for meal_type, food_id, quantity in items])
+        return data["message"]
+
+    async def record_water(self, user_id, token, amount):
+        data = await self._call("POST", "/water", token, json={"amount": amount})
+        return data["message"]
+
+    async def set_goal(self, user_id, token, nutrient, value):
+        data = await self._call("POST", "/goals", token, json={"nutrient": nutrient, "value": value})
+        return data["message"]
+
+    async def perform_calculation(self, user_id, token, **calc):
+        data = await self._call("POST", "/calculations", token, json=calc)
+        return data["message"]
+
+    async def set_reminder(self, user_id, token, reminder_type, time):
+        data = await self._call("POST", "/reminders", token, json={"type": reminder_type, "time": time})
+        return data["message"]
+
+    async def get_summary(self, user_id, token):
+        headers = {"Authorization": f"Bearer {token}"}
+        cached = self._summaries.get(user_id)
+        if cached is not None:
+            headers["If-None-Match"] = cached[0]
+        try:
+            response = await self.api_client.get(f"/summary/{user_id}", headers=headers)
+            if response.status_code == 304 and cached is not None:
+                return cached[1]
+            response.raise_for_status()
+            summary = response.json()
+        except httpx.HTTPError as e:
+            raise BackendError(str(e)) from e
+        etag = response.headers.get("ETag")
+        if etag:
+            self._summaries.set(user_id, (etag, summary))
+        return summary
+
+    async def export_history(self, user_id, token, fmt, out):
+        """Grava a exportação em ``out`` (arquivo binário) à medida que chega da API."""
+        try:
+            async with self.api_client.stream("GET", f"/export/{user_id}", params={"format": fmt},
+                                              headers={"Authorization": f"Bearer {token}"}) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    out.write(chunk)
+        except httpx.HTTPError as e:
+            raise BackendError(str(e)) from e
+
+    async def get_tip(self):
+        data = await self._call("GET", "/tips")
+        return data["tip"]
+
+
+class DirectBackend:
+    """Executa as operações do bot no próprio processo, sem passar pela API HTTP."""
+
+    async def _call(self, operation, *args, **kwargs):
+        try:
+            return await operation(*args, **kwargs)
+        except ServiceError as e:
+            raise BackendError(e.message) from e
+        except aiosqlite.Error as e:
+            raise BackendError(str(e)) from e
+
+    async def record_meal(self, user_id, token, meal_type, food_id, quantity):
+        return await self._call(services.record_meal, user_id, meal_type, food_id, quantity)
+
+    async def record_meals(self, user_id, token, items):
+        return await self._call(services.record_meals, user_id, items)
+
+    async def record_water(self, user_id, token, amount):
+        return await self._call(services.record_water, user_id, amount)
+
+    async def set_goal(self, user_id, token, nutrient, value):
+        return await self._call(services.set_goal, user_id, nutrient, value)
+
+    async def perform_calculation(self, user_id, token, **calc):
+        return await self._call(services.perform_calculation, user_id, **calc)
+
+    async def set_reminder(self, user_id, token, reminder_type, time):
+        return await self._call(services.set_reminder, user_id, reminder_type, time)
+
+    async def get_summary(self, user_id, token):
+        return await self._call(services.get_summary, user_id)
+
+    async def export_history(self, user_id, token, fmt, out):
+        """Grava a exportação em ``out`` (arquivo binário) bloco a bloco."""
+        async def write():
+            chunks = await services.export_history(user_id, fmt)
+            try:
+                async for chunk in chunks:
+                    out.write(chunk.encode())
+            finally:
+                await chunks.aclose()
+        await self._call(write)
+
+    async def get_tip(self):
+        return services.get_tip()
+
+
+def create_backend(mode, api_client):
+    """Cria o backend do bot: "direct" (serviço local) ou "remote" (API HTTP)."""
+    if mode == "direct":
+        return DirectBackend()
+    if mode == "remote":
+        return RemoteBackend(api_client)
+    raise ValueError(f"BOT_BACKEND inválido: {mode!r} (use 'direct' ou 'remote')")
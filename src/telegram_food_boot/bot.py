@@ -1,30 +1,87 @@
+import asyncio
 import logging
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import tempfile
+import time
+import uuid
+from functools import partial, wraps
+from telegram import (
+    Update,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+)
 from telegram.ext import (
     Application,
     CommandHandler,
     CallbackQueryHandler,
     ConversationHandler,
+    InlineQueryHandler,
     ContextTypes,
     MessageHandler,
     filters,
 )
-from src.telegram_food_boot.database import get_db_connection
+from src.telegram_food_boot.database import get_db_connection, get_read_connection, init_db
+from src.telegram_food_boot.shards import get_router, close_router
+from src.telegram_food_boot.writer import close_writer
 import httpx
-from src.telegram_food_boot.utils import load_food_data, translations
-from src.telegram_food_boot.config import BOT_TOKEN, WEBHOOK_URL, WEBHOOK_PORT, API_BASE_URL
+from src.telegram_food_boot.utils import translations
+from src.telegram_food_boot.catalog import get_catalog
+from src.telegram_food_boot.search import search_foods
+from src.telegram_food_boot.picker import get_picker, is_picker_data
+from src.telegram_food_boot.food_pages import get_food_pages
+from src.telegram_food_boot.meal_parser import MEAL_LABELS, parse_meal_message
+from src.telegram_food_boot.export import FORMATS, export_filename
+from src.telegram_food_boot.config import BOT_TOKEN, WEBHOOK_URL, WEBHOOK_PORT, BOT_BACKEND
+from src.telegram_food_boot.backends import BackendError, create_backend
+from src.telegram_food_boot.http_client import ApiClient
+from src.telegram_food_boot.identity import get_identity_cache
+from src.telegram_food_boot.reminders import ReminderScheduler
+from src.telegram_food_boot.send_queue import SendQueue, INTERACTIVE, NOTIFICATION, LANES
+from src.telegram_food_boot.webhook import serve
+from src.telegram_food_boot import metrics
 
 # Conversation states
 SIGNUP_USERNAME, SIGNUP_PASSWORD = range(2)
 LOGIN_USERNAME, LOGIN_PASSWORD = range(2, 4)
 MEAL_TYPE, MEAL_FOOD, MEAL_QUANTITY = range(4, 7)
 
+# Respostas ao teclado de confirmação das refeições em texto livre
+QUICK_MEAL_CONFIRM, QUICK_MEAL_CANCEL = "qm_ok", "qm_no"
+
 logger = logging.getLogger(__name__)
 
+# Limite do Telegram para documentos enviados por bots
+MAX_DOCUMENT_BYTES = 50 * 1024 * 1024
+
+
+def get_api_client(context: ContextTypes.DEFAULT_TYPE) -> ApiClient:
+    return context.application.bot_data["api_client"]
+
+
+def get_backend(context: ContextTypes.DEFAULT_TYPE):
+    return context.application.bot_data["backend"]
+
+
+def get_send_queue(context: ContextTypes.DEFAULT_TYPE) -> SendQueue:
+    return context.application.bot_data["send_queue"]
+
+
+async def reply(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, **kwargs):
+    """Responde no chat da atualização pela fila de envio, com prioridade interativa."""
+    chat_id = update.effective_chat.id
+    return await get_send_queue(context).submit(
+        chat_id, partial(context.bot.send_message, chat_id=chat_id, text=text, **kwargs), INTERACTIVE)
+
 
 async def check_user_authenticated(user_id: int, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    cache = get_identity_cache().telegram_tokens
+    token = cache.get(user_id)
+    if token:
+        context.user_data["access_token"] = token
+        return True
     try:
-        async with get_db_connection() as db:
+        async with get_read_connection() as db:
             logger.info(f"Checking authentication for user_id: {user_id}")
             cursor = await db.execute(
                 "SELECT user_id, username FROM users WHERE user_id = ?", (
@@ -39,6 +96,7 @@ async def check_user_authenticated(user_id: int, context: ContextTypes.DEFAULT_T
                 token = await cursor.fetchone()
                 if token and token[0]:
                     context.user_data["access_token"] = token[0]
+                    cache.set(user_id, token[0])
                     return True
             return False
     except Exception as e:
@@ -61,7 +119,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         welcome_text = (
             "Bem-vindo ao NutriBot, {}! 😊\n"
             "Use os comandos no menu para rastrear refeições, água, metas e mais.\n"
-            "Ex.: /meals, /goals, /water, /summary, /calculations, /reminders, /tips, /foods"
+            "Ex.: /meals, /goals, /water, /summary, /export, /calculations, /reminders, /tips, /foods\n"
+            "Para registrar vários alimentos de uma vez, envie: almoço: arroz 150g, feijão 100g"
         ).format(update.effective_user.first_name)
     else:
         welcome_text = (
@@ -70,7 +129,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             "Você também pode usar sem login para ver dicas ou a tabela de alimentos com /foods."
         )
 
-    await update.message.reply_text(welcome_text, reply_markup=reply_markup)
+    await reply(update, context, welcome_text, reply_markup=reply_markup)
 
 
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -79,30 +138,30 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await query.answer()
 
         if query.data == "signup":
-            await query.message.reply_text("Por favor, envie seu nome de usuário.")
+            await reply(update, context, "Por favor, envie seu nome de usuário.")
             return SIGNUP_USERNAME
         elif query.data == "login":
-            await query.message.reply_text("Por favor, envie seu nome de usuário.")
+            await reply(update, context, "Por favor, envie seu nome de usuário.")
             return LOGIN_USERNAME
         elif query.data == "anonymous":
-            await query.message.reply_text("Modo anônimo ativado. Use /tips ou /foods.")
+            await reply(update, context, "Modo anônimo ativado. Use /tips ou /foods.")
             return ConversationHandler.END
     return ConversationHandler.END
 
 
 async def signup_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    await update.message.reply_text("Por favor, envie seu nome de usuário.")
+    await reply(update, context, "Por favor, envie seu nome de usuário.")
     return SIGNUP_USERNAME
 
 
 async def login_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    await update.message.reply_text("Por favor, envie seu nome de usuário.")
+    await reply(update, context, "Por favor, envie seu nome de usuário.")
     return LOGIN_USERNAME
 
 
 async def signup_username(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     context.user_data["signup_username"] = update.message.text
-    await update.message.reply_text("Agora, envie sua senha.")
+    await reply(update, context, "Agora, envie sua senha.")
     return SIGNUP_PASSWORD
 
 
@@ -111,44 +170,45 @@ async def signup_password(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     username = context.user_data.get("signup_username")
     user_id = update.effective_user.id
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{API_BASE_URL}/users",
-                data={"username": username, "password": password},
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            response.raise_for_status()
-            data = response.json()
-            access_token = data.get("access_token")
-            if access_token:
-                context.user_data["access_token"] = access_token
-                async with get_db_connection() as db:
-                    await db.execute(
-                        "INSERT OR REPLACE INTO users (user_id, username) VALUES (?, ?)",
-                        (user_id, username)
-                    )
-                    await db.execute(
-                        "INSERT OR REPLACE INTO user_tokens (user_id, access_token) VALUES (?, ?)",
-                        (user_id, access_token)
-                    )
-                    await db.commit()
-                await update.message.reply_text("Cadastro realizado com sucesso! Use /start para continuar.")
-            else:
-                await update.message.reply_text("Erro ao cadastrar. Tente novamente.")
-        except httpx.HTTPError as e:
-            logger.error(f"API error during signup: {e}")
-            await update.message.reply_text("Erro ao conectar com a API. Tente novamente.")
-        except Exception as e:
-            logger.error(f"Unexpected error during signup: {e}")
-            await update.message.reply_text("Erro inesperado. Tente novamente.")
+    client = get_api_client(context)
+    try:
+        response = await client.post(
+            "/users",
+            data={"username": username, "password": password},
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
+        response.raise_for_status()
+        data = response.json()
+        access_token = data.get("access_token")
+        if access_token:
+            context.user_data["access_token"] = access_token
+            async with get_db_connection() as db:
+                await db.execute(
+                    "INSERT OR REPLACE INTO users (user_id, username) VALUES (?, ?)",
+                    (user_id, username)
+                )
+                await db.execute(
+                    "INSERT OR REPLACE INTO user_tokens (user_id, access_token) VALUES (?, ?)",
+                    (user_id, access_token)
+                )
+                await db.commit()
+            get_identity_cache().invalidate_user(username=username, telegram_id=user_id)
+            await reply(update, context, "Cadastro realizado com sucesso! Use /start para continuar.")
+        else:
+            await reply(update, context, "Erro ao cadastrar. Tente novamente.")
+    except httpx.HTTPError as e:
+        logger.error(f"API error during signup: {e}")
+        await reply(update, context, "Erro ao conectar com a API. Tente novamente.")
+    except Exception as e:
+        logger.error(f"Unexpected error during signup: {e}")
+        await reply(update, context, "Erro inesperado. Tente novamente.")
 
     return ConversationHandler.END
 
 
 async def login_username(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     context.user_data["login_username"] = update.message.text
-    await update.message.reply_text("Agora, envie sua senha.")
+    await reply(update, context, "Agora, envie sua senha.")
     return LOGIN_PASSWORD
 
 
@@ -157,45 +217,46 @@ async def login_password(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     username = context.user_data.get("login_username")
     user_id = update.effective_user.id
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{API_BASE_URL}/login",
-                data={"username": username, "password": password},
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            response.raise_for_status()
-            data = response.json()
-            access_token = data.get("access_token")
-            if access_token:
-                logger.info(
-                    f"Received access_token: {access_token} for user_id: {user_id}")
-                context.user_data["access_token"] = access_token
-                async with get_db_connection() as db:
-                    await db.execute(
-                        "INSERT OR REPLACE INTO users (user_id, username) VALUES (?, ?)",
-                        (user_id, username)
-                    )
-                    await db.execute(
-                        "INSERT OR REPLACE INTO user_tokens (user_id, access_token) VALUES (?, ?)",
-                        (user_id, access_token)
-                    )
-                    await db.commit()
-                await update.message.reply_text("Login realizado com sucesso! Use /start para continuar.")
-            else:
-                await update.message.reply_text("Usuário ou senha incorretos. Tente novamente.")
-        except httpx.HTTPError as e:
-            logger.error(f"API error during login: {e}")
-            await update.message.reply_text("Erro ao conectar com a API. Tente novamente.")
-        except Exception as e:
-            logger.error(f"Unexpected error during login: {e}")
-            await update.message.reply_text("Erro inesperado. Tente novamente.")
+    client = get_api_client(context)
+    try:
+        response = await client.post(
+            "/login",
+            data={"username": username, "password": password},
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
+        response.raise_for_status()
+        data = response.json()
+        access_token = data.get("access_token")
+        if access_token:
+            logger.info(
+                f"Received access_token: {access_token} for user_id: {user_id}")
+            context.user_data["access_token"] = access_token
+            async with get_db_connection() as db:
+                await db.execute(
+                    "INSERT OR REPLACE INTO users (user_id, username) VALUES (?, ?)",
+                    (user_id, username)
+                )
+                await db.execute(
+                    "INSERT OR REPLACE INTO user_tokens (user_id, access_token) VALUES (?, ?)",
+                    (user_id, access_token)
+                )
+                await db.commit()
+            get_identity_cache().invalidate_user(username=username, telegram_id=user_id)
+            await reply(update, context, "Login realizado com sucesso! Use /start para continuar.")
+        else:
+            await reply(update, context, "Usuário ou senha incorretos. Tente novamente.")
+    except httpx.HTTPError as e:
+        logger.error(f"API error during login: {e}")
+        await reply(update, context, "Erro ao conectar com a API. Tente novamente.")
+    except Exception as e:
+        logger.error(f"Unexpected error during login: {e}")
+        await reply(update, context, "Erro inesperado. Tente novamente.")
 
     return ConversationHandler.END
 
 
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    await update.message.reply_text("Operação cancelada.")
+    await reply(update, context, "Operação cancelada.")
     return ConversationHandler.END
 
 
@@ -203,7 +264,7 @@ async def meal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     logger.info(
         f"Received command: /meals for user {update.effective_user.id}")
     if not await check_user_authenticated(update.effective_user.id, context):
-        await update.message.reply_text("Você precisa estar logado para usar este comando. Use /login ou /signup.")
+        await reply(update, context, "Você precisa estar logado para usar este comando. Use /login ou /signup.")
         return ConversationHandler.END
     context.user_data["meals"] = {}
     keyboard = [
@@ -213,7 +274,7 @@ async def meal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
         [InlineKeyboardButton("Lanche", callback_data="snack")]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text("Selecione o tipo de refeição:", reply_markup=reply_markup)
+    await reply(update, context, "Selecione o tipo de refeição:", reply_markup=reply_markup)
     return MEAL_TYPE
 
 
@@ -222,31 +283,40 @@ async def meal_type_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if query:
         await query.answer()
         context.user_data["meals"]["meal_type"] = query.data
-        food_data = load_food_data()
-        keyboard = [[InlineKeyboardButton(
-            food["description"], callback_data=f"food_{food['id']}")] for food in food_data[:5]]
-        keyboard.append([InlineKeyboardButton(
-            "Mais opções", callback_data="more_foods")])
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.message.reply_text("Selecione um alimento:", reply_markup=reply_markup)
+        await reply(update, context, "Selecione uma categoria ou digite o nome para buscar:",
+                    reply_markup=get_picker().root)
         return MEAL_FOOD
     return MEAL_TYPE
 
 
+async def meal_search_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    results = search_foods(update.message.text)
+    if not results:
+        await reply(update, context, translations['pt']['no_foods_found'])
+        return MEAL_FOOD
+    keyboard = [[InlineKeyboardButton(
+        food["description"], callback_data=f"food_{food['id']}")] for food in results]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    await reply(update, context, translations['pt']['select_food'], reply_markup=reply_markup)
+    return MEAL_FOOD
+
+
 async def meal_food_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     if query:
         await query.answer()
-        if query.data == "more_foods":
-            food_data = load_food_data()
-            keyboard = [[InlineKeyboardButton(
-                food["description"], callback_data=f"food_{food['id']}")] for food in food_data[5:10]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.message.reply_text("Mais opções de alimentos:", reply_markup=reply_markup)
+        if is_picker_data(query.data):
+            # Navegação: só troca o teclado (já montado) da mesma mensagem
+            reply_markup = get_picker().keyboard(query.data)
+            if reply_markup is not None and reply_markup != query.message.reply_markup:
+                await get_send_queue(context).submit(
+                    update.effective_chat.id, partial(query.edit_message_reply_markup, reply_markup=reply_markup))
+            return MEAL_FOOD
+        if not query.data.startswith("food_"):
             return MEAL_FOOD
         context.user_data["meals"]["food_id"] = int(
             query.data.replace("food_", ""))
-        await query.message.reply_text("Digite a quantidade (em gramas):")
+        await reply(update, context, "Digite a quantidade (em gramas):")
         return MEAL_QUANTITY
     return MEAL_FOOD
 
@@ -254,81 +324,169 @@ async def meal_food_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def meal_quantity_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     quantity = update.message.text
     if not quantity.isdigit():
-        await update.message.reply_text("Por favor, insira um número válido para a quantidade.")
+        await reply(update, context, "Por favor, insira um número válido para a quantidade.")
         return MEAL_QUANTITY
-    context.user_data["meals"]["quantity"] = int(quantity)
-    token = context.user_data.get("access_token")
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{API_BASE_URL}/meals",
-                json=context.user_data["meals"],
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
-            await update.message.reply_text("Refeição registrada com sucesso!")
-        except httpx.HTTPError as e:
-            logger.error(f"API error during meal: {e}")
-            await update.message.reply_text("Erro ao registrar refeição. Tente novamente.")
+    meal = context.user_data["meals"]
+    meal["quantity"] = int(quantity)
+    try:
+        await get_backend(context).record_meal(
+            update.effective_user.id, context.user_data.get("access_token"),
+            meal["meal_type"], meal["food_id"], meal["quantity"])
+        await reply(update, context, "Refeição registrada com sucesso!")
+    except BackendError as e:
+        logger.error(f"Backend error during meal: {e}")
+        await reply(update, context, "Erro ao registrar refeição. Tente novamente.")
     return ConversationHandler.END
 
 
+async def quick_meal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Interpreta uma mensagem livre com vários alimentos e pede confirmação antes de registrar.
+
+    Ex.: "almoço: arroz integral 150g, feijão 100g, frango 120g". Mensagens
+    que não parecem um registro de refeição são ignoradas.
+    """
+    parsed = parse_meal_message(update.message.text)
+    if parsed is None:
+        return
+    if not await check_user_authenticated(update.effective_user.id, context):
+        await reply(update, context, "Você precisa estar logado para usar este comando. Use /login ou /signup.")
+        return
+    lines = []
+    if parsed.items:
+        lines += [f"🍽️ {MEAL_LABELS[parsed.meal_type].capitalize()}:"]
+        lines += [f"• {food['description']} — {grams:g}g" for food, grams in parsed.items]
+    if parsed.needs_unit:
+        lines += ["", "❓ Informe a quantidade em g ou ml para: " + ", ".join(parsed.needs_unit)]
+    if parsed.unresolved:
+        lines += ["", "⚠️ Não reconheci: " + ", ".join(parsed.unresolved)]
+    if not parsed.items:
+        await reply(update, context, "\n".join(["Não reconheci nenhum alimento com quantidade.", *lines, "",
+                                                "Ex.: almoço: arroz integral 150g, feijão 100g, frango 120g"]))
+        return
+    # Só a última mensagem pendente de cada usuário pode ser confirmada
+    token = uuid.uuid4().hex[:8]
+    context.user_data["quick_meal"] = {
+        "token": token,
+        "text": "\n".join(lines),
+        "items": [(parsed.meal_type, food["id"], grams) for food, grams in parsed.items],
+    }
+    keyboard = InlineKeyboardMarkup([[
+        InlineKeyboardButton("✅ Registrar", callback_data=f"{QUICK_MEAL_CONFIRM}:{token}"),
+        InlineKeyboardButton("✖️ Cancelar", callback_data=f"{QUICK_MEAL_CANCEL}:{token}"),
+    ]])
+    await reply(update, context, "\n".join(["Confirma o registro?", "", *lines]), reply_markup=keyboard)
+
+
+async def quick_meal_confirm_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Registra (ou descarta) a refeição pendente quando o usuário responde ao teclado de confirmação."""
+    query = update.callback_query
+    await query.answer()
+    action, token = query.data.split(":", 1)
+    chat_id = update.effective_chat.id
+
+    async def edit(text):
+        await get_send_queue(context).submit(chat_id, partial(query.edit_message_text, text=text))
+
+    pending = context.user_data.get("quick_meal")
+    if pending is None or pending["token"] != token:
+        await edit("Este registro expirou. Envie a refeição novamente.")
+        return
+    del context.user_data["quick_meal"]
+    if action == QUICK_MEAL_CANCEL:
+        await edit(pending["text"] + "\n\n✖️ Registro cancelado.")
+        return
+    if not await check_user_authenticated(update.effective_user.id, context):
+        await edit("Você precisa estar logado para usar este comando. Use /login ou /signup.")
+        return
+    try:
+        message = await get_backend(context).record_meals(
+            update.effective_user.id, context.user_data.get("access_token"), pending["items"])
+    except BackendError as e:
+        logger.error(f"Backend error during batch meal: {e}")
+        await edit("Erro ao registrar refeição. Tente novamente.")
+        return
+    await edit(pending["text"] + "\n\n" + message)
+
+
 async def water_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     logger.info(
         f"Received command: /water for user {update.effective_user.id}")
     if not await check_user_authenticated(update.effective_user.id, context):
-        await update.message.reply_text("Você precisa estar logado para usar este comando. Use /login ou /signup.")
+        await reply(update, context, "Você precisa estar logado para usar este comando. Use /login ou /signup.")
         return
     args = context.args
     if not args or len(args) != 1 or not args[0].isdigit():
-        await update.message.reply_text("Use: /water <quantidade_em_ml>, ex.: /water 500")
+        await reply(update, context, "Use: /water <quantidade_em_ml>, ex.: /water 500")
         return
     amount = int(args[0])
-    token = context.user_data.get("access_token")
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{API_BASE_URL}/water",
-                json={"user_id": update.effective_user.id, "amount": amount},
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
-            await update.message.reply_text(f"Água ({amount}ml) registrada com sucesso!")
-        except httpx.HTTPError as e:
-            logger.error(f"API error during water: {e}")
-            await update.message.reply_text("Erro ao registrar água. Tente novamente.")
+    try:
+        await get_backend(context).record_water(
+            update.effective_user.id, context.user_data.get("access_token"), amount)
+        await reply(update, context, f"Água ({amount}ml) registrada com sucesso!")
+    except BackendError as e:
+        logger.error(f"Backend error during water: {e}")
+        await reply(update, context, "Erro ao registrar água. Tente novamente.")
 
 
 async def summary_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     logger.info(
         f"Received command: /summary for user {update.effective_user.id}")
     if not await check_user_authenticated(update.effective_user.id, context):
-        await update.message.reply_text("Você precisa estar logado para usar este comando. Use /login ou /signup.")
+        await reply(update, context, "Você precisa estar logado para usar este comando. Use /login ou /signup.")
+        return
+    try:
+        summary = await get_backend(context).get_summary(
+            update.effective_user.id, context.user_data.get("access_token"))
+        await reply(update, context, summary.get('text', 'Erro ao obter resumo.'), parse_mode='Markdown')
+    except BackendError as e:
+        logger.error(f"Backend error during summary: {e}")
+        await reply(update, context, "Erro ao conectar com a API.")
+
+
+async def export_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    logger.info(
+        f"Received command: /export for user {update.effective_user.id}")
+    if not await check_user_authenticated(update.effective_user.id, context):
+        await reply(update, context, "Você precisa estar logado para usar este comando. Use /login ou /signup.")
         return
-    token = context.user_data.get("access_token")
-    async with httpx.AsyncClient() as client:
+    args = context.args or ["ndjson"]
+    if len(args) != 1 or args[0] not in FORMATS:
+        await reply(update, context, "Use: /export [ndjson|csv], ex.: /export csv")
+        return
+    user_id, fmt = update.effective_user.id, args[0]
+    chat_id = update.effective_chat.id
+    # O histórico vai para um arquivo temporário enquanto chega, sem ficar inteiro em memória
+    with tempfile.TemporaryFile() as out:
         try:
-            response = await client.get(
-                f"{API_BASE_URL}/summary/{update.effective_user.id}",
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
-            summary = response.json()
-            await update.message.reply_text(summary.get('text', 'Erro ao obter resumo.'), parse_mode='Markdown')
-        except httpx.HTTPError as e:
-            logger.error(f"API error during summary: {e}")
-            await update.message.reply_text("Erro ao conectar com a API.")
+            await get_backend(context).export_history(
+                user_id, context.user_data.get("access_token"), fmt, out)
+        except BackendError as e:
+            logger.error(f"Backend error during export: {e}")
+            await reply(update, context, "Erro ao exportar o histórico. Tente novamente.")
+            return
+        if out.tell() > MAX_DOCUMENT_BYTES:
+            await reply(update, context, "O histórico passou do limite de 50 MB do Telegram; use a exportação da API.")
+            return
+
+        async def send():
+            # Cada nova tentativa da fila de envio relê o arquivo do início
+            out.seek(0)
+            return await context.bot.send_document(
+                chat_id=chat_id, document=out, filename=export_filename(user_id, fmt),
+                caption="📄 Seu histórico de refeições")
+
+        await get_send_queue(context).submit(chat_id, send, INTERACTIVE)
 
 
 async def calc_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     logger.info(
         f"Received command: /calculations for user {update.effective_user.id}")
     if not await check_user_authenticated(update.effective_user.id, context):
-        await update.message.reply_text("Você precisa estar logado para usar este comando. Use /login ou /signup.")
+        await reply(update, context, "Você precisa estar logado para usar este comando. Use /login ou /signup.")
         return
     args = context.args
     if not args or len(args) < 3 or args[0] not in ["imc", "tmb", "tdee", "fat"]:
-        await update.message.reply_text("Use: /calculations <tipo> <peso> <altura> [idade] [sexo] [atividade], ex.: /calculations imc 70 175")
+        await reply(update, context, "Use: /calculations <tipo> <peso> <altura> [idade] [sexo] [atividade], ex.: /calculations imc 70 175")
         return
     calc_type = args[0]
     weight = float(args[1])
@@ -339,123 +497,206 @@ async def calc_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         data["gender"] = args[4] if len(args) > 4 else None
         if calc_type == "tdee" and len(args) > 5:
             data["activity_level"] = args[5]
-    token = context.user_data.get("access_token")
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{API_BASE_URL}/calculations",
-                json=data,
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
-            await update.message.reply_text(response.json()["message"])
-        except httpx.HTTPError as e:
-            logger.error(f"API error during calculation: {e}")
-            await update.message.reply_text("Erro ao realizar cálculo. Tente novamente.")
+    try:
+        message = await get_backend(context).perform_calculation(
+            update.effective_user.id, context.user_data.get("access_token"), **data)
+        await reply(update, context, message)
+    except BackendError as e:
+        logger.error(f"Backend error during calculation: {e}")
+        await reply(update, context, "Erro ao realizar cálculo. Tente novamente.")
 
 
 async def goal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     logger.info(
         f"Received command: /goals for user {update.effective_user.id}")
     if not await check_user_authenticated(update.effective_user.id, context):
-        await update.message.reply_text("Você precisa estar logado para usar este comando. Use /login ou /signup.")
+        await reply(update, context, "Você precisa estar logado para usar este comando. Use /login ou /signup.")
         return
     args = context.args
     if not args or len(args) != 2 or not args[1].isdigit():
-        await update.message.reply_text("Use: /goals <nutriente> <valor>, ex.: /goals energy_kcal 2000")
+        await reply(update, context, "Use: /goals <nutriente> <valor>, ex.: /goals energy_kcal 2000")
         return
     nutrient = args[0]
     value = int(args[1])
-    token = context.user_data.get("access_token")
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{API_BASE_URL}/goals",
-                json={"nutrient": nutrient, "value": value},
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
-            await update.message.reply_text(response.json()["message"])
-        except httpx.HTTPError as e:
-            logger.error(f"API error during goal: {e}")
-            await update.message.reply_text("Erro ao definir meta. Tente novamente.")
+    try:
+        message = await get_backend(context).set_goal(
+            update.effective_user.id, context.user_data.get("access_token"), nutrient, value)
+        await reply(update, context, message)
+    except BackendError as e:
+        logger.error(f"Backend error during goal: {e}")
+        await reply(update, context, "Erro ao definir meta. Tente novamente.")
 
 
 async def reminder_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     logger.info(
         f"Received command: /reminders for user {update.effective_user.id}")
     if not await check_user_authenticated(update.effective_user.id, context):
-        await update.message.reply_text("Você precisa estar logado para usar este comando. Use /login ou /signup.")
+        await reply(update, context, "Você precisa estar logado para usar este comando. Use /login ou /signup.")
         return
     args = context.args
     if not args or len(args) != 2 or not ":" in args[1]:
-        await update.message.reply_text("Use: /reminders <tipo> <hora>, ex.: /reminders meal_reminder 12:00")
+        await reply(update, context, "Use: /reminders <tipo> <hora>, ex.: /reminders meal_reminder 12:00")
         return
     reminder_type = args[0]
     time = args[1]
-    token = context.user_data.get("access_token")
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{API_BASE_URL}/reminders",
-                json={"type": reminder_type, "time": time},
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
-            await update.message.reply_text(response.json()["message"])
-        except httpx.HTTPError as e:
-            logger.error(f"API error during reminder: {e}")
-            await update.message.reply_text("Erro ao configurar lembrete. Tente novamente.")
+    try:
+        message = await get_backend(context).set_reminder(
+            update.effective_user.id, context.user_data.get("access_token"), reminder_type, time)
+        await reply(update, context, message)
+    except BackendError as e:
+        logger.error(f"Backend error during reminder: {e}")
+        await reply(update, context, "Erro ao configurar lembrete. Tente novamente.")
 
 
 async def tips_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     logger.info(f"Received command: /tips for user {update.effective_user.id}")
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{API_BASE_URL}/tips",
-            )
-            response.raise_for_status()
-            tip = response.json().get("tip")
-            await update.message.reply_text(f"Dica do dia: {tip}")
-        except httpx.HTTPError as e:
-            logger.error(f"API error during tips: {e}")
-            await update.message.reply_text("Erro ao conectar com a API.")
+    try:
+        tip = await get_backend(context).get_tip()
+        await reply(update, context, f"Dica do dia: {tip}")
+    except BackendError as e:
+        logger.error(f"Backend error during tips: {e}")
+        await reply(update, context, "Erro ao conectar com a API.")
 
 
 async def foods_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     logger.info(
         f"Received command: /foods for user {update.effective_user.id}")
-    food_data = load_food_data()
-    if not food_data:
-        await update.message.reply_text(translations['pt']['no_foods_found'])
+    if not len(get_catalog()):
+        await reply(update, context, translations['pt']['no_foods_found'])
+        return
+    pages = get_food_pages()
+    message = pages.lookup(context.args or [])
+    if message is None:
+        message = pages.index
+    await reply(update, context, message, parse_mode='Markdown')
+
+
+def format_food_line(food) -> str:
+    return f"ID {food['id']}: {food['description']} ({food['energy_kcal']:.0f} kcal/100g)"
+
+
+async def search_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    logger.info(
+        f"Received command: /search for user {update.effective_user.id}")
+    if not context.args:
+        await reply(update, context, "Use: /search <alimento>, ex.: /search feijao")
+        return
+    results = search_foods(" ".join(context.args))
+    if not results:
+        await reply(update, context, translations['pt']['no_foods_found'])
         return
+    message = "🔍 *Resultados da busca*\n\n"
+    message += "\n".join(format_food_line(food) for food in results)
+    message += "\n\nUse /meals para registrar uma refeição."
+    await reply(update, context, message, parse_mode='Markdown')
 
-    message = "📋 *Tabela de Alimentos*\n\n"
-    for food in food_data[:10]:
-        message += (
-            f"ID: {food['id']}\n"
-            f"Alimento: {food['description']}\n"
-            f"Calorias: {food['energy_kcal']} kcal/100g\n"
-            f"Proteínas: {food['protein_g']}g/100g\n"
-            f"Carboidratos: {food['carbohydrate_g']}g/100g\n"
-            f"Lipídios: {food['lipid_g']}g/100g\n"
-            f"Fibras: {food['fiber_g']}g/100g\n\n"
+
+async def inline_search_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.inline_query.query
+    if not query:
+        return
+    results = [
+        InlineQueryResultArticle(
+            id=str(food['id']),
+            title=food['description'],
+            description=(
+                f"{food['energy_kcal']:.0f} kcal, {food['protein_g']:.1f}g proteínas, "
+                f"{food['carbohydrate_g']:.1f}g carboidratos por 100g"
+            ),
+            input_message_content=InputTextMessageContent(
+                format_food_line(food)),
         )
-    message += "Use /foods para ver mais ou /meals para registrar uma refeição."
-    await update.message.reply_text(message, parse_mode='Markdown')
+        for food in search_foods(query, limit=20)
+    ]
+    await update.inline_query.answer(results, cache_time=300)
 
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.error(f"Update {update} caused error {context.error}")
 
 
+def timed_callback(callback):
+    """Envolve um callback de handler para registrar sua duração em ``nutribot_bot_handler_duration_seconds``."""
+    name = callback.__name__
+    ok, error = (metrics.BOT_HANDLER_DURATION.labels(name, outcome) for outcome in ('ok', 'error'))
+
+    @wraps(callback)
+    async def wrapper(update, context):
+        start = time.perf_counter()
+        try:
+            result = await callback(update, context)
+        except BaseException:
+            error.observe(time.perf_counter() - start)
+            raise
+        ok.observe(time.perf_counter() - start)
+        return result
+    return wrapper
+
+
+def instrument_handler(handler):
+    """Aplica ``timed_callback`` ao handler e, em conversas, a todos os handlers internos."""
+    if isinstance(handler, ConversationHandler):
+        for inner in handler.entry_points + handler.fallbacks + [
+                h for handlers in handler.states.values() for h in handlers]:
+            instrument_handler(inner)
+    else:
+        handler.callback = timed_callback(handler.callback)
+    return handler
+
+
+async def post_init(application: Application) -> None:
+    if BOT_BACKEND == "direct":
+        # O bot lê e grava no banco sem passar pela API: aplica as migrações e
+        # carrega a tabela de alimentos como a API faria ao iniciar
+        await init_db()
+    else:
+        # Recusa iniciar com um DB_SHARDS diferente do usado nos dados, como a API
+        await get_router().verify_layout()
+    await get_router().open()
+    send_queue = SendQueue()
+    send_queue.start()
+    application.bot_data["send_queue"] = send_queue
+    application.bot_data["api_client"] = ApiClient()
+    application.bot_data["backend"] = create_backend(
+        BOT_BACKEND, application.bot_data["api_client"])
+
+    def send_reminder(user_id, text):
+        return send_queue.submit_nowait(user_id, partial(
+            application.bot.send_message, chat_id=user_id, text=text, parse_mode='Markdown'), NOTIFICATION)
+
+    scheduler = ReminderScheduler(send_reminder)
+    scheduler.start(application.job_queue)
+    application.bot_data["reminder_scheduler"] = scheduler
+
+    metrics.BOT_SCHEDULED_JOBS.set_function(lambda: len(application.job_queue.jobs()))
+    for priority, lane in LANES.items():
+        metrics.SEND_QUEUE_DEPTH.labels(lane).set_function(partial(send_queue.depth, priority))
+
+
+async def post_shutdown(application: Application) -> None:
+    send_queue = application.bot_data.pop("send_queue", None)
+    if send_queue:
+        await send_queue.stop()
+    api_client = application.bot_data.pop("api_client", None)
+    if api_client:
+        await api_client.aclose()
+    await close_writer()
+    await close_router()
+
+
 def main() -> None:
     logging.basicConfig(
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         level=logging.INFO
     )
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .updater(None)
+        .build()
+    )
 
     # Signup conversation handler
     signup_conv = ConversationHandler(
@@ -484,7 +725,8 @@ def main() -> None:
         entry_points=[CommandHandler("meals", meal_handler)],
         states={
             MEAL_TYPE: [CallbackQueryHandler(meal_type_handler)],
-            MEAL_FOOD: [CallbackQueryHandler(meal_food_handler)],
+            MEAL_FOOD: [CallbackQueryHandler(meal_food_handler),
+                        MessageHandler(filters.TEXT & ~filters.COMMAND, meal_search_handler)],
             MEAL_QUANTITY: [MessageHandler(
                 filters.TEXT & ~filters.COMMAND, meal_quantity_handler)]
         },
@@ -493,27 +735,38 @@ def main() -> None:
     )
 
     # Add handlers
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(signup_conv)
-    application.add_handler(login_conv)
-    application.add_handler(meal_conv)
-    application.add_handler(CommandHandler("water", water_handler))
-    application.add_handler(CommandHandler("summary", summary_handler))
-    application.add_handler(CommandHandler("calculations", calc_handler))
-    application.add_handler(CommandHandler("goals", goal_handler))
-    application.add_handler(CommandHandler("reminders", reminder_handler))
-    application.add_handler(CommandHandler("tips", tips_handler))
-    application.add_handler(CommandHandler("foods", foods_handler))
-    application.add_handler(CallbackQueryHandler(button_handler))
+    handlers = [
+        CommandHandler("start", start),
+        signup_conv,
+        login_conv,
+        meal_conv,
+        CommandHandler("water", water_handler),
+        CommandHandler("summary", summary_handler),
+        CommandHandler("export", export_handler),
+        CommandHandler("calculations", calc_handler),
+        CommandHandler("goals", goal_handler),
+        CommandHandler("reminders", reminder_handler),
+        CommandHandler("tips", tips_handler),
+        CommandHandler("foods", foods_handler),
+        CommandHandler("search", search_handler),
+        InlineQueryHandler(inline_search_handler),
+        CallbackQueryHandler(quick_meal_confirm_handler, pattern=f"^({QUICK_MEAL_CONFIRM}|{QUICK_MEAL_CANCEL}):"),
+        CallbackQueryHandler(button_handler),
+        # Depois das conversas: texto livre fora delas pode ser um registro de refeição
+        MessageHandler(filters.TEXT & ~filters.COMMAND, quick_meal_handler),
+    ]
+    for handler in handlers:
+        application.add_handler(instrument_handler(handler))
     application.add_error_handler(error_handler)
 
-    # Start bot with webhook
-    application.run_webhook(
+    # Start bot with webhook; /metrics é servido na mesma porta
+    asyncio.run(serve(
+        application,
         listen="0.0.0.0",
         port=WEBHOOK_PORT,
         url_path="/webhook",
         webhook_url=f"{WEBHOOK_URL}/webhook",
-    )
+    ))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+from .config import FOOD_TABLE_PATH, FOOD_SNAPSHOT_PATH
+
+logger = logging.getLogger(__name__)
+
+# Campos de texto da tabela; todos os demais são valores nutricionais por 100g
+TEXT_FIELDS = ('description', 'category')
+
+# Versão do formato do snapshot; incremente ao mudar os atributos de FoodCatalog
+SNAPSHOT_FORMAT = 1
+
+# Valores não numéricos usados na tabela TACO ("NA" = não analisado, "Tr" = traços,
+# "*" = amostra não analisada)
+MISSING_VALUES = ('NA', 'Tr', '', '*')
+
+
+def to_number(value):
+    """Converte um valor da tabela para float, tratando NA, Tr e vazio como 0."""
+    if value is None or value in MISSING_VALUES:
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class FoodCatalog:
+    """Tabela de alimentos pré-processada e indexada por id e categoria."""
+
+    def __init__(self, raw_foods):
+        self.foods = []
+        self.by_id = {}
+        self.by_category = {}
+        self.nutrient_fields = tuple(
+            key for key in raw_foods[0] if key != 'id' and key not in TEXT_FIELDS) if raw_foods else ()
+        for raw in raw_foods:
+            food = {'id': int(raw['id']),
+                    'description': raw['description'],
+                    'category': raw['category']}
+            for field in self.nutrient_fields:
+                food[field] = to_number(raw.get(field))
+            self.foods.append(food)
+            self.by_id[food['id']] = food
+            self.by_category.setdefault(food['category'], []).append(food)
+        self.categories = tuple(self.by_category)
+        # Identifica o conteúdo da tabela (para caches derivados e dados em botões)
+        self.version = hashlib.blake2b(
+            json.dumps(self.foods, sort_keys=True).encode(), digest_size=8).hexdigest()
+
+    def __len__(self):
+        return len(self.foods)
+
+    def __iter__(self):
+        return iter(self.foods)
+
+    def get(self, food_id):
+        """Retorna o alimento com o id informado ou None."""
+        return self.by_id.get(food_id)
+
+    def in_category(self, category):
+        """Retorna os alimentos de uma categoria (lista vazia se não existir)."""
+        return self.by_category.get(category, [])
+
+    @classmethod
+    def from_json(cls, path):
+        """Carrega e indexa a tabela a partir de um arquivo JSON."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(json.load(f))
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"Arquivo {path} não encontrado.")
+        except json.JSONDecodeError:
+            raise ValueError(f"Erro ao decodificar {path}.")
+
+
+def _read_snapshot(path):
+    try:
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable catalog snapshot {path}: {e}")
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get('format') != SNAPSHOT_FORMAT:
+        return None
+    return snapshot
+
+
+def _write_snapshot(path, snapshot):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=5)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not write catalog snapshot {path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def load_catalog(path=FOOD_TABLE_PATH, snapshot_path=FOOD_SNAPSHOT_PATH):
+    """Carrega o catálogo do snapshot binário (pickle), regenerando-o quando o JSON muda.
+
+    O snapshot guarda mtime, tamanho e hash do JSON de origem: com mtime e
+    tamanho iguais ele é usado direto; se só o mtime mudou, o hash decide.
+    Sem ``snapshot_path``, lê sempre o JSON.
+    """
+    if not snapshot_path:
+        return FoodCatalog.from_json(path)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"Arquivo {path} não encontrado.")
+    snapshot = _read_snapshot(snapshot_path)
+    if snapshot is not None and snapshot['size'] == stat.st_size and snapshot['mtime_ns'] == stat.st_mtime_ns:
+        return snapshot['catalog']
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.blake2b(data).hexdigest()
+    if snapshot is not None and snapshot['hash'] == digest:
+        catalog = snapshot['catalog']
+    else:
+        try:
+            catalog = FoodCatalog(json.loads(data))
+        except json.JSONDecodeError:
+            raise ValueError(f"Erro ao decodificar {path}.")
+        logger.info(f"Rebuilt catalog snapshot {snapshot_path} from {path}")
+    _write_snapshot(snapshot_path, {'format': SNAPSHOT_FORMAT, 'mtime_ns': stat.st_mtime_ns,
+                                    'size': stat.st_size, 'hash': digest, 'catalog': catalog})
+    return catalog
+
+
+_catalog = None
+
+
+def get_catalog():
+    """Retorna o catálogo compartilhado, carregando-o na primeira chamada."""
+    global _catalog
+    if _catalog is None:
+        _catalog = load_catalog()
+    return _catalog
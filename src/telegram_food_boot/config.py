@@ -1,4 +1,3 @@
-import json
 import os
 from dotenv import load_dotenv
 
@@ -10,8 +9,75 @@ WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8443))
 API_BASE_URL = os.getenv('API_BASE_URL')
 SECRET_KEY = os.getenv('SECRET_KEY')
 ALGORITHM = os.getenv('ALGORITHM')
-ACCESS_TOKEN_EXPIRE_MINUTES = os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES')
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', 30))
+FOOD_TABLE_PATH = os.getenv('FOOD_TABLE_PATH', 'tabela_alimentos.json')
+# Snapshot binário do catálogo, regenerado quando o JSON muda (vazio desativa)
+FOOD_SNAPSHOT_PATH = os.getenv('FOOD_SNAPSHOT_PATH', 'tabela_alimentos.snapshot')
+# Arquivo colunar (mmap) com os nutrientes, compartilhado entre processos
+FOOD_STORE_PATH = os.getenv('FOOD_STORE_PATH', 'tabela_alimentos.cols')
 
-# Carregar dados de alimentos do JSON
-with open('tabela_alimentos.json', 'r', encoding='utf-8') as f:
-    food_data = json.load(f)
+# Banco de dados SQLite
+DB_PATH = os.getenv('DB_PATH', 'nutribot.db')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 4))
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', 256 * 1024 * 1024))
+DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', 16 * 1024))
+DB_STATEMENT_CACHE = int(os.getenv('DB_STATEMENT_CACHE', 256))
+DB_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_HEALTH_CHECK_INTERVAL', 30))
+# Shards por usuário: 0 mantém tudo em DB_PATH; com N > 0, as tabelas por usuário ficam em
+# N arquivos (DB_SHARD_PATH com {n} = 0..N-1) e DB_PATH guarda só usuários e tokens
+DB_SHARDS = int(os.getenv('DB_SHARDS', 0))
+DB_SHARD_PATH = os.getenv('DB_SHARD_PATH', 'nutribot.shard{n}.db')
+
+# Cliente HTTP do bot para a API
+API_TIMEOUT = float(os.getenv('API_TIMEOUT', 5))
+API_MAX_CONNECTIONS = int(os.getenv('API_MAX_CONNECTIONS', 100))
+API_MAX_KEEPALIVE = int(os.getenv('API_MAX_KEEPALIVE', 20))
+API_KEEPALIVE_EXPIRY = float(os.getenv('API_KEEPALIVE_EXPIRY', 30))
+API_GET_RETRIES = int(os.getenv('API_GET_RETRIES', 2))
+
+# Backend do bot: "remote" chama a API via HTTP; "direct" executa os serviços no próprio processo
+BOT_BACKEND = os.getenv('BOT_BACKEND', 'remote')
+
+# Cache de identidade (tokens e usuários)
+IDENTITY_CACHE_SIZE = int(os.getenv('IDENTITY_CACHE_SIZE', 10000))
+IDENTITY_CACHE_TTL = float(os.getenv('IDENTITY_CACHE_TTL', 300))
+
+# Escritor em lote (group commit)
+WRITE_BATCH_SIZE = int(os.getenv('WRITE_BATCH_SIZE', 256))
+WRITE_BATCH_DELAY_MS = float(os.getenv('WRITE_BATCH_DELAY_MS', 2))
+WRITE_QUEUE_SIZE = int(os.getenv('WRITE_QUEUE_SIZE', 10000))
+
+# Cache de resumos diários (entradas por usuário e data; 0 desativa)
+SUMMARY_CACHE_SIZE = int(os.getenv('SUMMARY_CACHE_SIZE', 10000))
+
+# Exportações: históricos gerados ao mesmo tempo (cada um com sua conexão de
+# leitura) e espera máxima (segundos) por uma vaga antes de responder 503
+EXPORT_CONCURRENCY = int(os.getenv('EXPORT_CONCURRENCY', 4))
+EXPORT_ACQUIRE_TIMEOUT = float(os.getenv('EXPORT_ACQUIRE_TIMEOUT', 5))
+
+# Lembretes: linhas lidas (e mensagens enviadas em paralelo) por lote e minutos recuperados após atraso
+REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', 500))
+REMINDER_MAX_CATCHUP_MINUTES = int(os.getenv('REMINDER_MAX_CATCHUP_MINUTES', 5))
+
+# Fila de envio ao Telegram: mensagens por segundo (global e por chat), rajada por chat,
+# envios simultâneos e novas tentativas em falhas de rede
+SEND_GLOBAL_RATE = float(os.getenv('SEND_GLOBAL_RATE', 30))
+SEND_CHAT_RATE = float(os.getenv('SEND_CHAT_RATE', 1))
+SEND_CHAT_BURST = float(os.getenv('SEND_CHAT_BURST', 3))
+SEND_CONCURRENCY = int(os.getenv('SEND_CONCURRENCY', 16))
+SEND_MAX_RETRIES = int(os.getenv('SEND_MAX_RETRIES', 3))
+
+# Seletor de alimentos do bot: alimentos por página
+PICKER_PAGE_SIZE = int(os.getenv('PICKER_PAGE_SIZE', 8))
+
+# Ingestão do webhook: atualizações pendentes antes de responder 503, workers
+# e tempo máximo (segundos) para drenar a fila no desligamento
+UPDATE_QUEUE_SIZE = int(os.getenv('UPDATE_QUEUE_SIZE', 1000))
+UPDATE_WORKERS = int(os.getenv('UPDATE_WORKERS', 16))
+UPDATE_DRAIN_TIMEOUT = float(os.getenv('UPDATE_DRAIN_TIMEOUT', 30))
+
+# Deduplicação de update_ids: ids lembrados, janela em segundos e gravação no banco
+# global para sobreviver a reinícios
+UPDATE_DEDUP_SIZE = int(os.getenv('UPDATE_DEDUP_SIZE', 100000))
+UPDATE_DEDUP_TTL = float(os.getenv('UPDATE_DEDUP_TTL', 3600))
+UPDATE_DEDUP_PERSIST = os.getenv('UPDATE_DEDUP_PERSIST', '1').lower() in ('1', 'true', 'yes')
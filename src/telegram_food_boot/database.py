@@ -1,95 +1,176 @@
-from telegram.ext import ContextTypes
-from .utils import translations, get_food_nutrients
-from .config import food_data
+from .utils import translations, SUMMARY_NUTRIENTS
+from .food_store import get_food_store
+from .nutrients import get_matrix
 from datetime import datetime, timedelta
 import aiosqlite
 from contextlib import asynccontextmanager
+from .shards import get_router
+from .migrations import run_migrations
+from .identity import get_identity_cache
+from .aggregates import add_meal, add_meals, add_water, get_daily_totals, rebuild_daily_totals
+from .analytics import sync_foods
+from .summary_cache import bump_summary_version
 
 
 async def init_db():
-    """Inicializa o banco de dados SQLite."""
-    async with aiosqlite.connect('nutribot.db') as db:
-        await db.execute('''CREATE TABLE IF NOT EXISTS meals
-                                 (user_id INTEGER, meal_type TEXT, food_id INTEGER, quantity REAL, timestamp TEXT)''')
-        await db.execute('''CREATE TABLE IF NOT EXISTS goals
-                                 (user_id INTEGER, nutrient TEXT, value REAL)''')
-        await db.execute('''CREATE TABLE IF NOT EXISTS water
-                                 (user_id INTEGER, amount REAL, date TEXT)''')
-        await db.execute('''CREATE TABLE IF NOT EXISTS calculations
-                                 (user_id INTEGER, type TEXT, result REAL, details TEXT, timestamp TEXT)''')
-        await db.execute('''CREATE TABLE IF NOT EXISTS reminders
-                                 (user_id INTEGER, type TEXT, time TEXT)''')
-        await db.execute('''CREATE TABLE IF NOT EXISTS users
-                                 (user_id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, password_hash TEXT)''')
-        await db.execute('''CREATE TABLE IF NOT EXISTS user_tokens
-                                 (user_id INTEGER PRIMARY KEY, access_token TEXT NOT NULL,
-                                  FOREIGN KEY (user_id) REFERENCES users (user_id))''')
-        await db.commit()
+    """Inicializa o banco de dados SQLite (banco global e shards)."""
+    router = get_router()
+    for pool in router.pools:
+        async with aiosqlite.connect(pool.path) as db:
+            await run_migrations(db)
+            # Os bancos com refeições recebem a tabela de alimentos atual; os totais
+            # diários dependem dela e são recalculados na mesma transação
+            if pool in router.shard_pools:
+                await db.execute('BEGIN')
+                if await sync_foods(db):
+                    await rebuild_daily_totals(db)
+                    await db.execute('UPDATE summary_versions SET version = version + 1')
+                await db.commit()
+    await router.verify_layout()
+
+
+def day_range(date):
+    """Retorna o intervalo semiaberto [date, date + 1 dia) para consultas indexadas."""
+    start = datetime.strptime(date, '%Y-%m-%d')
+    return date, (start + timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+@asynccontextmanager
+async def get_db_connection(user_id=None):
+    """Retorna a conexão de escrita do shard do usuário (sem user_id, a do banco global)."""
+    async with get_router().pool_for(user_id).writer() as db:
+        yield db
+
+
+@asynccontextmanager
+async def get_read_connection(user_id=None):
+    """Retorna uma conexão somente leitura do shard do usuário (sem user_id, do banco global)."""
+    async with get_router().pool_for(user_id).reader() as db:
+        yield db
 
 
 @asynccontextmanager
-async def get_db_connection():
-    """Retorna uma conexão assíncrona com o banco de dados."""
-    db = await aiosqlite.connect('nutribot.db')
-    try:
+async def get_dedicated_read_connection(user_id=None):
+    """Abre uma conexão somente leitura própria no shard do usuário, sem ocupar o pool."""
+    async with get_router().pool_for(user_id).dedicated_reader() as db:
         yield db
-    finally:
-        await db.close()
 
 
-async def save_meal(user_id, meal_type, food_id, quantity, db):
-    """Salva uma refeição no banco de dados."""
-    async with db.execute('INSERT INTO meals (user_id, meal_type, food_id, quantity, timestamp) VALUES (?, ?, ?, ?, ?)',
-                          (user_id, meal_type, food_id, quantity, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))):
+async def save_meal(user_id, meal_type, food_id, quantity, db, commit=True):
+    """Salva uma refeição e atualiza o total do dia na mesma transação."""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    await db.execute('INSERT INTO meals (user_id, meal_type, food_id, quantity, timestamp) VALUES (?, ?, ?, ?, ?)',
+                     (user_id, meal_type, food_id, quantity, timestamp))
+    await add_meal(db, user_id, timestamp[:10], food_id, quantity)
+    await bump_summary_version(db, user_id)
+    if commit:
+        await db.commit()
+
+
+async def save_meals(user_id, items, db, commit=True):
+    """Salva várias refeições ``(meal_type, food_id, quantity)`` com um único executemany e um UPSERT no total do dia."""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    await db.executemany('INSERT INTO meals (user_id, meal_type, food_id, quantity, timestamp) VALUES (?, ?, ?, ?, ?)',
+                         [(user_id, meal_type, food_id, quantity, timestamp) for meal_type, food_id, quantity in items])
+    await add_meals(db, user_id, timestamp[:10], [food_id for _, food_id, _ in items],
+                    [quantity for _, _, quantity in items])
+    await bump_summary_version(db, user_id)
+    if commit:
+        await db.commit()
+
+
+async def save_water(user_id, amount, db, commit=True):
+    """Salva um registro de consumo de água e atualiza o total do dia na mesma transação."""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    await db.execute('INSERT INTO water (user_id, amount, date) VALUES (?, ?, ?)',
+                     (user_id, amount, timestamp))
+    await add_water(db, user_id, timestamp[:10], amount)
+    await bump_summary_version(db, user_id)
+    if commit:
+        await db.commit()
+
+
+async def save_goal(user_id, nutrient, value, db, commit=True):
+    """Salva (ou substitui) uma meta nutricional no banco de dados."""
+    await db.execute('INSERT OR REPLACE INTO goals (user_id, nutrient, value) VALUES (?, ?, ?)',
+                     (user_id, nutrient, value))
+    await bump_summary_version(db, user_id)
+    if commit:
         await db.commit()
 
 
-async def save_calculation(user_id, calc_type, result, details, db):
+async def get_water_total(user_id, date, db):
+    """Retorna o total de água (ml) consumido em um dia."""
+    async with db.execute('SELECT water FROM daily_totals WHERE user_id = ? AND day = ?',
+                          (user_id, date)) as cursor:
+        row = await cursor.fetchone()
+    return row[0] if row else 0
+
+
+async def save_calculation(user_id, calc_type, result, details, db, commit=True):
     """Salva um cálculo (IMC, TMB, TDEE, Fat) no banco de dados."""
-    async with db.execute('INSERT INTO calculations (user_id, type, result, details, timestamp) VALUES (?, ?, ?, ?, ?)',
-                          (user_id, calc_type, result, details, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))):
+    await db.execute('INSERT INTO calculations (user_id, type, result, details, timestamp) VALUES (?, ?, ?, ?, ?)',
+                     (user_id, calc_type, result, details, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+    await bump_summary_version(db, user_id)
+    if commit:
         await db.commit()
 
 
-async def save_reminder(user_id, reminder_type, time, db):
+async def save_reminder(user_id, reminder_type, time, db, commit=True):
     """Salva um lembrete no banco de dados."""
     async with db.execute('INSERT OR REPLACE INTO reminders (user_id, type, time) VALUES (?, ?, ?)',
                           (user_id, reminder_type, time)):
-        await db.commit()
+        if commit:
+            await db.commit()
 
 
 async def get_daily_summary(user_id, date, db):
     """Gera um resumo nutricional diário detalhado."""
-    summary = {'meals': {}, 'goals': {}, 'water': 0, 'calculations': []}
+    summary = {'meals': {}, 'goals': {}, 'totals': {},
+               'water': 0, 'calculations': []}
     summary['text'] = translations['pt']['daily_summary'].format(
         date=date)
 
+    # Totais do dia (mantidos incrementalmente em daily_totals)
+    daily = await get_daily_totals(db, user_id, date)
+    meal_count, total_water, totals = daily if daily else (0, 0, {})
+    summary['totals'] = totals
+
     # Resumo das refeições
-    total = {'energy_kcal': 0, 'protein_g': 0,
-             'lipid_g': 0, 'carbohydrate_g': 0, 'fiber_g': 0}
-    async with db.execute('SELECT meal_type, food_id, quantity, timestamp FROM meals WHERE user_id = ? AND date(timestamp) = ?',
-                          (user_id, date)) as cursor:
-        meals = await cursor.fetchall()
-        if meals:
-            summary['text'] += translations['pt']['meals_summary']
-            for meal_type, food_id, quantity, timestamp in meals:
-                nutrients = get_food_nutrients(food_id, quantity)
-                if nutrients:
-                    summary['meals'][timestamp] = {
-                        'meal_type': meal_type,
-                        'description': nutrients['description'],
-                        'quantity': quantity,
-                        'nutrients': {k: v for k, v in nutrients.items() if k in total}
-                    }
-                    summary['text'] += f"• *{meal_type.capitalize()}* às {timestamp.split(' ')[1]}: {nutrients['description']} ({quantity}g)\n"
-                    summary['text'] += f"  Calorias: {nutrients['energy_kcal']:.1f} kcal, Proteínas: {nutrients['protein_g']:.1f}g, Carboidratos: {nutrients['carbohydrate_g']:.1f}g, Lipídios: {nutrients['lipid_g']:.1f}g, Fibras: {nutrients['fiber_g']:.1f}g\n"
-                    for key in total:
-                        total[key] += nutrients[key]
-            summary['text'] += "\n*Totais do Dia*\n"
-            for key, value in total.items():
-                summary['text'] += f"• {key.replace('_g', ' (g)').replace('energy_kcal', 'Calorias (kcal)')}: *{value:.1f}*\n"
-        else:
-            summary['text'] += translations['pt']['no_meals'] + "\n"
+    if meal_count:
+        matrix = get_matrix()
+        start, end = day_range(date)
+        async with db.execute('SELECT meal_type, food_id, quantity, timestamp FROM meals WHERE user_id = ? AND timestamp >= ? AND timestamp < ?',
+                              (user_id, start, end)) as cursor:
+            meals = await cursor.fetchall()
+        per_item, known = matrix.per_item([meal[1] for meal in meals], [meal[2] for meal in meals])
+        shown = per_item[[matrix.field_index[key]
+                          for key in SUMMARY_NUTRIENTS]].T.tolist()
+        store = get_food_store()
+        summary['text'] += translations['pt']['meals_summary']
+        for (meal_type, food_id, quantity, timestamp), is_known, values in zip(meals, known.tolist(), shown):
+            if not is_known:
+                continue
+            nutrients = dict(zip(SUMMARY_NUTRIENTS, values))
+            description = store.description(store.column(food_id))
+            # Refeições do mesmo segundo (ex.: um registro em lote) não podem se sobrescrever
+            key, n = timestamp, 1
+            while key in summary['meals']:
+                n += 1
+                key = f"{timestamp} ({n})"
+            summary['meals'][key] = {
+                'meal_type': meal_type,
+                'description': description,
+                'quantity': quantity,
+                'nutrients': nutrients
+            }
+            summary['text'] += f"• *{meal_type.capitalize()}* às {timestamp.split(' ')[1]}: {description} ({quantity}g)\n"
+            summary['text'] += f"  Calorias: {nutrients['energy_kcal']:.1f} kcal, Proteínas: {nutrients['protein_g']:.1f}g, Carboidratos: {nutrients['carbohydrate_g']:.1f}g, Lipídios: {nutrients['lipid_g']:.1f}g, Fibras: {nutrients['fiber_g']:.1f}g\n"
+        summary['text'] += "\n*Totais do Dia*\n"
+        for key in SUMMARY_NUTRIENTS:
+            summary['text'] += f"• {key.replace('_g', ' (g)').replace('energy_kcal', 'Calorias (kcal)')}: *{totals[key]:.1f}*\n"
+    else:
+        summary['text'] += translations['pt']['no_meals'] + "\n"
 
     # Progresso das metas
     async with db.execute('SELECT nutrient, value FROM goals WHERE user_id = ?', (user_id,)) as cursor:
@@ -97,19 +178,16 @@ async def get_daily_summary(user_id, date, db):
         if goals:
             summary['text'] += translations['pt']['goals_progress']
             for nutrient, goal in goals:
-                current = total.get(nutrient, 0)
+                current = totals.get(nutrient, 0)
                 percentage = (current / goal * 100) if goal > 0 else 0
                 summary['goals'][nutrient] = {
                     'current': current, 'goal': goal, 'percentage': percentage}
                 summary['text'] += f"• {nutrient.replace('_g', ' (g)').replace('energy_kcal', 'Calorias (kcal)')}: *{current:.1f}/{goal:.1f}* ({percentage:.1f}%)\n"
 
     # Consumo de água
-    async with db.execute('SELECT SUM(amount) FROM water WHERE user_id = ? AND date = ?',
-                          (user_id, date)) as cursor:
-        total_water = (await cursor.fetchone())[0] or 0
-        summary['water'] = total_water
-        summary['text'] += translations['pt']['water_summary']
-        summary['text'] += f"• Total: *{total_water:.0f}ml*\n"
+    summary['water'] = total_water
+    summary['text'] += translations['pt']['water_summary']
+    summary['text'] += f"• Total: *{total_water:.0f}ml*\n"
 
     # Últimos cálculos
     async with db.execute('SELECT type, result, details FROM calculations WHERE user_id = ? ORDER BY timestamp DESC LIMIT 2',
@@ -127,10 +205,11 @@ async def get_daily_summary(user_id, date, db):
 
 async def create_user(username: str, password_hash: str):
     """Cria um novo usuário no banco de dados."""
-    async with aiosqlite.connect('nutribot.db') as db:
+    async with get_db_connection() as db:
         try:
             cursor = await db.execute('INSERT INTO users (username, password_hash) VALUES (?, ?)', (username, password_hash))
             await db.commit()
+            get_identity_cache().invalidate_user(username=username)
             return cursor.lastrowid
         except aiosqlite.IntegrityError:
             return None  # Username already exists
@@ -138,34 +217,6 @@ async def create_user(username: str, password_hash: str):
 
 async def get_user_by_username(username: str):
     """Recupera um usuário pelo nome de usuário."""
-    async with aiosqlite.connect('nutribot.db') as db:
+    async with get_read_connection() as db:
         cursor = await db.execute('SELECT user_id, username, password_hash FROM users WHERE username = ?', (username,))
         return await cursor.fetchone()
-
-
-async def setup_reminders(application):
-    """Configura lembretes salvos no banco de dados ao iniciar o bot."""
-    async with aiosqlite.connect('nutribot.db') as db:
-        cursor = await db.execute('SELECT user_id, type, time FROM reminders')
-        reminders = await cursor.fetchall()
-
-        job_queue = application.job_queue
-        for user_id, reminder_type, time_str in reminders:
-            async def send_reminder(context: ContextTypes):
-                reminder_type = context.job.data['type']
-                message = translations['pt']['reminder_meal'] if reminder_type == 'meal_reminder' else translations['pt']['reminder_water']
-                await context.bot.send_message(chat_id=context.job.data['user_id'], text=message, parse_mode='Markdown')
-
-            t = datetime.strptime(time_str, '%H:%M').time()
-            now = datetime.now()
-            first_run = now.replace(
-                hour=t.hour, minute=t.minute, second=0, microsecond=0)
-            if first_run < now:
-                first_run += timedelta(days=1)
-
-            job_queue.run_daily(
-                callback=send_reminder,
-                time=first_run,
-                data={'user_id': user_id, 'type': reminder_type},
-                name=f"{reminder_type}_{user_id}"
-            )
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from functools import partial
+from .config import UPDATE_DEDUP_SIZE, UPDATE_DEDUP_TTL, UPDATE_DEDUP_PERSIST
+from .database import get_read_connection
+from .metrics import UPDATE_DEDUP, UPDATE_DEDUP_ENTRIES
+from .writer import get_writer
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 1.0
+
+
+async def save_processed_updates(entries, cutoff, db):
+    """Grava os update_ids aceitos e apaga os que saíram da janela (operação do escritor em lote)."""
+    await db.executemany(
+        'INSERT OR IGNORE INTO processed_updates (update_id, received_at) VALUES (?, ?)', entries)
+    await db.execute('DELETE FROM processed_updates WHERE received_at < ?', (cutoff,))
+
+
+class UpdateDeduplicator:
+    """Conjunto limitado dos update_ids vistos recentemente, para descartar reentregas do Telegram.
+
+    Guarda no máximo ``maxsize`` ids por até ``ttl`` segundos, em ordem de
+    chegada. Com ``persist``, os ids aceitos são gravados na tabela
+    ``processed_updates`` do banco global a cada segundo (pelo escritor em
+    lote) e recarregados em ``start``, então reentregas após um reinício
+    também são descartadas; um id aceito no último segundo antes de uma
+    queda pode não ter sido gravado.
+    """
+
+    def __init__(self, maxsize=UPDATE_DEDUP_SIZE, ttl=UPDATE_DEDUP_TTL, persist=UPDATE_DEDUP_PERSIST):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.persist = persist
+        self._seen = OrderedDict()
+        self._unsaved = []
+        self._task = None
+        UPDATE_DEDUP_ENTRIES.set_function(lambda: len(self._seen))
+
+    def _prune(self, now):
+        cutoff = now - self.ttl
+        while self._seen:
+            update_id, received_at = next(iter(self._seen.items()))
+            if received_at >= cutoff and len(self._seen) <= self.maxsize:
+                break
+            self._seen.popitem(last=False)
+
+    def is_duplicate(self, update_id, now=None):
+        """True se o update_id já foi aceito dentro da janela."""
+        self._prune(time.time() if now is None else now)
+        if update_id in self._seen:
+            UPDATE_DEDUP.labels('duplicate').inc()
+            return True
+        UPDATE_DEDUP.labels('new').inc()
+        return False
+
+    def add(self, update_id, now=None):
+        """Registra um update_id aceito."""
+        now = time.time() if now is None else now
+        self._seen[update_id] = now
+        self._prune(now)
+        if self.persist:
+            self._unsaved.append((update_id, now))
+
+    async def start(self):
+        """Carrega os ids gravados dentro da janela e inicia a gravação periódica."""
+        if not self.persist:
+            return
+        async with get_read_connection() as db:
+            async with db.execute(
+                'SELECT update_id, received_at FROM processed_updates '
+                'WHERE received_at >= ? ORDER BY received_at DESC LIMIT ?',
+                (time.time() - self.ttl, self.maxsize),
+            ) as cursor:
+                rows = await cursor.fetchall()
+        for update_id, received_at in reversed(rows):
+            self._seen[update_id] = received_at
+        logger.info(f"Loaded {len(rows)} recent update ids for deduplication")
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to persist processed update ids: {e}")
+
+    async def flush(self):
+        if not self._unsaved:
+            return
+        entries, self._unsaved = self._unsaved, []
+        try:
+            await get_writer().submit(
+                partial(save_processed_updates, entries, time.time() - self.ttl))
+        except BaseException:
+            # Reenvia no próximo ciclo (INSERT OR IGNORE tolera ids já gravados)
+            self._unsaved = (entries + self._unsaved)[-self.maxsize:]
+            raise
+
+    async def stop(self):
+        """Encerra a gravação periódica e grava os ids pendentes."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
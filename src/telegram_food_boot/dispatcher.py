@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from collections import deque
+from .config import UPDATE_QUEUE_SIZE, UPDATE_WORKERS, UPDATE_DRAIN_TIMEOUT
+from .metrics import UPDATE_QUEUE_WAIT, WEBHOOK_UPDATES
+
+logger = logging.getLogger(__name__)
+
+
+def update_key(update):
+    """Chave de ordenação de uma atualização: o usuário, o chat ou a própria atualização."""
+    user = getattr(update, 'effective_user', None)
+    if user is not None:
+        return user.id
+    chat = getattr(update, 'effective_chat', None)
+    if chat is not None:
+        return chat.id
+    return ('update', getattr(update, 'update_id', id(update)))
+
+
+class UpdateDispatcher:
+    """Fila limitada de atualizações recebidas, drenada por um pool de workers.
+
+    Atualizações de usuários diferentes rodam em paralelo; as de um mesmo
+    usuário rodam uma por vez, na ordem de chegada, para que o estado dos
+    ConversationHandlers fique correto. Cada usuário com atualizações
+    pendentes entra uma única vez na fila de prontos e volta para o fim dela
+    depois de cada atualização processada, então um usuário com muitas
+    mensagens não ocupa todos os workers.
+    """
+
+    def __init__(self, process, maxsize=UPDATE_QUEUE_SIZE, workers=UPDATE_WORKERS):
+        self.process = process
+        self.maxsize = maxsize
+        self.workers = workers
+        self._pending = {}
+        self._ready = asyncio.Queue()
+        self._size = 0
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closed = False
+        self._tasks = []
+        self.counters = {'accepted': 0, 'rejected': 0, 'processed': 0, 'failed': 0}
+
+    @property
+    def pending(self):
+        """Atualizações na fila ou em processamento."""
+        return self._size
+
+    def start(self):
+        if not self._tasks:
+            self._closed = False
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, update):
+        """Enfileira sem esperar; retorna False se a fila estiver cheia ou encerrando."""
+        if self._closed or self._size >= self.maxsize:
+            self.counters['rejected'] += 1
+            WEBHOOK_UPDATES.labels('rejected').inc()
+            return False
+        key = update_key(update)
+        loop = asyncio.get_running_loop()
+        queue = self._pending.get(key)
+        if queue is None:
+            queue = self._pending[key] = deque()
+            self._ready.put_nowait(key)
+        queue.append((update, loop.time()))
+        self._size += 1
+        self._idle.clear()
+        self.counters['accepted'] += 1
+        WEBHOOK_UPDATES.labels('accepted').inc()
+        return True
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            key = await self._ready.get()
+            queue = self._pending[key]
+            update, enqueued = queue.popleft()
+            UPDATE_QUEUE_WAIT.observe(loop.time() - enqueued)
+            self._in_flight += 1
+            try:
+                await self.process(update)
+                self.counters['processed'] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.counters['failed'] += 1
+                logger.error(f"Error processing update {getattr(update, 'update_id', '?')}: {e}")
+            finally:
+                self._in_flight -= 1
+                self._size -= 1
+                # O usuário só volta à fila de prontos depois que a atualização anterior terminou
+                if queue:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._pending[key]
+                if not self._size:
+                    self._idle.set()
+
+    def stats(self):
+        return {'pending': self._size, 'in_flight': self._in_flight,
+                'users': len(self._pending), **self.counters}
+
+    async def stop(self, timeout=UPDATE_DRAIN_TIMEOUT):
+        """Recusa novas atualizações, processa as pendentes (até ``timeout`` segundos) e encerra os workers."""
+        self._closed = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping {self._size} pending updates on shutdown")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info(f"Update dispatcher stats: {self.stats()}")
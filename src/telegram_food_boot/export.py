@@ -0,0 +1,90 @@
+import asyncio
+import csv
+import io
+import json
+from .config import EXPORT_CONCURRENCY, EXPORT_ACQUIRE_TIMEOUT
+from .database import get_dedicated_read_connection
+from .food_store import get_food_store
+from .nutrients import get_matrix
+from .utils import SUMMARY_NUTRIENTS
+
+# Refeições lidas do cursor por vez; a memória usada não depende do tamanho do histórico
+EXPORT_CHUNK = 500
+
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+COLUMNS = ('timestamp', 'meal_type', 'food_id', 'description', 'quantity', *SUMMARY_NUTRIENTS)
+
+EXPORT_SQL = '''SELECT timestamp, meal_type, food_id, quantity FROM meals
+    WHERE user_id = ? ORDER BY timestamp'''
+
+# Um cliente lento segura a conexão da exportação até terminar de ler; o
+# limite evita que muitas exportações abram conexões sem fim
+_slots = asyncio.Semaphore(EXPORT_CONCURRENCY)
+
+
+class ExportBusyError(Exception):
+    """Todas as vagas de exportação continuaram ocupadas durante a espera."""
+
+
+def export_filename(user_id, fmt):
+    return f"nutribot-{user_id}.{fmt}"
+
+
+async def iter_meal_chunks(user_id, db, chunk=EXPORT_CHUNK):
+    """Percorre o histórico de refeições em blocos de ``chunk`` linhas, já com os nutrientes.
+
+    Cada bloco é uma lista de tuplas na ordem de COLUMNS; alimentos que não estão
+    mais na tabela saem sem descrição e com nutrientes None.
+    """
+    matrix = get_matrix()
+    store = get_food_store()
+    rows_of = [matrix.field_index[field] for field in SUMMARY_NUTRIENTS]
+    async with db.execute(EXPORT_SQL, (user_id,)) as cursor:
+        while True:
+            meals = await cursor.fetchmany(chunk)
+            if not meals:
+                break
+            food_ids = [meal[2] for meal in meals]
+            per_item, known = matrix.per_item(food_ids, [meal[3] for meal in meals])
+            values = per_item[rows_of].T.tolist()
+            yield [
+                (timestamp, meal_type, food_id, store.description(store.column(food_id)), quantity, *nutrients)
+                if is_known else (timestamp, meal_type, food_id, None, quantity, *[None] * len(SUMMARY_NUTRIENTS))
+                for (timestamp, meal_type, food_id, quantity), is_known, nutrients in zip(meals, known.tolist(), values)
+            ]
+
+
+def _ndjson(rows):
+    return ''.join(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + '\n' for row in rows)
+
+
+def _csv(rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(COLUMNS)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+async def stream_export(user_id, fmt):
+    """Gera o histórico do usuário em NDJSON ou CSV, um bloco de texto por leitura do cursor.
+
+    Cada exportação usa uma conexão de leitura própria, aberta ao ocupar uma
+    das EXPORT_CONCURRENCY vagas e fechada no fim (ou no cancelamento) da
+    geração; a consulta única enxerga um retrato consistente do banco. Sem
+    vaga em EXPORT_ACQUIRE_TIMEOUT segundos, levanta ExportBusyError.
+    """
+    try:
+        await asyncio.wait_for(_slots.acquire(), EXPORT_ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise ExportBusyError(f"No export slot free after {EXPORT_ACQUIRE_TIMEOUT:g}s")
+    try:
+        async with get_dedicated_read_connection(user_id) as db:
+            if fmt == 'csv':
+                yield _csv((), header=True)
+            async for rows in iter_meal_chunks(user_id, db):
+                yield _csv(rows) if fmt == 'csv' else _ndjson(rows)
+    finally:
+        _slots.release()
@@ -0,0 +1,112 @@
+from telegram.helpers import escape_markdown
+from .catalog import get_catalog
+from .search import fold
+
+# Limite do Telegram é 4096 caracteres; a margem cobre a contagem em UTF-16 dos emojis
+MAX_MESSAGE_LENGTH = 4000
+HEADER = "📋 *Tabela de Alimentos*"
+
+
+def render_food(food):
+    """Bloco Markdown de um alimento com os principais nutrientes por 100g."""
+    return (
+        f"ID: {food['id']}\n"
+        f"Alimento: {escape_markdown(food['description'])}\n"
+        f"Calorias: {food['energy_kcal']:.1f} kcal/100g\n"
+        f"Proteínas: {food['protein_g']:.1f}g/100g\n"
+        f"Carboidratos: {food['carbohydrate_g']:.1f}g/100g\n"
+        f"Lipídios: {food['lipid_g']:.1f}g/100g\n"
+        f"Fibras: {food['fiber_g']:.1f}g/100g\n\n"
+    )
+
+
+def paginate(blocks, reserved):
+    """Agrupa blocos em páginas que, somadas a ``reserved`` caracteres, cabem em uma mensagem."""
+    pages, current, size = [], [], 0
+    for block in blocks:
+        if current and size + len(block) + reserved > MAX_MESSAGE_LENGTH:
+            pages.append(''.join(current))
+            current, size = [], 0
+        current.append(block)
+        size += len(block)
+    if current or not pages:
+        pages.append(''.join(current))
+    return pages
+
+
+class FoodPages:
+    """Mensagens de /foods prontas: a tabela completa e cada categoria, já paginadas."""
+
+    # Espaço reservado para cabeçalho e rodapé de cada página
+    RESERVED = 400
+
+    def __init__(self, catalog):
+        self.categories = catalog.categories
+        self._category_keys = {fold(category): index for index, category in enumerate(self.categories)}
+        blocks = {food['id']: render_food(food) for food in catalog.foods}
+        self.pages = self._render(
+            paginate([blocks[food['id']] for food in catalog.foods], self.RESERVED), None, '')
+        self.category_pages = [
+            self._render(paginate([blocks[food['id']] for food in catalog.in_category(category)], self.RESERVED),
+                         category, f" {category}")
+            for category in self.categories
+        ]
+        self.index = self._render_index()
+
+    def _render(self, bodies, category, command_arg):
+        title = HEADER if category is None else f"{HEADER}\n_{escape_markdown(category)}_"
+        total = len(bodies)
+        rendered = []
+        for number, body in enumerate(bodies, start=1):
+            footer = f"Página {number}/{total}."
+            if number < total:
+                footer += f" Próxima: /foods{command_arg} {number + 1}"
+            footer += "\nCategorias: /foods categorias · Registrar: /meals"
+            rendered.append(f"{title} ({number}/{total})\n\n{body}{footer}")
+        return rendered
+
+    def _render_index(self):
+        lines = [f"• {escape_markdown(category)}: /foods {category}" for category in self.categories]
+        return "📂 *Categorias*\n\n" + "\n".join(lines) + "\n\nUse /foods <página> ou /foods <categoria> [página]."
+
+    def find_category(self, name):
+        """Índice da categoria pelo nome (sem acentos; aceita o início do nome) ou None."""
+        key = fold(name).strip()
+        if not key:
+            return None
+        if key in self._category_keys:
+            return self._category_keys[key]
+        for folded, index in self._category_keys.items():
+            if folded.startswith(key):
+                return index
+        return None
+
+    def lookup(self, args):
+        """Mensagem para ``/foods [página|categoria [página]]``; None se não reconhecer os argumentos."""
+        page = 1
+        if args and args[-1].isdigit():
+            page = int(args[-1])
+            args = args[:-1]
+        if not args:
+            pages = self.pages
+        else:
+            name = ' '.join(args)
+            if fold(name) in ('categorias', 'categoria'):
+                return self.index
+            index = self.find_category(name)
+            if index is None:
+                return None
+            pages = self.category_pages[index]
+        return pages[min(max(page, 1), len(pages)) - 1]
+
+
+_food_pages = None
+
+
+def get_food_pages():
+    """Retorna as páginas de /foods do catálogo compartilhado."""
+    global _food_pages
+    catalog = get_catalog()
+    if _food_pages is None or _food_pages[0] is not catalog:
+        _food_pages = (catalog, FoodPages(catalog))
+    return _food_pages[1]
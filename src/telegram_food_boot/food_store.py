@@ -0,0 +1,154 @@
+import logging
+import mmap
+import os
+import struct
+import numpy as np
+from .catalog import load_catalog
+from .config import FOOD_TABLE_PATH, FOOD_STORE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Arquivo colunar da tabela de alimentos (little-endian, seções alinhadas em 8 bytes):
+#   cabeçalho | offsets das strings (uint32) | ids (int64) | coluna por id (int64)
+#   | valores por grama (float64, uma coluna contígua por nutriente) | strings UTF-8
+# As strings são os nomes dos nutrientes, depois as descrições e as categorias.
+MAGIC = b'FOODCOL1'
+STORE_FORMAT = 1
+HEADER = struct.Struct('<8sIIIIqq16s')
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+class FoodStore:
+    """Tabela de alimentos colunar mapeada em memória (somente leitura).
+
+    Os arrays são visões numpy sobre o mmap: processos que abrem o mesmo
+    arquivo compartilham as páginas do cache do sistema, e o acesso por id
+    não exige nenhuma conversão.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, store_format, n_foods, n_fields, max_id,
+         self.source_mtime_ns, self.source_size, version) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or store_format != STORE_FORMAT:
+            self._mmap.close()
+            raise ValueError(f"{path} não é um arquivo colunar de alimentos válido")
+        self.version = version.rstrip(b'\0').decode()
+        n_strings = n_fields + 2 * n_foods
+        offset = _align(HEADER.size)
+        self._string_offsets = np.frombuffer(self._mmap, '<u4', n_strings + 1, offset)
+        offset = _align(offset + self._string_offsets.nbytes)
+        self.ids = np.frombuffer(self._mmap, '<i8', n_foods, offset)
+        offset += self.ids.nbytes
+        self.row_of = np.frombuffer(self._mmap, '<i8', max_id + 1, offset)
+        offset += self.row_of.nbytes
+        self.values = np.frombuffer(self._mmap, '<f8', n_fields * n_foods, offset).reshape(n_fields, n_foods)
+        self._strings_start = offset + self.values.nbytes
+        self.n_foods = n_foods
+        self.fields = tuple(self._string(i) for i in range(n_fields))
+        self.field_index = {field: i for i, field in enumerate(self.fields)}
+
+    def __len__(self):
+        return self.n_foods
+
+    def _string(self, index):
+        start = self._strings_start + int(self._string_offsets[index])
+        end = self._strings_start + int(self._string_offsets[index + 1])
+        return self._mmap[start:end].decode()
+
+    def column(self, food_id):
+        """Coluna do alimento nos arrays, ou -1 se o id não existir."""
+        if not 0 <= food_id < len(self.row_of):
+            return -1
+        return int(self.row_of[food_id])
+
+    def description(self, column):
+        return self._string(len(self.fields) + column)
+
+    def category(self, column):
+        return self._string(len(self.fields) + self.n_foods + column)
+
+    def value(self, field, column):
+        """Valor de um nutriente por grama."""
+        return float(self.values[self.field_index[field], column])
+
+    def close(self):
+        """Solta as visões numpy e fecha o mmap.
+
+        Se outra parte do processo ainda usa algum array, o mapa é liberado
+        pelo coletor quando a última visão sumir.
+        """
+        self._string_offsets = self.ids = self.row_of = self.values = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+
+def write_food_store(catalog, path, source_mtime_ns=0, source_size=0):
+    """Grava o catálogo no formato colunar (de forma atômica)."""
+    fields = catalog.nutrient_fields
+    foods = catalog.foods
+    ids = np.array([food['id'] for food in foods], dtype='<i8')
+    row_of = np.full(int(ids.max(initial=0)) + 1, -1, dtype='<i8')
+    row_of[ids] = np.arange(len(ids))
+    values = np.array([[food[field] for food in foods] for field in fields], dtype='<f8').reshape(len(fields), len(foods))
+    values /= 100  # Valores da tabela são por 100g
+    strings = [field.encode() for field in fields]
+    strings += [food['description'].encode() for food in foods]
+    strings += [food['category'].encode() for food in foods]
+    string_offsets = np.zeros(len(strings) + 1, dtype='<u4')
+    string_offsets[1:] = np.cumsum([len(s) for s in strings])
+
+    header = HEADER.pack(MAGIC, STORE_FORMAT, len(foods), len(fields), len(row_of) - 1,
+                         source_mtime_ns, source_size, catalog.version.encode())
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(b'\0' * (_align(HEADER.size) - HEADER.size))
+            f.write(string_offsets.tobytes())
+            f.write(b'\0' * (_align(string_offsets.nbytes) - string_offsets.nbytes))
+            f.write(ids.tobytes())
+            f.write(row_of.tobytes())
+            f.write(values.tobytes())
+            f.write(b''.join(strings))
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def open_food_store(path=FOOD_STORE_PATH, source_path=FOOD_TABLE_PATH):
+    """Abre o arquivo colunar, regenerando-o a partir do catálogo quando o JSON muda."""
+    stat = os.stat(source_path)
+    try:
+        store = FoodStore(path)
+    except (FileNotFoundError, ValueError, struct.error) as e:
+        logger.info(f"Building food store {path}: {e}")
+    else:
+        if store.source_mtime_ns == stat.st_mtime_ns and store.source_size == stat.st_size:
+            return store
+        store.close()
+        logger.info(f"Rebuilding food store {path}: {source_path} changed")
+    write_food_store(load_catalog(source_path), path, stat.st_mtime_ns, stat.st_size)
+    return FoodStore(path)
+
+
+_store = None
+
+
+def get_food_store():
+    """Retorna o arquivo colunar compartilhado do processo."""
+    global _store
+    if _store is None:
+        _store = open_food_store()
+    return _store
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+import httpx
+from .config import (
+    API_BASE_URL,
+    API_TIMEOUT,
+    API_MAX_CONNECTIONS,
+    API_MAX_KEEPALIVE,
+    API_KEEPALIVE_EXPIRY,
+    API_GET_RETRIES,
+)
+from .metrics import API_CLIENT_CONNECTIONS, API_CLIENT_DURATION
+
+logger = logging.getLogger(__name__)
+
+# Timeouts (segundos) por rota; rotas que fazem hash de senha ou montam o resumo são mais lentas
+ROUTE_TIMEOUTS = {
+    'users': 15.0,
+    'login': 15.0,
+    'summary': 10.0,
+}
+
+# Respostas que valem nova tentativa em requisições idempotentes
+RETRY_STATUSES = {502, 503, 504}
+RETRY_BASE_DELAY = 0.1
+
+
+class ApiClient:
+    """Cliente HTTP compartilhado (keep-alive) para as chamadas do bot à API."""
+
+    def __init__(self, base_url=API_BASE_URL, retries=API_GET_RETRIES):
+        self.retries = retries
+        self.stats = {'requests': 0, 'connections_opened': 0,
+                      'retries': 0, 'errors': 0}
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(API_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=API_MAX_CONNECTIONS,
+                max_keepalive_connections=API_MAX_KEEPALIVE,
+                keepalive_expiry=API_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    async def _trace(self, event, info):
+        # Chamado pelo httpcore; cada conexão TCP nova passa por connect_tcp
+        if event == 'connection.connect_tcp.complete':
+            self.stats['connections_opened'] += 1
+            API_CLIENT_CONNECTIONS.inc()
+
+    @staticmethod
+    def route_of(path):
+        return path.lstrip('/').split('/', 1)[0]
+
+    @classmethod
+    def timeout_for(cls, path):
+        return ROUTE_TIMEOUTS.get(cls.route_of(path), API_TIMEOUT)
+
+    async def request(self, method, path, **kwargs):
+        """Envia uma requisição; GETs são repetidos com backoff e jitter em falhas transitórias."""
+        kwargs.setdefault('timeout', self.timeout_for(path))
+        attempts = 1 + self.retries if method == 'GET' else 1
+        route = self.route_of(path)
+        for attempt in range(attempts):
+            self.stats['requests'] += 1
+            start = time.perf_counter()
+            try:
+                response = await self._client.request(
+                    method, path, extensions={'trace': self._trace}, **kwargs)
+            except httpx.TransportError as e:
+                API_CLIENT_DURATION.labels(method, route, type(e).__name__).observe(
+                    time.perf_counter() - start)
+                self.stats['errors'] += 1
+                if attempt == attempts - 1:
+                    raise
+            else:
+                API_CLIENT_DURATION.labels(method, route, str(response.status_code)).observe(
+                    time.perf_counter() - start)
+                if response.status_code not in RETRY_STATUSES or attempt == attempts - 1:
+                    return response
+            self.stats['retries'] += 1
+            await asyncio.sleep(random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt))
+
+    @asynccontextmanager
+    async def stream(self, method, path, **kwargs):
+        """Envia uma requisição cujo corpo é lido aos poucos (sem novas tentativas).
+
+        A duração registrada vai até a chegada dos cabeçalhos.
+        """
+        kwargs.setdefault('timeout', self.timeout_for(path))
+        route = self.route_of(path)
+        self.stats['requests'] += 1
+        start = time.perf_counter()
+        response = None
+        try:
+            async with self._client.stream(method, path, extensions={'trace': self._trace}, **kwargs) as response:
+                API_CLIENT_DURATION.labels(method, route, str(response.status_code)).observe(
+                    time.perf_counter() - start)
+                yield response
+        except httpx.TransportError as e:
+            self.stats['errors'] += 1
+            if response is None:
+                API_CLIENT_DURATION.labels(method, route, type(e).__name__).observe(
+                    time.perf_counter() - start)
+            raise
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request('POST', path, **kwargs)
+
+    @property
+    def reuse_rate(self):
+        """Fração das requisições atendidas por uma conexão já aberta."""
+        if not self.stats['requests']:
+            return 0.0
+        return 1 - self.stats['connections_opened'] / self.stats['requests']
+
+    async def aclose(self):
+        logger.info(
+            f"Closing API client: {self.stats['requests']} requests, "
+            f"{self.stats['connections_opened']} connections opened, "
+            f"reuse rate {self.reuse_rate:.1%}")
+        await self._client.aclose()
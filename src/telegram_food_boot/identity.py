@@ -0,0 +1,86 @@
+import time
+from collections import OrderedDict
+from .config import IDENTITY_CACHE_SIZE, IDENTITY_CACHE_TTL
+from .metrics import track_cache
+
+
+class TTLCache:
+    """Cache LRU limitado em que cada entrada pode ter seu próprio horário de expiração."""
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, expires_at=None):
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        return {'size': len(self._data), 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
+
+
+class IdentityCache:
+    """Caches de autenticação: token → claims, username → user_id e usuário do Telegram → token."""
+
+    def __init__(self, maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL):
+        # Claims valem até o "exp" do próprio token
+        self.token_claims = TTLCache(maxsize)
+        self.user_ids = TTLCache(maxsize, ttl)
+        self.telegram_tokens = TTLCache(maxsize, ttl)
+
+    def invalidate_user(self, username=None, telegram_id=None):
+        """Descarta as entradas de um usuário (após login, cadastro ou troca de token)."""
+        if username is not None:
+            self.user_ids.invalidate(username)
+        if telegram_id is not None:
+            token = self.telegram_tokens.get(telegram_id)
+            if token is not None:
+                self.token_claims.invalidate(token)
+            self.telegram_tokens.invalidate(telegram_id)
+
+    def stats(self):
+        return {
+            'token_claims': self.token_claims.stats(),
+            'user_ids': self.user_ids.stats(),
+            'telegram_tokens': self.telegram_tokens.stats(),
+        }
+
+
+_identity_cache = IdentityCache()
+for _name in ('token_claims', 'user_ids', 'telegram_tokens'):
+    track_cache(f'identity_{_name}', getattr(_identity_cache, _name).stats)
+
+
+def get_identity_cache():
+    """Retorna o cache de identidade do processo."""
+    return _identity_cache
@@ -0,0 +1,155 @@
+"""Interpreta mensagens com vários alimentos, como "almoço: arroz integral 150g, feijão 100g".
+
+Cada item é um nome de alimento com quantidade e unidade (g, ml ou kg),
+antes ou depois do nome; os nomes são resolvidos pelo índice de busca da
+tabela de alimentos. Quantidades sem unidade ("2 ovos") não são convertidas
+em gramas: ficam em ``ParsedMeal.needs_unit`` para o bot perguntar.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from .catalog import get_catalog
+from .search import fold, search_foods, tokenize
+
+# Palavras (sem acento) que indicam o tipo de refeição no início da mensagem
+MEAL_WORDS = {
+    'cafe da manha': 'breakfast',
+    'cafe': 'breakfast',
+    'desjejum': 'breakfast',
+    'almoco': 'lunch',
+    'jantar': 'dinner',
+    'janta': 'dinner',
+    'ceia': 'dinner',
+    'lanche': 'snack',
+}
+MEAL_LABELS = {'breakfast': 'café da manhã', 'lunch': 'almoço', 'dinner': 'jantar', 'snack': 'lanche'}
+
+# Alimento usado para um nome genérico ("leite", "frango"), quando a descrição
+# contém todas as palavras digitadas
+DEFAULT_FOODS = {
+    'arroz': 'Arroz, tipo 1, cozido',
+    'feijao': 'Feijão, carioca, cozido',
+    'frango': 'Frango, peito, sem pele, grelhado',
+    'carne': 'Carne, bovina, patinho, sem gordura, grelhado',
+    'leite': 'Leite, de vaca, integral',
+    'ovo': 'Ovo, de galinha, inteiro, cozido/10minutos',
+    'pao': 'Pão, trigo, francês',
+    'cafe': 'Café, infusão 10%',
+    'batata': 'Batata, inglesa, cozida',
+    'banana': 'Banana, prata, crua',
+    'queijo': 'Queijo, minas, frescal',
+    'iogurte': 'Iogurte, natural',
+}
+
+# Quem registra uma refeição comeu o alimento pronto: entre candidatos igualmente
+# próximos do nome digitado, preferimos as preparações às versões cruas
+PREPARED = {'cozido', 'cozida', 'grelhado', 'grelhada', 'assado', 'assada', 'frito', 'frita', 'refogado', 'refogada'}
+CANDIDATES = 10
+
+UNITS = {'g': 1, 'gr': 1, 'grama': 1, 'gramas': 1, 'ml': 1, 'kg': 1000}
+
+_PREFIX = re.compile(r'^\s*(' + '|'.join(sorted(MEAL_WORDS, key=len, reverse=True)) + r')\s*[:\-]\s*')
+# Vírgula entre dígitos é decimal ("1,5kg"), não separador
+_SEPARATORS = re.compile(r'[;\n+]|,(?!\d)|(?<!\d),|\s+e\s+')
+_QUANTITY = r'(?P<amount>\d+(?:[.,]\d+)?)\s*(?P<unit>' + '|'.join(sorted(UNITS, key=len, reverse=True)) + r')\b'
+_NAME_FIRST = re.compile(r'^(?P<name>.*?\D)\s*' + _QUANTITY + r'$')
+_QUANTITY_FIRST = re.compile(r'^' + _QUANTITY + r'\s*(?:de\s+)?(?P<name>.+)$')
+_NUMBER = re.compile(r'\d')
+
+
+@dataclass
+class ParsedMeal:
+    meal_type: str
+    items: list = field(default_factory=list)       # [(alimento, gramas)]
+    needs_unit: list = field(default_factory=list)  # trechos com número mas sem unidade
+    unresolved: list = field(default_factory=list)  # trechos sem alimento reconhecido
+
+
+def meal_type_for(hour):
+    """Tipo de refeição provável pelo horário, quando a mensagem não o informa."""
+    if hour < 10:
+        return 'breakfast'
+    if hour < 15:
+        return 'lunch'
+    if hour < 18:
+        return 'snack'
+    return 'dinner'
+
+
+def _split_item(part):
+    """Retorna (nome, gramas) de um trecho, ou None se não houver quantidade com unidade."""
+    match = _NAME_FIRST.match(part) or _QUANTITY_FIRST.match(part)
+    if not match:
+        return None
+    grams = float(match.group('amount').replace(',', '.')) * UNITS[match.group('unit')]
+    name = match.group('name').strip(' .:-')
+    return (name, grams) if name and grams > 0 else None
+
+
+def _stem(token):
+    """Singular aproximado, para "ovos" casar com "Ovo"."""
+    return token[:-1] if len(token) > 3 and token.endswith('s') else token
+
+
+_defaults = None
+
+
+def _default_foods():
+    global _defaults
+    catalog = get_catalog()
+    if _defaults is None or _defaults[0] is not catalog:
+        by_description = {food['description']: food for food in catalog}
+        _defaults = (catalog, {word: by_description[description] for word, description in DEFAULT_FOODS.items()
+                               if description in by_description})
+    return _defaults[1]
+
+
+def resolve_food(name):
+    """Alimento da tabela que melhor corresponde ao nome, ou None.
+
+    Os candidatos da busca são ordenados pela fração das palavras digitadas
+    que aparecem inteiras na descrição; só em caso de empate contam as
+    preparações. Sem nenhuma palavra inteira em comum, o nome não é resolvido.
+    """
+    words = [_stem(token) for token in tokenize(name)]
+    if not words:
+        return None
+    default = _default_foods().get(words[0])
+    if default is not None and set(words) <= {_stem(token) for token in tokenize(default['description'])}:
+        return default
+    best, best_key = None, None
+    for rank, food in enumerate(search_foods(name, CANDIDATES)):
+        tokens = tokenize(food['description'])
+        stems = {_stem(token) for token in tokens}
+        coverage = sum(word in stems for word in words) / len(words)
+        key = (coverage, bool(PREPARED & set(tokens)), -rank)
+        if coverage and (best_key is None or key > best_key):
+            best, best_key = food, key
+    return best
+
+
+def parse_meal_message(text, now=None):
+    """Interpreta a mensagem; retorna None se ela não parecer um registro de refeição."""
+    folded = fold(text)
+    prefix = _PREFIX.match(folded)
+    if prefix:
+        meal_type = MEAL_WORDS[prefix.group(1)]
+        folded = folded[prefix.end():]
+    else:
+        meal_type = meal_type_for((now or datetime.now()).hour)
+    parts = [part.strip(' .!') for part in _SEPARATORS.split(folded) if part.strip(' .!')]
+    parsed = ParsedMeal(meal_type)
+    for part in parts:
+        item = _split_item(part)
+        if item is None and _NUMBER.search(part):
+            parsed.needs_unit.append(part)
+            continue
+        food = resolve_food(item[0]) if item else None
+        if food:
+            parsed.items.append((food, item[1]))
+        else:
+            parsed.unresolved.append(part)
+    # Sem prefixo, só conta como refeição se algum trecho tiver alimento, quantidade e unidade
+    if not prefix and not parsed.items:
+        return None
+    return parsed
@@ -0,0 +1,311 @@
+"""Métricas do processo (contadores, gauges e histogramas) no formato texto do Prometheus.
+
+As métricas são atualizadas só pelo loop de eventos, então não há travas: um
+``observe`` custa uma busca binária nos limites dos buckets e dois incrementos.
+Cada processo (API e bot) expõe as suas em ``/metrics``.
+"""
+import math
+import re
+import time
+from bisect import bisect_left
+from functools import lru_cache
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Segundos; cobre de consultas SQLite (sub-ms) a chamadas HTTP lentas
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+
+    def labels(self, *values):
+        """Série com os valores de rótulo dados (na ordem de ``labelnames``)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines += [f'{name}{labels} {_format_value(value)}' for name, labels, value in self._samples()]
+        return '\n'.join(lines)
+
+
+class _CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for values, child in self._children.items():
+            yield f'{self.name}_total', _format_labels(self.labelnames, values), child.value
+
+
+class _GaugeChild:
+    __slots__ = ('value', 'function')
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set_function(self, function):
+        """Lê o valor de ``function()`` a cada coleta em vez de guardá-lo."""
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            try:
+                value = child.get()
+            except Exception:
+                continue  # a fonte do valor já foi encerrada
+            yield self.name, _format_labels(self.labelnames, values), value
+
+
+class _HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    """Context manager que observa a duração do bloco, em segundos."""
+    __slots__ = ('child', 'start')
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def _samples(self):
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f'{self.name}_bucket', _format_labels(self.labelnames, values, le), cumulative
+            labels = _format_labels(self.labelnames, values)
+            yield f'{self.name}_sum', labels, child.sum
+            yield f'{self.name}_count', labels, child.count
+
+
+class Registry:
+    """Conjunto de métricas de um processo."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Exposição em texto do Prometheus (versão 0.0.4)."""
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'nutribot_http_request_duration_seconds',
+    'Duração das requisições HTTP atendidas pela API, por rota.',
+    ('method', 'route', 'status'))
+BOT_HANDLER_DURATION = REGISTRY.histogram(
+    'nutribot_bot_handler_duration_seconds',
+    'Duração dos handlers de comandos, callbacks e mensagens do bot.',
+    ('handler', 'outcome'))
+DB_QUERY_DURATION = REGISTRY.histogram(
+    'nutribot_db_query_duration_seconds',
+    'Duração da execução de comandos SQL (sem a leitura das linhas), por comando e tabela.',
+    ('statement', 'table'))
+DB_ROWS = REGISTRY.counter(
+    'nutribot_db_rows',
+    'Linhas lidas (SELECT) ou afetadas (INSERT/UPDATE/DELETE), por comando e tabela.',
+    ('statement', 'table'))
+API_CLIENT_DURATION = REGISTRY.histogram(
+    'nutribot_api_client_request_duration_seconds',
+    'Duração das chamadas HTTP do bot à API, por tentativa.',
+    ('method', 'route', 'status'))
+API_CLIENT_CONNECTIONS = REGISTRY.counter(
+    'nutribot_api_client_connections_opened',
+    'Conexões TCP novas abertas pelo cliente HTTP do bot; o reuso é 1 - este valor / '
+    'nutribot_api_client_request_duration_seconds_count.')
+CACHE_STATS = REGISTRY.gauge(
+    'nutribot_cache',
+    'Caches em memória: entradas (size) e totais acumulados de hits, misses, evictions e invalidations.',
+    ('cache', 'stat'))
+BOT_PENDING_UPDATES = REGISTRY.gauge(
+    'nutribot_bot_pending_updates',
+    'Atualizações do Telegram recebidas e ainda não processadas.')
+WEBHOOK_UPDATES = REGISTRY.counter(
+    'nutribot_webhook_updates',
+    'Atualizações recebidas pelo webhook, aceitas na fila ou recusadas com 503.',
+    ('result',))
+UPDATE_QUEUE_WAIT = REGISTRY.histogram(
+    'nutribot_update_queue_wait_seconds',
+    'Tempo entre o recebimento de uma atualização e o início do seu processamento.')
+UPDATE_DEDUP = REGISTRY.counter(
+    'nutribot_update_dedup',
+    'Atualizações verificadas na deduplicação por update_id: novas ou reentregas descartadas.',
+    ('result',))
+UPDATE_DEDUP_ENTRIES = REGISTRY.gauge(
+    'nutribot_update_dedup_entries',
+    'update_ids lembrados pela deduplicação.')
+BOT_SCHEDULED_JOBS = REGISTRY.gauge(
+    'nutribot_bot_scheduled_jobs',
+    'Jobs agendados na job queue do bot.')
+SEND_QUEUE_DEPTH = REGISTRY.gauge(
+    'nutribot_send_queue_depth',
+    'Mensagens aguardando na fila de envio, por faixa de prioridade.',
+    ('lane',))
+
+SEND_LATENCY = REGISTRY.histogram(
+    'nutribot_send_latency_seconds',
+    'Tempo entre enfileirar um envio ao Telegram e a sua conclusão (esperas de taxa e novas tentativas incluídas), por faixa.',
+    ('lane',), buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0))
+SEND_RESULTS = REGISTRY.counter(
+    'nutribot_send_queue_results',
+    'Envios ao Telegram concluídos, por faixa e resultado (sent ou failed).',
+    ('lane', 'result'))
+SEND_RETRIES = REGISTRY.counter(
+    'nutribot_send_queue_retries',
+    'Envios recolocados na fila, por motivo (network ou retry_after).',
+    ('reason',))
+
+
+def render():
+    return REGISTRY.render()
+
+
+def track_cache(name, stats):
+    """Publica em CACHE_STATS cada valor do dicionário retornado por ``stats()``, lido a cada coleta."""
+    for stat in stats():
+        CACHE_STATS.labels(name, stat).set_function(lambda stat=stat: stats()[stat])
+
+
+_STATEMENT = re.compile(r'\s*(\w+)')
+_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?([A-Za-z_]\w*)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def statement_labels(sql):
+    """Comando e tabela principal de um SQL, para rotular métricas sem explodir a cardinalidade."""
+    statement = _STATEMENT.match(sql)
+    table = _TABLE.search(sql)
+    return (statement.group(1).upper() if statement else 'OTHER',
+            table.group(1).lower() if table else '')
@@ -0,0 +1,112 @@
+import logging
+from .aggregates import CREATE_DAILY_TOTALS, rebuild_daily_totals
+from .analytics import CREATE_FOOD_TABLE_VERSION
+from .summary_cache import CREATE_SUMMARY_VERSIONS
+
+logger = logging.getLogger(__name__)
+
+
+async def normalize_reminder_times(db):
+    """Reescreve horários como "9:00" no formato HH:MM, o único que o agendador consulta."""
+    async with db.execute('SELECT rowid, time FROM reminders') as cursor:
+        rows = await cursor.fetchall()
+    updates = []
+    for rowid, time in rows:
+        try:
+            hours, minutes = map(int, str(time).split(':'))
+        except ValueError:
+            logger.warning(f"Reminder {rowid} has invalid time {time!r}; it will never fire")
+            continue
+        normalized = f"{hours:02d}:{minutes:02d}"
+        if 0 <= hours <= 23 and 0 <= minutes <= 59 and normalized != time:
+            updates.append((normalized, rowid))
+    await db.executemany('UPDATE reminders SET time = ? WHERE rowid = ?', updates)
+
+# Cada migração é (versão, descrição, lista de passos). Um passo é um comando SQL
+# ou uma corrotina ``step(db)``. A versão aplicada fica em PRAGMA user_version;
+# novas migrações devem ser apenas acrescentadas.
+MIGRATIONS = [
+    (1, 'Esquema inicial', [
+        '''CREATE TABLE IF NOT EXISTS meals
+           (user_id INTEGER, meal_type TEXT, food_id INTEGER, quantity REAL, timestamp TEXT)''',
+        '''CREATE TABLE IF NOT EXISTS goals
+           (user_id INTEGER, nutrient TEXT, value REAL)''',
+        '''CREATE TABLE IF NOT EXISTS water
+           (user_id INTEGER, amount REAL, date TEXT)''',
+        '''CREATE TABLE IF NOT EXISTS calculations
+           (user_id INTEGER, type TEXT, result REAL, details TEXT, timestamp TEXT)''',
+        '''CREATE TABLE IF NOT EXISTS reminders
+           (user_id INTEGER, type TEXT, time TEXT)''',
+        '''CREATE TABLE IF NOT EXISTS users
+           (user_id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, password_hash TEXT)''',
+        '''CREATE TABLE IF NOT EXISTS user_tokens
+           (user_id INTEGER PRIMARY KEY, access_token TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (user_id))''',
+    ]),
+    (2, 'Índices por usuário e data; metas e lembretes únicos por usuário', [
+        'CREATE INDEX IF NOT EXISTS idx_meals_user_timestamp ON meals (user_id, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_water_user_date ON water (user_id, date)',
+        'CREATE INDEX IF NOT EXISTS idx_calculations_user_timestamp ON calculations (user_id, timestamp)',
+        # Remove duplicatas antigas (INSERT OR REPLACE sem chave única) mantendo a mais recente
+        '''DELETE FROM goals WHERE rowid NOT IN
+           (SELECT MAX(rowid) FROM goals GROUP BY user_id, nutrient)''',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_goals_user_nutrient ON goals (user_id, nutrient)',
+        '''DELETE FROM reminders WHERE rowid NOT IN
+           (SELECT MAX(rowid) FROM reminders GROUP BY user_id, type)''',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_reminders_user_type ON reminders (user_id, type)',
+    ]),
+    (3, 'Totais diários por usuário mantidos incrementalmente', [
+        CREATE_DAILY_TOTALS,
+        rebuild_daily_totals,
+    ]),
+    (4, 'Índice de lembretes por horário', [
+        'CREATE INDEX IF NOT EXISTS idx_reminders_time ON reminders (time)',
+    ]),
+    (5, 'Número de shards por usuário (usado no banco global)', [
+        '''CREATE TABLE IF NOT EXISTS shard_layout
+           (id INTEGER PRIMARY KEY CHECK (id = 1), shards INTEGER NOT NULL)''',
+    ]),
+    (6, 'update_ids do Telegram já aceitos, para descartar reentregas (usado no banco global)', [
+        '''CREATE TABLE IF NOT EXISTS processed_updates
+           (update_id INTEGER PRIMARY KEY, received_at REAL NOT NULL)''',
+        'CREATE INDEX IF NOT EXISTS idx_processed_updates_received_at ON processed_updates (received_at)',
+    ]),
+    (7, 'Versão da tabela de alimentos carregada em foods (recriada em init_db)', [
+        CREATE_FOOD_TABLE_VERSION,
+    ]),
+    (8, 'Versão dos resumos de cada usuário, incrementada a cada escrita', [
+        CREATE_SUMMARY_VERSIONS,
+    ]),
+    (9, 'Horários de lembretes em HH:MM', [
+        normalize_reminder_times,
+    ]),
+]
+
+
+async def get_schema_version(db):
+    """Retorna a versão do esquema gravada no banco."""
+    async with db.execute('PRAGMA user_version') as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def run_migrations(db, migrations=MIGRATIONS):
+    """Aplica, em ordem e cada uma em sua transação, as migrações pendentes."""
+    current = await get_schema_version(db)
+    for version, description, statements in migrations:
+        if version <= current:
+            continue
+        logger.info(f"Applying migration {version}: {description}")
+        await db.execute('BEGIN')
+        try:
+            for step in statements:
+                if callable(step):
+                    await step(db)
+                else:
+                    await db.execute(step)
+            await db.execute(f'PRAGMA user_version = {int(version)}')
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        current = version
+    return current
@@ -0,0 +1,54 @@
+import numpy as np
+from .food_store import get_food_store
+
+
+class NutrientMatrix:
+    """Matriz colunar (nutriente x alimento) com os valores por grama de cada alimento.
+
+    Cada linha de ``values`` é a coluna contígua de um nutriente para todos os
+    alimentos, de modo que somar refeições vira um único produto matriz-vetor.
+    Os arrays são lidos diretamente do arquivo colunar mapeado em memória.
+    """
+
+    def __init__(self, store):
+        self.fields = store.fields
+        self.field_index = store.field_index
+        self.row_of = store.row_of
+        self.values = store.values
+
+    def _columns(self, food_ids, grams):
+        """Converte ids em colunas da matriz; ids desconhecidos contam 0g."""
+        food_ids = np.asarray(food_ids, dtype=np.int64)
+        grams = np.asarray(grams, dtype=np.float64)
+        valid = (food_ids >= 0) & (food_ids < len(self.row_of))
+        cols = np.where(valid, self.row_of[np.where(valid, food_ids, 0)], -1)
+        known = cols >= 0
+        return np.where(known, cols, 0), np.where(known, grams, 0.0), known
+
+    def totals(self, food_ids, grams):
+        """Soma todos os nutrientes de pares paralelos (food_id, gramas)."""
+        cols, grams, _ = self._columns(food_ids, grams)
+        return self.values[:, cols] @ grams
+
+    def per_item(self, food_ids, grams):
+        """Retorna a matriz (nutriente x item) e a máscara de ids conhecidos."""
+        cols, grams, known = self._columns(food_ids, grams)
+        return self.values[:, cols] * grams, known
+
+    def as_dict(self, vector, fields=None):
+        """Converte um vetor de totais em dicionário {nutriente: valor}."""
+        if fields is None:
+            return dict(zip(self.fields, vector.tolist()))
+        return {field: float(vector[self.field_index[field]]) for field in fields}
+
+
+_matrix = None
+
+
+def get_matrix():
+    """Retorna a matriz de nutrientes do arquivo colunar compartilhado."""
+    global _matrix
+    store = get_food_store()
+    if _matrix is None or _matrix[0] is not store:
+        _matrix = (store, NutrientMatrix(store))
+    return _matrix[1]
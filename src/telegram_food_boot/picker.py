@@ -0,0 +1,75 @@
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from .catalog import get_catalog
+from .config import PICKER_PAGE_SIZE
+
+# callback_data do seletor (sempre bem abaixo do limite de 64 bytes do Telegram):
+#   "fp:<versão>"                   -> lista de categorias
+#   "fp:<versão>:<categoria>:<pág>" -> página de uma categoria (índices numéricos)
+#   "fp:-"                          -> indicador de página (sem ação)
+#   "food_<id>"                     -> alimento escolhido
+PREFIX = 'fp'
+NOOP = f'{PREFIX}:-'
+VERSION_LENGTH = 6
+
+
+class FoodPicker:
+    """Teclados inline do seletor de alimentos, montados uma única vez por versão do catálogo."""
+
+    def __init__(self, catalog, page_size=PICKER_PAGE_SIZE):
+        self.version = catalog.version[:VERSION_LENGTH]
+        self.root_data = f'{PREFIX}:{self.version}'
+        self.root = InlineKeyboardMarkup([
+            [InlineKeyboardButton(f"{category} ({len(catalog.in_category(category))})",
+                                  callback_data=self.page_data(index, 0))]
+            for index, category in enumerate(catalog.categories)
+        ])
+        self.pages = {}
+        for index, category in enumerate(catalog.categories):
+            foods = catalog.in_category(category)
+            total = max(1, -(-len(foods) // page_size))
+            for page in range(total):
+                keyboard = [[InlineKeyboardButton(food['description'], callback_data=f"food_{food['id']}")]
+                            for food in foods[page * page_size:(page + 1) * page_size]]
+                navigation = []
+                if page > 0:
+                    navigation.append(InlineKeyboardButton("‹", callback_data=self.page_data(index, page - 1)))
+                navigation.append(InlineKeyboardButton(f"{page + 1}/{total}", callback_data=NOOP))
+                if page < total - 1:
+                    navigation.append(InlineKeyboardButton("›", callback_data=self.page_data(index, page + 1)))
+                keyboard.append(navigation)
+                keyboard.append([InlineKeyboardButton("↩ Categorias", callback_data=self.root_data)])
+                self.pages[(index, page)] = InlineKeyboardMarkup(keyboard)
+
+    def page_data(self, category_index, page):
+        return f'{PREFIX}:{self.version}:{category_index}:{page}'
+
+    def keyboard(self, data):
+        """Retorna o teclado de um callback_data do seletor, ou None para o indicador de página.
+
+        Botões de uma versão anterior do catálogo voltam para a lista de categorias.
+        """
+        if data == NOOP:
+            return None
+        parts = data.split(':')
+        if len(parts) != 4 or parts[1] != self.version:
+            return self.root
+        try:
+            return self.pages.get((int(parts[2]), int(parts[3])), self.root)
+        except ValueError:
+            return self.root
+
+
+def is_picker_data(data):
+    return data is not None and data.startswith(PREFIX + ':')
+
+
+_picker = None
+
+
+def get_picker():
+    """Retorna o seletor do catálogo compartilhado."""
+    global _picker
+    catalog = get_catalog()
+    if _picker is None or _picker[0] is not catalog:
+        _picker = (catalog, FoodPicker(catalog))
+    return _picker[1]
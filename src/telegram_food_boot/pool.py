@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+import aiosqlite
+from aiosqlite.context import contextmanager
+from .aggregates import vec_add
+from .config import (
+    DB_PATH,
+    DB_POOL_SIZE,
+    DB_MMAP_SIZE,
+    DB_CACHE_SIZE_KB,
+    DB_STATEMENT_CACHE,
+    DB_HEALTH_CHECK_INTERVAL,
+)
+from .metrics import DB_QUERY_DURATION, DB_ROWS, statement_labels
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedCursor(aiosqlite.Cursor):
+    """Cursor que conta as linhas lidas em ``nutribot_db_rows_total``."""
+
+    def __init__(self, conn, cursor, labels):
+        super().__init__(conn, cursor)
+        self._rows = DB_ROWS.labels(*labels)
+
+    async def fetchone(self):
+        row = await super().fetchone()
+        if row is not None:
+            self._rows.inc()
+        return row
+
+    async def fetchmany(self, size=None):
+        rows = await super().fetchmany(size)
+        self._rows.inc(len(rows))
+        return rows
+
+    async def fetchall(self):
+        rows = await super().fetchall()
+        self._rows.inc(len(rows))
+        return rows
+
+
+class InstrumentedConnection(aiosqlite.Connection):
+    """Conexão aiosqlite que mede cada comando SQL (duração, linhas afetadas ou lidas)."""
+
+    async def _timed(self, method, sql, parameters):
+        labels = statement_labels(sql)
+        start = time.perf_counter()
+        cursor = await self._execute(method, sql, parameters)
+        DB_QUERY_DURATION.labels(*labels).observe(time.perf_counter() - start)
+        if cursor.rowcount > 0:
+            DB_ROWS.labels(*labels).inc(cursor.rowcount)
+        return InstrumentedCursor(self, cursor, labels)
+
+    @contextmanager
+    async def execute(self, sql, parameters=None):
+        return await self._timed(self._conn.execute, sql, [] if parameters is None else parameters)
+
+    @contextmanager
+    async def executemany(self, sql, parameters):
+        return await self._timed(self._conn.executemany, sql, parameters)
+
+
+def connect(path, **kwargs):
+    """Como ``aiosqlite.connect``, mas devolve uma ``InstrumentedConnection``."""
+    return InstrumentedConnection(lambda: sqlite3.connect(path, **kwargs), iter_chunk_size=64)
+
+
+class ConnectionPool:
+    """Pool de conexões SQLite de longa duração: um escritor e N leitores.
+
+    Todas as conexões usam WAL, então leitores não bloqueiam o escritor. O
+    cache de statements do sqlite3 (``cached_statements``) reaproveita as
+    consultas preparadas entre chamadas na mesma conexão.
+    """
+
+    def __init__(self, path=DB_PATH, size=DB_POOL_SIZE,
+                 health_check_interval=DB_HEALTH_CHECK_INTERVAL):
+        self.path = path
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self._writer = None
+        self._readers = None
+        self._write_lock = asyncio.Lock()
+        self._open_lock = asyncio.Lock()
+        self._last_checked = {}
+
+    @property
+    def is_open(self):
+        return self._writer is not None
+
+    async def _connect(self, read_only=False):
+        db = await connect(self.path, cached_statements=DB_STATEMENT_CACHE)
+        await db.execute('PRAGMA journal_mode=WAL')
+        await db.execute('PRAGMA synchronous=NORMAL')
+        await db.execute(f'PRAGMA mmap_size={int(DB_MMAP_SIZE)}')
+        await db.execute(f'PRAGMA cache_size={-int(DB_CACHE_SIZE_KB)}')
+        await db.execute('PRAGMA temp_store=MEMORY')
+        await db.execute('PRAGMA busy_timeout=5000')
+        if read_only:
+            await db.execute('PRAGMA query_only=ON')
+        else:
+            await db.create_function('vec_add', 2, vec_add, deterministic=True)
+        self._last_checked[id(db)] = time.monotonic()
+        return db
+
+    async def open(self):
+        """Abre as conexões do pool (chamadas repetidas não fazem nada)."""
+        async with self._open_lock:
+            if self.is_open:
+                return
+            self._writer = await self._connect()
+            self._readers = asyncio.Queue()
+            for _ in range(self.size):
+                self._readers.put_nowait(await self._connect(read_only=True))
+            logger.info(
+                f"Opened SQLite pool for {self.path} with 1 writer and {self.size} readers")
+
+    async def close(self):
+        """Fecha todas as conexões do pool."""
+        async with self._open_lock:
+            if not self.is_open:
+                return
+            async with self._write_lock:
+                await self._writer.close()
+                self._writer = None
+            while not self._readers.empty():
+                await self._readers.get_nowait().close()
+            self._readers = None
+            self._last_checked.clear()
+
+    async def _healthy(self, db, read_only=False):
+        """Verifica a conexão periodicamente e a recria se não responder."""
+        now = time.monotonic()
+        if now - self._last_checked.get(id(db), 0) < self.health_check_interval:
+            return db
+        try:
+            await db.execute('SELECT 1')
+            self._last_checked[id(db)] = now
+            return db
+        except Exception as e:
+            logger.warning(f"Replacing unhealthy SQLite connection: {e}")
+            self._last_checked.pop(id(db), None)
+            try:
+                await db.close()
+            except Exception:
+                pass
+            return await self._connect(read_only)
+
+    @asynccontextmanager
+    async def writer(self):
+        """Conexão exclusiva de escrita; transações pendentes são desfeitas em caso de erro."""
+        await self.open()
+        async with self._write_lock:
+            self._writer = await self._healthy(self._writer)
+            try:
+                yield self._writer
+            except BaseException:
+                if self._writer.in_transaction:
+                    await self._writer.rollback()
+                raise
+
+    @asynccontextmanager
+    async def reader(self):
+        """Conexão somente leitura emprestada do pool."""
+        await self.open()
+        db = await self._healthy(await self._readers.get(), read_only=True)
+        try:
+            yield db
+        finally:
+            self._readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def dedicated_reader(self):
+        """Conexão somente leitura aberta só para o chamador, para leituras longas fora do pool."""
+        db = await self._connect(read_only=True)
+        try:
+            yield db
+        finally:
+            self._last_checked.pop(id(db), None)
+            await db.close()
+
+    async def health_check(self):
+        """Executa SELECT 1 em todas as conexões livres e informa o estado do pool."""
+        await self.open()
+        async with self._write_lock:
+            self._last_checked[id(self._writer)] = 0
+            self._writer = await self._healthy(self._writer)
+        readers = []
+        while not self._readers.empty():
+            db = self._readers.get_nowait()
+            self._last_checked[id(db)] = 0
+            readers.append(await self._healthy(db, read_only=True))
+        for db in readers:
+            self._readers.put_nowait(db)
+        return {'path': self.path, 'writers': 1, 'readers': self.size,
+                'idle_readers': self._readers.qsize()}
+
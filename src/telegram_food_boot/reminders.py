@@ -0,0 +1,99 @@
+import logging
+from datetime import datetime, timedelta
+from functools import partial
+from .config import REMINDER_BATCH_SIZE, REMINDER_MAX_CATCHUP_MINUTES
+from .shards import get_router
+from .utils import translations
+
+logger = logging.getLogger(__name__)
+
+
+def reminder_text(reminder_type):
+    if reminder_type == 'meal_reminder':
+        return translations['pt']['reminder_meal']
+    return translations['pt']['reminder_water']
+
+
+class ReminderScheduler:
+    """Dispara os lembretes diários a cada minuto, lendo do banco o minuto corrente.
+
+    A tabela reminders, indexada por horário, funciona como a roda de tempo:
+    cada "balde" é o conjunto de linhas com o mesmo HH:MM. Nada é carregado
+    na inicialização e inclusões ou remoções valem a partir do minuto
+    seguinte, mesmo quando feitas pela API em outro processo.
+
+    ``send(user_id, text)`` apenas enfileira o envio e retorna um future: o
+    tique termina assim que os lembretes do minuto estão na fila, sem esperar
+    a entrega limitada pela taxa do Telegram.
+    """
+
+    def __init__(self, send, batch_size=REMINDER_BATCH_SIZE,
+                 max_catchup_minutes=REMINDER_MAX_CATCHUP_MINUTES):
+        self.send = send
+        self.batch_size = batch_size
+        self.max_catchup = timedelta(minutes=max_catchup_minutes)
+        self._last_minute = None
+        self.stats = {'ticks': 0, 'queued': 0, 'sent': 0, 'failed': 0, 'skipped_minutes': 0}
+
+    def start(self, job_queue):
+        """Agenda o tique de cada minuto no job queue do bot, alinhado ao início do minuto."""
+        now = datetime.now()
+        first = (now.replace(second=0, microsecond=0) + timedelta(minutes=1) - now).total_seconds()
+        return job_queue.run_repeating(self._job, interval=60, first=first, name='reminder_scheduler')
+
+    async def _job(self, context):
+        await self.tick(datetime.now())
+
+    def _due_minutes(self, now):
+        current = now.replace(second=0, microsecond=0)
+        if self._last_minute is None or current - self._last_minute > self.max_catchup:
+            if self._last_minute is not None:
+                skipped = int((current - self._last_minute) / timedelta(minutes=1)) - 1
+                self.stats['skipped_minutes'] += skipped
+                logger.warning(f"Reminder scheduler was late: skipping {skipped} minute(s) "
+                               f"after {self._last_minute:%H:%M}")
+            start = current
+        else:
+            start = self._last_minute + timedelta(minutes=1)
+        self._last_minute = max(current, self._last_minute or current)
+        minute = start
+        while minute <= current:
+            yield minute.strftime('%H:%M')
+            minute += timedelta(minutes=1)
+
+    async def tick(self, now):
+        """Enfileira os lembretes dos minutos vencidos desde o último tique (incluindo atrasos curtos)."""
+        self.stats['ticks'] += 1
+        for minute in list(self._due_minutes(now)):
+            await self.fire(minute)
+
+    async def fire(self, minute):
+        """Enfileira, em lotes, todos os lembretes marcados para HH:MM (em todos os shards)."""
+        for pool in get_router().shard_pools:
+            await self._fire_shard(pool, minute)
+
+    async def _fire_shard(self, pool, minute):
+        last_rowid = 0
+        while True:
+            # Paginação por rowid: a conexão de leitura não fica presa entre os lotes
+            async with pool.reader() as db:
+                async with db.execute('SELECT rowid, user_id, type FROM reminders WHERE time = ? AND rowid > ? ORDER BY rowid LIMIT ?',
+                                      (minute, last_rowid, self.batch_size)) as cursor:
+                    batch = await cursor.fetchall()
+            if not batch:
+                break
+            last_rowid = batch[-1][0]
+            for _, user_id, reminder_type in batch:
+                self.send(user_id, reminder_text(reminder_type)).add_done_callback(partial(self._delivered, user_id))
+            self.stats['queued'] += len(batch)
+            if len(batch) < self.batch_size:
+                break
+
+    def _delivered(self, user_id, future):
+        if future.cancelled():
+            self.stats['failed'] += 1
+        elif future.exception() is not None:
+            self.stats['failed'] += 1
+            logger.warning(f"Failed to send reminder to {user_id}: {future.exception()}")
+        else:
+            self.stats['sent'] += 1
@@ -0,0 +1,114 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from functools import lru_cache
+from .catalog import get_catalog
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Fração mínima de trigramas da consulta presentes no alimento para a busca aproximada
+MIN_TRIGRAM_SCORE = 0.5
+
+
+def fold(text):
+    """Normaliza um texto: remove acentos e converte para minúsculas."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    """Divide um texto normalizado em palavras."""
+    return TOKEN_RE.findall(fold(text))
+
+
+def trigrams(token):
+    """Retorna os trigramas de uma palavra (com bordas marcadas)."""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodSearchIndex:
+    """Índice em memória por prefixo e trigramas sobre descrição e categoria."""
+
+    def __init__(self, catalog, cache_size=1024):
+        self.foods = catalog.foods
+        self.postings = {}
+        self.trigram_postings = {}
+        self.description_tokens = []
+        for pos, food in enumerate(self.foods):
+            description = tokenize(food['description'])
+            self.description_tokens.append(description)
+            for token in set(description + tokenize(food['category'])):
+                self.postings.setdefault(token, set()).add(pos)
+        for token, positions in self.postings.items():
+            for gram in trigrams(token):
+                self.trigram_postings.setdefault(gram, set()).update(positions)
+        self.tokens = sorted(self.postings)
+        self.search = lru_cache(maxsize=cache_size)(self._search)
+
+    def _prefix_matches(self, token):
+        """Retorna {posição: pontos} dos alimentos com alguma palavra iniciada por token."""
+        matches = {}
+        i = bisect_left(self.tokens, token)
+        while i < len(self.tokens) and self.tokens[i].startswith(token):
+            points = 2 if self.tokens[i] == token else 1
+            for pos in self.postings[self.tokens[i]]:
+                if matches.get(pos, 0) < points:
+                    matches[pos] = points
+            i += 1
+        return matches
+
+    def _prefix_search(self, tokens):
+        scores = None
+        for token in tokens:
+            matches = self._prefix_matches(token)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {pos: scores[pos] + points
+                          for pos, points in matches.items() if pos in scores}
+            if not scores:
+                return {}
+        for pos in scores:
+            # Prioriza alimentos cuja descrição começa com o primeiro termo
+            description = self.description_tokens[pos]
+            if description and description[0].startswith(tokens[0]):
+                scores[pos] += 1
+        return scores
+
+    def _trigram_search(self, tokens):
+        query_grams = set()
+        for token in tokens:
+            query_grams |= trigrams(token)
+        hits = {}
+        for gram in query_grams:
+            for pos in self.trigram_postings.get(gram, ()):
+                hits[pos] = hits.get(pos, 0) + 1
+        return {pos: count / len(query_grams) for pos, count in hits.items()
+                if count / len(query_grams) >= MIN_TRIGRAM_SCORE}
+
+    def _search(self, query, limit=10):
+        tokens = tokenize(query)
+        if not tokens:
+            return ()
+        scores = self._prefix_search(tokens) or self._trigram_search(tokens)
+        ranked = sorted(scores, key=lambda pos: (-scores[pos],
+                        len(self.foods[pos]['description']), pos))
+        return tuple(self.foods[pos] for pos in ranked[:limit])
+
+
+_index = None
+
+
+def get_search_index():
+    """Retorna o índice de busca do catálogo compartilhado."""
+    global _index
+    catalog = get_catalog()
+    if _index is None or _index[0] is not catalog:
+        _index = (catalog, FoodSearchIndex(catalog))
+    return _index[1]
+
+
+def search_foods(query, limit=10):
+    """Busca alimentos por nome ou categoria, ignorando acentos."""
+    return get_search_index().search(query.strip().lower(), limit)
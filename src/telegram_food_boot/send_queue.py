@@ -0,0 +1,276 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+from datetime import timedelta
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+from .config import (
+    SEND_GLOBAL_RATE,
+    SEND_CHAT_RATE,
+    SEND_CHAT_BURST,
+    SEND_CONCURRENCY,
+    SEND_MAX_RETRIES,
+)
+from .metrics import SEND_LATENCY, SEND_RESULTS, SEND_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Faixas de prioridade (menor sai primeiro)
+INTERACTIVE, NOTIFICATION, BROADCAST = 0, 1, 2
+LANES = {INTERACTIVE: 'interactive', NOTIFICATION: 'notification', BROADCAST: 'broadcast'}
+
+RETRY_BASE_DELAY = 0.5
+CHAT_BUCKET_PRUNE_INTERVAL = 60
+
+
+class TokenBucket:
+    """Balde de fichas: ``rate`` fichas por segundo, acumulando até ``capacity``."""
+
+    def __init__(self, rate, capacity, now=0.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now):
+        """Segundos até haver uma ficha disponível (0 se já houver)."""
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, until):
+        """Suspende o balde até ``until`` (após um RetryAfter do Telegram)."""
+        self.blocked_until = max(self.blocked_until, until)
+        self.tokens = 0
+
+    def is_idle(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+
+class _Job:
+    __slots__ = ('chat_id', 'operation', 'priority', 'future', 'enqueued', 'attempts')
+
+    def __init__(self, chat_id, operation, priority, future, enqueued):
+        self.chat_id = chat_id
+        self.operation = operation
+        self.priority = priority
+        self.future = future
+        self.enqueued = enqueued
+        self.attempts = 0
+
+
+class SendQueue:
+    """Fila de saída para a API do Telegram com prioridades e limites de taxa.
+
+    Cada envio é uma função ``operation()`` assíncrona sem argumentos (por
+    exemplo ``partial(bot.send_message, chat_id=..., text=...)``). A fila
+    respeita um balde global e um balde por chat; respostas interativas
+    passam à frente de lembretes e difusões. Um RetryAfter suspende o balde
+    global pelo tempo pedido e recoloca o envio na fila; falhas de rede são
+    repetidas com backoff. Quem envia recebe o resultado (ou a exceção) do
+    próprio envio.
+    """
+
+    def __init__(self, global_rate=SEND_GLOBAL_RATE, chat_rate=SEND_CHAT_RATE,
+                 chat_burst=SEND_CHAT_BURST, concurrency=SEND_CONCURRENCY,
+                 max_retries=SEND_MAX_RETRIES):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        # Sem rajada global: no máximo global_rate envios em qualquer janela de 1s
+        self._global = TokenBucket(global_rate, 1)
+        self._chats = {}
+        self._ready = []
+        self._delayed = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks = set()
+        self._task = None
+        self._pending = 0
+        self._last_prune = 0.0
+        self._depth = dict.fromkeys(LANES, 0)
+        self.counters = {'sent': 0, 'failed': 0, 'retries': 0, 'retry_after': 0}
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def submit_nowait(self, chat_id, operation, priority=INTERACTIVE):
+        """Enfileira um envio e retorna o future com o seu resultado."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        job = _Job(chat_id, operation, priority, loop.create_future(), loop.time())
+        self._pending += 1
+        self._idle.clear()
+        self._push(job)
+        return job.future
+
+    async def submit(self, chat_id, operation, priority=INTERACTIVE):
+        """Enfileira um envio e aguarda o seu resultado."""
+        return await self.submit_nowait(chat_id, operation, priority)
+
+    def _push(self, job, ready_at=None):
+        self._depth[job.priority] += 1
+        if ready_at is None:
+            heapq.heappush(self._ready, (job.priority, next(self._seq), job))
+        else:
+            heapq.heappush(self._delayed, (ready_at, job.priority, next(self._seq), job))
+        self._wakeup.set()
+
+    def _chat_bucket(self, chat_id, now):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+        return bucket
+
+    def _prune_chats(self, now):
+        if now - self._last_prune < CHAT_BUCKET_PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        for chat_id in [chat_id for chat_id, bucket in self._chats.items() if bucket.is_idle(now)]:
+            del self._chats[chat_id]
+
+    async def _wait(self, timeout):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            while self._delayed and self._delayed[0][0] <= now:
+                _, priority, seq, job = heapq.heappop(self._delayed)
+                heapq.heappush(self._ready, (priority, seq, job))
+            if not self._ready:
+                self._prune_chats(now)
+                await self._wait(self._delayed[0][0] - now if self._delayed else None)
+                continue
+            wait = self._global.wait_time(now)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            priority, seq, job = heapq.heappop(self._ready)
+            if job.future.cancelled():
+                # Quem pediu o envio desistiu antes da vez dele
+                self._depth[priority] -= 1
+                self._done()
+                continue
+            bucket = self._chat_bucket(job.chat_id, now)
+            chat_wait = bucket.wait_time(now)
+            if chat_wait > 0:
+                # Chat sem fichas: adia só este envio, mantendo a ordem dentro do chat
+                heapq.heappush(self._delayed, (now + chat_wait, priority, seq, job))
+                continue
+            await self._slots.acquire()
+            now = loop.time()
+            self._global.consume(now)
+            bucket.consume(now)
+            self._depth[priority] -= 1
+            task = asyncio.create_task(self._send(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, job):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await job.operation()
+        except RetryAfter as e:
+            delay = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else float(e.retry_after)
+            logger.warning(f"Telegram flood control: pausing sends for {delay:.1f}s")
+            self.counters['retry_after'] += 1
+            SEND_RETRIES.labels('retry_after').inc()
+            until = loop.time() + delay
+            self._global.block(until)
+            self._push(job, until)
+        except (BadRequest, TimedOut) as e:
+            # Requisição inválida, ou que pode ter sido entregue: não repete
+            self._finish(job, error=e)
+        except NetworkError as e:
+            if job.attempts >= self.max_retries:
+                self._finish(job, error=e)
+            else:
+                job.attempts += 1
+                self.counters['retries'] += 1
+                SEND_RETRIES.labels('network').inc()
+                delay = random.uniform(0, RETRY_BASE_DELAY * 2 ** job.attempts)
+                self._push(job, loop.time() + delay)
+        except Exception as e:
+            self._finish(job, error=e)
+        else:
+            self._finish(job, result=result)
+        finally:
+            self._slots.release()
+
+    def _finish(self, job, result=None, error=None):
+        lane = LANES[job.priority]
+        SEND_LATENCY.labels(lane).observe(asyncio.get_running_loop().time() - job.enqueued)
+        if error is not None:
+            self.counters['failed'] += 1
+            SEND_RESULTS.labels(lane, 'failed').inc()
+            if not job.future.done():
+                job.future.set_exception(error)
+        else:
+            self.counters['sent'] += 1
+            SEND_RESULTS.labels(lane, 'sent').inc()
+            if not job.future.done():
+                job.future.set_result(result)
+        self._done()
+
+    def _done(self):
+        self._pending -= 1
+        if not self._pending:
+            self._idle.set()
+
+    def depth(self, priority):
+        """Envios aguardando na faixa ``priority``."""
+        return self._depth[priority]
+
+    def stats(self):
+        """Profundidade por faixa, envios em andamento e contadores (a latência fica em SEND_LATENCY)."""
+        return {
+            'depth': {LANES[priority]: depth for priority, depth in self._depth.items()},
+            'in_flight': len(self._tasks),
+            'chats': len(self._chats),
+            **self.counters,
+        }
+
+    async def stop(self, timeout=10):
+        """Aguarda os envios pendentes (até ``timeout`` segundos) e encerra a fila."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping {self._pending} pending Telegram sends on shutdown")
+        self._task.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(self._task, *self._tasks, return_exceptions=True)
+        for _, _, job in self._ready:
+            job.future.cancel()
+        for _, _, _, job in self._delayed:
+            job.future.cancel()
+        self._task = None
+        logger.info(f"Send queue stats: {self.stats()}")
@@ -0,0 +1,238 @@
+from datetime import datetime, timedelta
+from functools import partial
+from . import analytics, export
+from .database import (
+    save_meal,
+    save_meals,
+    save_water,
+    save_goal,
+    save_calculation,
+    save_reminder,
+    get_water_total,
+    get_daily_summary,
+    get_read_connection,
+)
+from .writer import get_writer
+from .food_store import get_food_store
+from .summary_cache import get_summary_cache, get_summary_version
+from .utils import translations, calculate_imc, calculate_tmb, calculate_tdee, calculate_fat_percentage
+
+ACTIVITY_LABELS = {
+    'sedentary': 'Sedentário (pouco ou nenhum exercício)',
+    'light': 'Leve (exercício leve 1-3 dias/semana)',
+    'moderate': 'Moderado (exercício moderado 3-5 dias/semana)',
+    'active': 'Ativo (exercício intenso 6-7 dias/semana)',
+    'very_active': 'Muito Ativo (exercício muito intenso ou trabalho físico)'
+}
+
+# Itens aceitos em um único registro de refeições em lote
+MAX_BATCH_MEALS = 50
+
+# Período padrão das estatísticas, terminando hoje
+DEFAULT_STATS_DAYS = 30
+
+TIPS = [
+    "🌾 Inclua grãos integrais como aveia para mais fibras!",
+    "🥜 Nozes como amêndoas são ótimas para gorduras saudáveis.",
+    "💧 Mantenha-se hidratado: busque 2L de água por dia.",
+    "🌱 Experimente adicionar soja para proteína vegetal."
+]
+
+
+class ServiceError(Exception):
+    """Erro de validação das regras de negócio (mapeado para HTTP 400 na API)."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+async def _save_calculation(user_id, calc_type, result, details):
+    await get_writer(user_id).submit(partial(save_calculation, user_id, calc_type, result, details, commit=False))
+    # O resumo de qualquer dia mostra os últimos cálculos
+    get_summary_cache().invalidate(user_id)
+
+
+def today():
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+def nutrient_display(nutrient):
+    return nutrient.replace('_g', ' (g)').replace('energy_kcal', 'Calorias (kcal)')
+
+
+async def record_meal(user_id, meal_type, food_id, quantity):
+    """Registra uma refeição."""
+    await get_writer(user_id).submit(partial(save_meal, user_id, meal_type, food_id, quantity, commit=False))
+    get_summary_cache().invalidate(user_id, today())
+    return translations['pt']['meal_registered']
+
+
+async def record_meals(user_id, items):
+    """Registra várias refeições ``(meal_type, food_id, quantity)`` em uma única transação."""
+    if not items:
+        raise ServiceError("Informe ao menos um alimento.")
+    if len(items) > MAX_BATCH_MEALS:
+        raise ServiceError(f"Máximo de {MAX_BATCH_MEALS} alimentos por registro.")
+    store = get_food_store()
+    for _, food_id, quantity in items:
+        if store.column(food_id) < 0:
+            raise ServiceError(f"Alimento {food_id} não encontrado.")
+        if quantity <= 0:
+            raise ServiceError(translations['pt']['positive_number'])
+    await get_writer(user_id).submit(partial(save_meals, user_id, list(items), commit=False))
+    get_summary_cache().invalidate(user_id, today())
+    return translations['pt']['meals_registered'].format(count=len(items))
+
+
+async def record_water(user_id, amount):
+    """Registra consumo de água e retorna a mensagem com o total do dia."""
+    if amount <= 0:
+        raise ServiceError(translations['pt']['positive_number'])
+    await get_writer(user_id).submit(partial(save_water, user_id, amount, commit=False))
+    get_summary_cache().invalidate(user_id, today())
+    async with get_read_connection(user_id) as db:
+        total = await get_water_total(user_id, today(), db)
+    return translations['pt']['water_added'].format(amount=f"{amount:g}", total=f"{total:g}")
+
+
+async def set_goal(user_id, nutrient, value):
+    """Define (ou substitui) uma meta nutricional."""
+    await get_writer(user_id).submit(partial(save_goal, user_id, nutrient, value, commit=False))
+    get_summary_cache().invalidate(user_id)
+    return translations['pt']['goal_set'].format(nutrient=nutrient_display(nutrient), value=value)
+
+
+async def perform_calculation(user_id, calc_type, weight, height=None, age=None, gender=None, activity_level=None):
+    """Calcula IMC, TMB, TDEE ou percentual de gordura e salva o resultado."""
+    if calc_type == "imc":
+        if not height:
+            raise ServiceError("Altura é obrigatória para IMC")
+        imc, category, interpretation = calculate_imc(weight, height)
+        await _save_calculation(user_id, "IMC", imc, f"Peso: {weight}kg, Altura: {height}cm, Categoria: {category}")
+        return translations['pt']['imc_result'].format(imc=imc, category=category, interpretation=interpretation)
+    elif calc_type in ["tmb", "tdee"]:
+        if not all([height, age, gender]):
+            raise ServiceError(
+                "Altura, idade e sexo são obrigatórios para TMB/TDEE")
+        tmb = calculate_tmb(weight, height, age, gender)
+        if calc_type == "tmb":
+            await _save_calculation(user_id, "TMB", tmb, f"Peso: {weight}kg, Altura: {height}cm, Idade: {age} anos, Sexo: {gender}")
+            return translations['pt']['tmb_result'].format(tmb=tmb)
+        if activity_level not in ACTIVITY_LABELS:
+            raise ServiceError("Nível de atividade é obrigatório para TDEE")
+        tdee = calculate_tdee(tmb, activity_level)
+        await _save_calculation(user_id, "TDEE", tdee, f"Peso: {weight}kg, Altura: {height}cm, Idade: {age} anos, Sexo: {gender}, Nível de Atividade: {ACTIVITY_LABELS[activity_level]}")
+        return translations['pt']['tdee_result'].format(tdee=tdee, activity_level=ACTIVITY_LABELS[activity_level])
+    elif calc_type == "fat":
+        if not all([age, gender]):
+            raise ServiceError(
+                "Idade e sexo são obrigatórios para percentual de gordura")
+        imc, _, _ = calculate_imc(weight, height or 170)  # Altura padrão se não fornecida
+        fat = calculate_fat_percentage(imc, age, gender)
+        await _save_calculation(user_id, "Fat Percentage", fat, f"Peso: {weight}kg, Idade: {age} anos, Sexo: {gender}")
+        return translations['pt']['fat_percentage_result'].format(fat=fat)
+    raise ServiceError("Tipo de cálculo inválido")
+
+
+async def set_reminder(user_id, reminder_type, time):
+    """Configura um lembrete diário no formato HH:MM."""
+    try:
+        hours, minutes = map(int, time.split(':'))
+    except ValueError:
+        raise ServiceError(translations['pt']['invalid_time'])
+    if not (0 <= hours <= 23 and 0 <= minutes <= 59):
+        raise ServiceError(translations['pt']['invalid_time'])
+    time = f"{hours:02d}:{minutes:02d}"
+    await get_writer(user_id).submit(partial(save_reminder, user_id, reminder_type, time, commit=False))
+    return translations['pt']['reminder_set'].format(
+        type='Refeição' if reminder_type == 'meal_reminder' else 'Água',
+        time=time
+    )
+
+
+async def get_summary_entry(user_id, date=None):
+    """Retorna (etag, resumo) do dia (hoje, se date não for informado), usando o cache."""
+    date = date or today()
+    cache = get_summary_cache()
+    async with get_read_connection(user_id) as db:
+        # A versão é lida antes do resumo: uma escrita entre as duas leituras
+        # só faz a próxima consulta recalcular
+        version = await get_summary_version(db, user_id)
+        entry = cache.get(user_id, date, version)
+        if entry is not None:
+            return entry
+        summary = await get_daily_summary(user_id, date, db)
+    return cache.set(user_id, date, summary, version), summary
+
+
+async def get_summary(user_id, date=None):
+    """Retorna o resumo nutricional do dia (hoje, se date não for informado)."""
+    _, summary = await get_summary_entry(user_id, date)
+    return summary
+
+
+async def get_stats(user_id, start_date=None, end_date=None, bucket='day'):
+    """Estatísticas por dia, semana ou mês entre duas datas YYYY-MM-DD (inclusive)."""
+    if bucket not in analytics.BUCKETS:
+        raise ServiceError(f"Agrupamento inválido: use {', '.join(analytics.BUCKETS)}.")
+    try:
+        end = datetime.strptime(end_date or today(), '%Y-%m-%d')
+        start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else end - timedelta(days=DEFAULT_STATS_DAYS - 1)
+    except ValueError:
+        raise ServiceError("Datas devem estar no formato AAAA-MM-DD.")
+    if start > end:
+        raise ServiceError("A data inicial deve ser anterior à final.")
+    if (end - start).days >= analytics.MAX_RANGE_DAYS:
+        raise ServiceError(f"O período máximo é de {analytics.MAX_RANGE_DAYS} dias.")
+    async with get_read_connection(user_id) as db:
+        return await analytics.get_stats(user_id, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'), bucket, db)
+
+
+class ExportStream:
+    """Blocos de texto de uma exportação, começando pelo bloco já lido.
+
+    O gerador da exportação segura uma vaga e uma conexão desde o primeiro
+    bloco; quem recebe o stream deve chamar aclose(), mesmo sem iterá-lo.
+    """
+
+    def __init__(self, first, chunks):
+        self._first = first
+        self._chunks = chunks
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._first is not None:
+            first, self._first = self._first, None
+            return first
+        return await anext(self._chunks)
+
+    async def aclose(self):
+        self._first = None
+        await self._chunks.aclose()
+
+
+async def export_history(user_id, fmt='ndjson'):
+    """Retorna o ExportStream (texto em blocos) do histórico de refeições em NDJSON ou CSV.
+
+    O primeiro bloco é lido aqui, para que a falta de vaga para exportar vire
+    um erro antes de a resposta começar.
+    """
+    if fmt not in export.FORMATS:
+        raise ServiceError(f"Formato inválido: use {', '.join(export.FORMATS)}.")
+    chunks = export.stream_export(user_id, fmt)
+    try:
+        first = await anext(chunks)
+    except StopAsyncIteration:
+        first = ''
+    except export.ExportBusyError:
+        raise ServiceError("Muitas exportações em andamento; tente novamente em instantes.", 503)
+    return ExportStream(first, chunks)
+
+
+def get_tip():
+    """Retorna a dica do dia."""
+    return TIPS[datetime.now().day % len(TIPS)]
@@ -0,0 +1,230 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sys
+from collections import defaultdict
+import aiosqlite
+from .config import DB_PATH, DB_SHARDS, DB_SHARD_PATH
+from .migrations import run_migrations
+from .pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Tabelas particionadas por user_id; users e user_tokens ficam sempre no banco global
+USER_TABLES = ('meals', 'water', 'goals', 'calculations', 'reminders', 'daily_totals', 'summary_versions')
+RESHARD_CHUNK = 10000
+
+
+def shard_paths(count=DB_SHARDS, pattern=DB_SHARD_PATH):
+    """Arquivos dos shards por usuário (lista vazia quando não há sharding)."""
+    return [pattern.format(n=n) for n in range(count)]
+
+
+def shard_index(user_id, count):
+    """Shard de um usuário: hash estável do user_id (independe de PYTHONHASHSEED)."""
+    digest = hashlib.blake2b(str(int(user_id)).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') % count
+
+
+async def get_layout(db):
+    """Número de shards gravado no banco global (None se ainda não registrado)."""
+    async with db.execute('SELECT shards FROM shard_layout WHERE id = 1') as cursor:
+        row = await cursor.fetchone()
+    return row[0] if row else None
+
+
+async def set_layout(db, count):
+    await db.execute('INSERT INTO shard_layout (id, shards) VALUES (1, ?) ON CONFLICT (id) DO UPDATE SET shards = excluded.shards',
+                     (count,))
+
+
+async def check_layout(db, count):
+    """Registra o número de shards na primeira execução e recusa uma configuração divergente."""
+    current = await get_layout(db)
+    if current is None:
+        await set_layout(db, count)
+        await db.commit()
+    elif current != count:
+        raise RuntimeError(
+            f"DB_SHARDS={count}, mas os dados estão em {current} shard(s). "
+            f"Rode: python -m src.telegram_food_boot.shards reshard {count}")
+
+
+class ShardRouter:
+    """Encaminha cada usuário ao pool do seu shard; users e user_tokens ficam no pool global.
+
+    Cada shard tem seu próprio escritor (e trava de escrita), então escritas
+    de usuários em shards diferentes não se serializam.
+    """
+
+    def __init__(self, global_path=DB_PATH, paths=None):
+        paths = shard_paths() if paths is None else paths
+        self.global_pool = ConnectionPool(global_path)
+        # Sem shards, as tabelas por usuário ficam no próprio banco global
+        self.shard_pools = [ConnectionPool(path) for path in paths] or [self.global_pool]
+
+    @property
+    def sharded(self):
+        return self.shard_pools[0] is not self.global_pool
+
+    @property
+    def pools(self):
+        """Todos os pools distintos (global primeiro)."""
+        return [self.global_pool] + (self.shard_pools if self.sharded else [])
+
+    def pool_for(self, user_id=None):
+        """Pool do shard do usuário; sem user_id, o pool global."""
+        if user_id is None:
+            return self.global_pool
+        if len(self.shard_pools) == 1:
+            return self.shard_pools[0]
+        return self.shard_pools[shard_index(user_id, len(self.shard_pools))]
+
+    async def open(self):
+        for pool in self.pools:
+            await pool.open()
+
+    async def verify_layout(self):
+        """Confere (e na primeira execução registra) o número de shards no banco global.
+
+        A API e o bot chamam ao iniciar, para que nenhum dos dois leia ou
+        grave com um DB_SHARDS diferente do usado nos dados.
+        """
+        async with self.global_pool.writer() as db:
+            await check_layout(db, len(self.shard_pools) if self.sharded else 0)
+
+    async def close(self):
+        for pool in self.pools:
+            await pool.close()
+
+    async def health_check(self):
+        status = await self.global_pool.health_check()
+        if self.sharded:
+            status['shards'] = [await pool.health_check() for pool in self.shard_pools]
+        return status
+
+
+_router = None
+
+
+def get_router():
+    """Retorna o roteador de shards do processo."""
+    global _router
+    if _router is None:
+        _router = ShardRouter()
+    return _router
+
+
+async def close_router():
+    """Fecha todos os pools do roteador compartilhado, se existir."""
+    global _router
+    if _router is not None:
+        await _router.close()
+        _router = None
+
+
+async def _copy_table(source, targets, table):
+    async with source.execute(f'PRAGMA table_info({table})') as cursor:
+        columns = [row[1] for row in await cursor.fetchall()]
+    user_column = columns.index('user_id')
+    insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    copied = 0
+    async with source.execute(f"SELECT {', '.join(columns)} FROM {table}") as cursor:
+        while True:
+            rows = await cursor.fetchmany(RESHARD_CHUNK)
+            if not rows:
+                break
+            batches = defaultdict(list)
+            for row in rows:
+                batches[shard_index(row[user_column], len(targets)) if len(targets) > 1 else 0].append(row)
+            for index, batch in batches.items():
+                await targets[index].executemany(insert, batch)
+            copied += len(rows)
+    return copied
+
+
+async def _checkpoint(path):
+    """Descarrega o WAL no arquivo principal antes de movê-lo."""
+    async with aiosqlite.connect(path) as db:
+        await db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+async def reshard(count, global_path=DB_PATH, pattern=DB_SHARD_PATH):
+    """Redistribui as tabelas por usuário para ``count`` shards (0 = tudo no banco global).
+
+    Ferramenta offline: pare o bot e a API antes. Os arquivos novos são
+    montados ao lado dos atuais (``.reshard``) e conferidos por contagem; os
+    shards antigos são preservados com a extensão ``.bak``.
+    """
+    async with aiosqlite.connect(global_path) as db:
+        await run_migrations(db)
+        current = await get_layout(db)
+    current = DB_SHARDS if current is None else current
+    if current == count:
+        logger.info(f"Data is already in {count} shard(s)")
+        return
+    old_paths = shard_paths(current, pattern) or [global_path]
+    new_paths = shard_paths(count, pattern) or [global_path]
+    staging = [f"{path}.reshard" for path in new_paths]
+
+    targets = []
+    try:
+        for path in staging:
+            if os.path.exists(path):
+                os.remove(path)
+            db = await aiosqlite.connect(path)
+            targets.append(db)
+            await run_migrations(db)
+            await db.execute('BEGIN')
+        copied = defaultdict(int)
+        for path in old_paths:
+            if not os.path.exists(path):
+                continue
+            async with aiosqlite.connect(path) as source:
+                for table in USER_TABLES:
+                    copied[table] += await _copy_table(source, targets, table)
+        for db in targets:
+            await db.commit()
+        for table in USER_TABLES:
+            total = 0
+            for db in targets:
+                async with db.execute(f'SELECT COUNT(*) FROM {table}') as cursor:
+                    total += (await cursor.fetchone())[0]
+            if total != copied[table]:
+                raise RuntimeError(f"Reshard check failed for {table}: copied {copied[table]}, found {total}")
+    finally:
+        for db in targets:
+            await db.close()
+
+    # Troca: shards antigos viram .bak e os novos assumem os nomes definitivos
+    for path in old_paths:
+        if path != global_path and os.path.exists(path):
+            await _checkpoint(path)
+            os.replace(path, f"{path}.bak")
+    async with aiosqlite.connect(global_path) as db:
+        if global_path in new_paths:
+            await db.execute('ATTACH DATABASE ? AS staged', (staging[0],))
+        for table in USER_TABLES:
+            if global_path in old_paths or global_path in new_paths:
+                await db.execute(f'DELETE FROM {table}')
+            if global_path in new_paths:
+                await db.execute(f'INSERT INTO {table} SELECT * FROM staged.{table}')
+        await set_layout(db, count)
+        await db.commit()
+        if global_path in new_paths:
+            await db.execute('DETACH DATABASE staged')
+    for path, staged in zip(new_paths, staging):
+        if path == global_path:
+            os.remove(staged)
+        else:
+            os.replace(staged, path)
+    logger.info(f"Resharded {dict(copied)} rows from {current} to {count} shard(s)")
+
+
+if __name__ == '__main__':
+    # Uso: python -m src.telegram_food_boot.shards reshard <N>
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 3 or sys.argv[1] != 'reshard' or not sys.argv[2].isdigit():
+        sys.exit("Uso: python -m src.telegram_food_boot.shards reshard <N>")
+    asyncio.run(reshard(int(sys.argv[2])))
@@ -0,0 +1,112 @@
+import hashlib
+import json
+from collections import OrderedDict, defaultdict
+from .config import SUMMARY_CACHE_SIZE
+from .metrics import track_cache
+
+# Versão dos dados de resumo de cada usuário, incrementada na mesma transação
+# de cada escrita (refeições, água, metas, cálculos). Fica no banco do usuário
+# para valer entre processos: o bot e a API têm caches próprios.
+CREATE_SUMMARY_VERSIONS = '''CREATE TABLE IF NOT EXISTS summary_versions
+    (user_id INTEGER PRIMARY KEY, version INTEGER NOT NULL)'''
+
+BUMP_VERSION_SQL = '''INSERT INTO summary_versions (user_id, version) VALUES (?, 1)
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1'''
+
+
+def make_etag(summary):
+    """ETag forte derivada do conteúdo do resumo."""
+    payload = json.dumps(summary, sort_keys=True, ensure_ascii=False).encode()
+    return '"' + hashlib.blake2b(payload, digest_size=16).hexdigest() + '"'
+
+
+async def bump_summary_version(db, user_id):
+    """Marca os resumos do usuário como desatualizados (chamar antes do commit da escrita)."""
+    await db.execute(BUMP_VERSION_SQL, (user_id,))
+
+
+async def get_summary_version(db, user_id):
+    async with db.execute('SELECT version FROM summary_versions WHERE user_id = ?', (user_id,)) as cursor:
+        row = await cursor.fetchone()
+    return row[0] if row else 0
+
+
+class SummaryCache:
+    """Cache LRU de resumos diários prontos, por (user_id, data).
+
+    Cada entrada guarda a versão do usuário lida no banco antes do cálculo e
+    só é usada enquanto o banco tiver a mesma versão; assim, escritas feitas
+    por outro processo (ou concorrentes ao cálculo) nunca servem um resumo
+    antigo. As escritas do próprio processo também descartam as entradas do
+    usuário (write-through), liberando espaço mais cedo.
+    """
+
+    def __init__(self, maxsize=SUMMARY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._dates = defaultdict(set)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id, date, version):
+        """Retorna (etag, resumo) ou None se não houver entrada para ``version``."""
+        key = (user_id, date)
+        entry = self._data.get(key)
+        if entry is None or entry[2] != version:
+            if entry is not None:
+                del self._data[key]
+                self._forget(user_id, date)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[:2]
+
+    def set(self, user_id, date, summary, version):
+        """Guarda o resumo calculado a partir dos dados da versão ``version``."""
+        etag = make_etag(summary)
+        if self.maxsize <= 0:
+            return etag
+        key = (user_id, date)
+        self._data[key] = (etag, summary, version)
+        self._data.move_to_end(key)
+        self._dates[user_id].add(date)
+        while len(self._data) > self.maxsize:
+            (old_user, old_date), _ = self._data.popitem(last=False)
+            self._forget(old_user, old_date)
+            self.evictions += 1
+        return etag
+
+    def _forget(self, user_id, date):
+        dates = self._dates.get(user_id)
+        if dates is not None:
+            dates.discard(date)
+            if not dates:
+                del self._dates[user_id]
+
+    def invalidate(self, user_id, date=None):
+        """Descarta o resumo do dia informado ou, sem data, todos os do usuário."""
+        self.invalidations += 1
+        dates = [date] if date is not None else list(self._dates.get(user_id, ()))
+        for day in dates:
+            self._data.pop((user_id, day), None)
+            self._forget(user_id, day)
+
+    def clear(self):
+        self._data.clear()
+        self._dates.clear()
+
+    def stats(self):
+        return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'invalidations': self.invalidations}
+
+
+_summary_cache = SummaryCache()
+track_cache('summary', _summary_cache.stats)
+
+
+def get_summary_cache():
+    """Retorna o cache de resumos do processo."""
+    return _summary_cache
@@ -1,4 +1,3 @@
-import json
 from datetime import datetime
 
 translations = {
@@ -9,6 +8,7 @@ translations = {
         'enter_quantity': '📏 Digite a quantidade (gramas):',
         'confirm_meal': '✅ Confirmar: {quantity}g de *{food}* para *{meal_type}*?\nResponda "sim" ou "não".',
         'meal_registered': '🎉 Refeição registrada com sucesso!',
+        'meals_registered': '🎉 {count} alimento(s) registrado(s) com sucesso!',
         'meal_cancelled': '❌ Registro de refeição cancelado.',
         'no_meals': '😕 Nenhuma refeição registrada hoje.',
         'daily_summary': '📊 *Resumo Diário ({date})*\n\n',
@@ -51,32 +51,8 @@ translations = {
 }
 
 
-def load_food_data():
-    """Carrega os dados de alimentos do arquivo tabela_alimentos.json."""
-    try:
-        with open('tabela_alimentos.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        raise FileNotFoundError(
-            "Arquivo tabela_alimentos.json não encontrado.")
-    except json.JSONDecodeError:
-        raise ValueError("Erro ao decodificar tabela_alimentos.json.")
-
-
-def get_food_nutrients(food_id, quantity, food_data):
-    """Calcula nutrientes para um alimento e quantidade."""
-    for food in food_data:
-        if food['id'] == food_id:
-            factor = quantity / 100  # Ajusta para quantidade em gramas
-            return {
-                'description': food['description'],
-                'energy_kcal': float(food['energy_kcal']) * factor if food['energy_kcal'] != 'NA' else 0,
-                'protein_g': float(food['protein_g']) * factor if food['protein_g'] != 'NA' else 0,
-                'lipid_g': float(food['lipid_g']) * factor if food['lipid_g'] != 'NA' else 0,
-                'carbohydrate_g': float(food['carbohydrate_g']) * factor if food['carbohydrate_g'] != 'NA' else 0,
-                'fiber_g': float(food['fiber_g']) * factor if food['fiber_g'] != 'NA' else 0
-            }
-    return None
+SUMMARY_NUTRIENTS = ('energy_kcal', 'protein_g',
+                     'lipid_g', 'carbohydrate_g', 'fiber_g')
 
 
 def calculate_imc(weight, height):
@@ -1,17 +1,86 @@
+import asyncio
 import logging
+import signal
+from functools import partial
 from telegram import Update
 from aiohttp import web
+from . import metrics
+from .dedup import UpdateDeduplicator
+from .dispatcher import UpdateDispatcher
 
 logger = logging.getLogger(__name__)
 
 
-async def webhook_handler(request, application):
-    """Lida com requisições webhook recebidas do Telegram."""
+async def webhook_handler(request, application, dispatcher, dedup):
+    """Lida com requisições webhook recebidas do Telegram.
+
+    Só interpreta e enfileira a atualização, respondendo antes de processá-la;
+    com a fila cheia responde 503 e o Telegram reenvia mais tarde. Reentregas
+    de um update_id já aceito são confirmadas sem chegar aos handlers.
+    """
     try:
         update = Update.de_json(await request.json(), application.bot)
-        if update:
-            await application.process_update(update)
+        if update and not dedup.is_duplicate(update.update_id):
+            if not dispatcher.submit(update):
+                return web.Response(status=503, headers={'Retry-After': '1'})
+            dedup.add(update.update_id)
         return web.Response(status=200)
     except Exception as e:
         logger.error(f"Erro ao processar atualização do webhook: {e}")
         return web.Response(status=500)
+
+
+async def metrics_handler(request):
+    return web.Response(body=metrics.render().encode(), headers={'Content-Type': metrics.CONTENT_TYPE})
+
+
+def create_web_app(application, dispatcher, dedup, url_path):
+    """App aiohttp com o webhook do Telegram e o endpoint /metrics."""
+    web_app = web.Application()
+    web_app.router.add_post(url_path, partial(
+        webhook_handler, application=application, dispatcher=dispatcher, dedup=dedup))
+    web_app.router.add_get('/metrics', metrics_handler)
+    return web_app
+
+
+async def serve(application, listen, port, url_path, webhook_url):
+    """Roda o bot atrás do servidor aiohttp até receber SIGINT/SIGTERM.
+
+    Substitui ``Application.run_webhook`` para servir outras rotas (como
+    /metrics) na mesma porta; segue o mesmo ciclo de vida, incluindo
+    post_init e post_shutdown. As atualizações passam pelo UpdateDispatcher,
+    que é drenado antes de parar a aplicação.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    dispatcher = UpdateDispatcher(application.process_update)
+    metrics.BOT_PENDING_UPDATES.set_function(lambda: dispatcher.pending)
+    dedup = UpdateDeduplicator()
+    runner = web.AppRunner(create_web_app(application, dispatcher, dedup, url_path))
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await application.bot.set_webhook(webhook_url, allowed_updates=Update.ALL_TYPES)
+        await dedup.start()
+        await application.start()
+        dispatcher.start()
+        await runner.setup()
+        await web.TCPSite(runner, listen, port).start()
+        logger.info(f"Webhook server listening on {listen}:{port}{url_path}")
+        await stop.wait()
+    finally:
+        # Novas entregas recebem 503 enquanto as já aceitas terminam
+        await dispatcher.stop()
+        await runner.cleanup()
+        await dedup.stop()
+        if application.running:
+            await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
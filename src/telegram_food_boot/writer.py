@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from .config import WRITE_BATCH_SIZE, WRITE_BATCH_DELAY_MS, WRITE_QUEUE_SIZE
+from .shards import get_router
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitWriter:
+    """Agrupa escritas concorrentes em uma única transação (um fsync por lote).
+
+    Cada operação é uma função ``operation(db)`` assíncrona que não faz commit
+    e pode ser repetida com segurança (se o lote falhar, cada item é refeito
+    isoladamente). Quem envia recebe o resultado (ou a exceção) da própria operação somente
+    depois do commit do lote, o que garante leitura das próprias escritas.
+    """
+
+    def __init__(self, pool, max_batch=WRITE_BATCH_SIZE, max_delay_ms=WRITE_BATCH_DELAY_MS,
+                 queue_size=WRITE_QUEUE_SIZE):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._task = None
+        self.stats = {'batches': 0, 'items': 0, 'failed_items': 0}
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, operation):
+        """Enfileira uma operação e aguarda o commit do lote que a contém."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, future))
+        return await future
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._commit(batch)
+            except Exception as e:
+                logger.error(f"Group commit of {len(batch)} writes failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit(self, batch):
+        async with self.pool.writer() as db:
+            try:
+                await db.execute('BEGIN')
+                results = [await operation(db) for operation, _ in batch]
+                await db.commit()
+                outcomes = [(future, result, None)
+                            for (_, future), result in zip(batch, results)]
+            except Exception:
+                # Algum item falhou: desfaz o lote e repete cada item em sua
+                # própria transação para isolar o erro
+                if db.in_transaction:
+                    await db.rollback()
+                outcomes = [await self._commit_one(db, operation, future)
+                            for operation, future in batch]
+        self.stats['batches'] += 1
+        self.stats['items'] += len(batch)
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                self.stats['failed_items'] += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    async def _commit_one(self, db, operation, future):
+        try:
+            await db.execute('BEGIN')
+            result = await operation(db)
+            await db.commit()
+            return future, result, None
+        except Exception as e:
+            if db.in_transaction:
+                await db.rollback()
+            return future, None, e
+
+    async def stop(self):
+        """Aguarda as escritas pendentes e encerra a tarefa de fundo."""
+        if self._task is None:
+            return
+        if not self._task.done():
+            await self._queue.join()
+            self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+# Um escritor por pool: shards diferentes fazem commit em paralelo
+_writers = {}
+
+
+def get_writer(user_id=None):
+    """Retorna o escritor em lote do shard do usuário (sem user_id, o do banco global)."""
+    pool = get_router().pool_for(user_id)
+    writer = _writers.get(pool)
+    if writer is None:
+        writer = _writers[pool] = GroupCommitWriter(pool)
+    return writer
+
+
+async def close_writer():
+    """Descarrega e encerra os escritores em lote compartilhados."""
+    writers = list(_writers.values())
+    _writers.clear()
+    for writer in writers:
+        await writer.stop()
@@ -0,0 +1,17 @@
+import os
+import tempfile
+
+# A configuração é lida na importação dos módulos: os testes usam um diretório
+# temporário, um banco sem shards e a tabela de alimentos do repositório.
+_tmp = tempfile.mkdtemp(prefix='nutribot-tests-')
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.update(
+    SECRET_KEY='test-secret',
+    ALGORITHM='HS256',
+    DB_PATH=os.path.join(_tmp, 'nutribot.db'),
+    DB_SHARDS='0',
+    FOOD_TABLE_PATH=os.path.join(_root, 'tabela_alimentos.json'),
+    FOOD_SNAPSHOT_PATH=os.path.join(_tmp, 'tabela_alimentos.snapshot'),
+    FOOD_STORE_PATH=os.path.join(_tmp, 'tabela_alimentos.cols'),
+)
@@ -0,0 +1,81 @@
+import aiosqlite
+import numpy as np
+import pytest
+from src.telegram_food_boot import services
+from src.telegram_food_boot.aggregates import _rebuild, add_meal, get_daily_totals, pack, unpack, vec_add
+from src.telegram_food_boot.config import DB_PATH
+from src.telegram_food_boot.database import create_user, init_db, save_meal
+from src.telegram_food_boot.food_store import get_food_store
+from src.telegram_food_boot.nutrients import get_matrix
+from src.telegram_food_boot.shards import close_router
+from src.telegram_food_boot.writer import close_writer
+
+
+async def all_totals(user_id):
+    async with aiosqlite.connect(DB_PATH) as db:
+        async with db.execute('SELECT day FROM daily_totals WHERE user_id = ? ORDER BY day', (user_id,)) as cursor:
+            days = [row[0] for row in await cursor.fetchall()]
+        return {day: await get_daily_totals(db, user_id, day) for day in days}
+
+
+def test_vectors_of_another_food_table_are_rejected():
+    fields = len(get_matrix().fields)
+    with pytest.raises(ValueError, match='rebuild'):
+        unpack(pack(np.ones(fields - 1)))
+    with pytest.raises(ValueError, match='rebuild'):
+        vec_add(pack(np.ones(fields)), pack(np.ones(fields - 1)))
+
+
+@pytest.mark.asyncio
+async def test_init_db_rebuilds_totals_when_the_food_table_changes():
+    await init_db()
+    try:
+        user_id = await create_user('food-table-change', 'hash')
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.create_function('vec_add', 2, vec_add, deterministic=True)
+            await save_meal(user_id, 'lunch', 1, 100, db)
+            async with db.execute('SELECT day FROM daily_totals WHERE user_id = ?', (user_id,)) as cursor:
+                day = (await cursor.fetchone())[0]
+            expected = await get_daily_totals(db, user_id, day)
+            # Totais gravados com outra tabela de alimentos (outro número de nutrientes)
+            await db.execute('UPDATE daily_totals SET nutrients = ? WHERE user_id = ?', (pack([1.0, 2.0]), user_id))
+            await db.execute("UPDATE food_table_version SET version = 'old'")
+            await db.commit()
+
+        await init_db()
+        async with aiosqlite.connect(DB_PATH) as db:
+            assert await get_daily_totals(db, user_id, day) == expected
+    finally:
+        await close_router()
+
+
+@pytest.mark.asyncio
+async def test_incremental_totals_match_a_rebuild():
+    await init_db()
+    try:
+        user_id = await create_user('totals-rebuild', 'hash')
+        food_ids = get_food_store().ids[:3].tolist()
+        for i in range(6):
+            await services.record_meal(user_id, 'lunch', food_ids[i % 3], 50 + i)
+            await services.record_water(user_id, 200)
+        await services.record_meals(user_id, [('dinner', food_id, 80) for food_id in food_ids])
+        # Refeição de outro dia, gravada pelo mesmo UPSERT
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.create_function('vec_add', 2, vec_add, deterministic=True)
+            await db.execute('INSERT INTO meals (user_id, meal_type, food_id, quantity, timestamp) VALUES (?, ?, ?, ?, ?)',
+                             (user_id, 'snack', food_ids[0], 30, '2024-01-01 23:59:00'))
+            await add_meal(db, user_id, '2024-01-01', food_ids[0], 30)
+            await db.commit()
+
+        incremental = await all_totals(user_id)
+        await _rebuild(DB_PATH)
+        rebuilt = await all_totals(user_id)
+        assert list(rebuilt) == list(incremental) and len(rebuilt) == 2
+        for day, (meals, water, nutrients) in rebuilt.items():
+            assert (meals, water) == incremental[day][:2]
+            assert nutrients == pytest.approx(incremental[day][2])
+        assert rebuilt['2024-01-01'][:2] == (1, 0)
+        assert sum(meals for meals, _, _ in rebuilt.values()) == 10
+    finally:
+        await close_writer()
+        await close_router()
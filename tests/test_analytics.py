@@ -0,0 +1,49 @@
+import aiosqlite
+import pytest
+from src.telegram_food_boot import services
+from src.telegram_food_boot.config import DB_PATH
+from src.telegram_food_boot.database import create_user, init_db
+from src.telegram_food_boot.food_store import get_food_store
+from src.telegram_food_boot.shards import close_router
+
+# Domingo 07/01 e segunda 08/01; quarta 31/01 e quinta 01/02 (mesma semana)
+MEALS = ['2024-01-07 23:59:59', '2024-01-08 00:00:00', '2024-01-31 23:59:59', '2024-02-01 00:00:00']
+
+
+def summarize(stats):
+    return [(bucket['start'], bucket['days_logged'], bucket['meals'], bucket['water']['total'])
+            for bucket in stats['buckets']]
+
+
+@pytest.mark.asyncio
+async def test_stats_group_by_day_week_and_month():
+    await init_db()
+    try:
+        user_id = await create_user('stats-buckets', 'hash')
+        store = get_food_store()
+        food_id = int(store.ids[0])
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.executemany('INSERT INTO meals (user_id, meal_type, food_id, quantity, timestamp) VALUES (?, ?, ?, ?, ?)',
+                                 [(user_id, 'lunch', food_id, 100, timestamp) for timestamp in MEALS])
+            await db.executemany('INSERT INTO water (user_id, amount, date) VALUES (?, ?, ?)',
+                                 [(user_id, 250, '2024-01-07 23:59:59'), (user_id, 500, '2024-01-08 00:00:00')])
+            await db.commit()
+
+        stats = await services.get_stats(user_id, '2024-01-01', '2024-02-29', 'day')
+        assert summarize(stats) == [('2024-01-07', 1, 1, 250), ('2024-01-08', 1, 1, 500),
+                                    ('2024-01-31', 1, 1, 0), ('2024-02-01', 1, 1, 0)]
+        energy = 100 * store.value('energy_kcal', store.column(food_id))
+        assert stats['buckets'][0]['nutrients']['energy_kcal'] == pytest.approx(energy)
+
+        stats = await services.get_stats(user_id, '2024-01-01', '2024-02-29', 'week')
+        assert summarize(stats) == [('2024-01-01', 1, 1, 250), ('2024-01-08', 1, 1, 500), ('2024-01-29', 2, 2, 0)]
+
+        stats = await services.get_stats(user_id, '2024-01-01', '2024-02-29', 'month')
+        assert summarize(stats) == [('2024-01-01', 3, 3, 750), ('2024-02-01', 1, 1, 0)]
+        assert stats['buckets'][0]['nutrients']['energy_kcal'] == pytest.approx(3 * energy)
+
+        # O último dia do período é incluído inteiro; o seguinte, não
+        stats = await services.get_stats(user_id, '2024-01-08', '2024-01-31', 'day')
+        assert [bucket['start'] for bucket in stats['buckets']] == ['2024-01-08', '2024-01-31']
+    finally:
+        await close_router()
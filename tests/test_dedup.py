@@ -0,0 +1,25 @@
+from src.telegram_food_boot.dedup import UpdateDeduplicator
+
+
+def test_redelivered_update_is_duplicate():
+    dedup = UpdateDeduplicator(maxsize=10, ttl=60, persist=False)
+    assert not dedup.is_duplicate(1, now=0)
+    dedup.add(1, now=0)
+    assert dedup.is_duplicate(1, now=30)
+    assert not dedup.is_duplicate(2, now=30)
+
+
+def test_ids_leave_the_window_after_ttl():
+    dedup = UpdateDeduplicator(maxsize=10, ttl=60, persist=False)
+    dedup.add(1, now=0)
+    dedup.add(2, now=50)
+    assert not dedup.is_duplicate(1, now=61)
+    assert dedup.is_duplicate(2, now=61)
+
+
+def test_oldest_ids_are_evicted_beyond_maxsize():
+    dedup = UpdateDeduplicator(maxsize=2, ttl=60, persist=False)
+    for update_id in (1, 2, 3):
+        dedup.add(update_id, now=update_id)
+    assert not dedup.is_duplicate(1, now=4)
+    assert dedup.is_duplicate(2, now=4) and dedup.is_duplicate(3, now=4)
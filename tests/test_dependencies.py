@@ -0,0 +1,22 @@
+import asyncio
+import httpx
+import pytest
+from src.telegram_food_boot.api.auth import create_access_token
+from src.telegram_food_boot.api.main import app, startup_event, shutdown_event
+from src.telegram_food_boot.config import DB_POOL_SIZE
+from src.telegram_food_boot.database import create_user
+
+
+@pytest.mark.asyncio
+async def test_more_concurrent_requests_than_pool_readers():
+    # Sem shards, a rota lê do mesmo pool usado para identificar o usuário
+    await startup_event()
+    try:
+        user_id = await create_user('concurrent', 'hash')
+        headers = {'Authorization': f'Bearer {create_access_token("concurrent")}'}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test/api/v1') as client:
+            responses = await asyncio.wait_for(asyncio.gather(*(
+                client.get(f'/summary/{user_id}', headers=headers) for _ in range(2 * DB_POOL_SIZE + 1))), 10)
+        assert [response.status_code for response in responses] == [200] * (2 * DB_POOL_SIZE + 1)
+    finally:
+        await shutdown_event()
@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from src.telegram_food_boot.dispatcher import UpdateDispatcher
+
+
+def make_update(update_id, user_id):
+    return SimpleNamespace(update_id=update_id, effective_user=SimpleNamespace(id=user_id))
+
+
+@pytest.mark.asyncio
+async def test_updates_of_a_user_run_in_order_and_users_run_in_parallel():
+    running, processed = {}, []
+    peak = 0
+
+    async def process(update):
+        nonlocal peak
+        user_id = update.effective_user.id
+        assert not running.get(user_id), 'two updates of the same user at once'
+        running[user_id] = True
+        peak = max(peak, sum(running.values()))
+        await asyncio.sleep(0.01)
+        processed.append((user_id, update.update_id))
+        running[user_id] = False
+
+    dispatcher = UpdateDispatcher(process, maxsize=100, workers=4)
+    dispatcher.start()
+    for update_id in range(12):
+        assert dispatcher.submit(make_update(update_id, update_id % 3))
+    await dispatcher.stop(timeout=5)
+
+    for user_id in range(3):
+        assert [update_id for user, update_id in processed if user == user_id] == list(range(user_id, 12, 3))
+    assert peak == 3
+    assert dispatcher.stats()['processed'] == 12
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_and_failures_do_not_stop_workers():
+    async def process(update):
+        if update.update_id == 0:
+            raise RuntimeError('boom')
+
+    dispatcher = UpdateDispatcher(process, maxsize=2, workers=1)
+    assert dispatcher.submit(make_update(0, 1))
+    assert dispatcher.submit(make_update(1, 1))
+    assert not dispatcher.submit(make_update(2, 1))
+    dispatcher.start()
+    await dispatcher.stop(timeout=5)
+    stats = dispatcher.stats()
+    assert (stats['accepted'], stats['rejected'], stats['processed'], stats['failed']) == (2, 1, 1, 1)
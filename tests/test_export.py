@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+from src.telegram_food_boot import export, services
+from src.telegram_food_boot.api import routes
+from src.telegram_food_boot.config import DB_POOL_SIZE
+from src.telegram_food_boot.database import create_user, init_db
+from src.telegram_food_boot.shards import close_router
+from src.telegram_food_boot.writer import close_writer
+
+
+@pytest.mark.asyncio
+async def test_slow_exports_do_not_hold_pool_readers(monkeypatch):
+    monkeypatch.setattr(export, '_slots', asyncio.Semaphore(DB_POOL_SIZE + 1))
+    await init_db()
+    exports = []
+    try:
+        user_id = await create_user('export', 'hash')
+        # Clientes que leram só o cabeçalho e pararam
+        for _ in range(DB_POOL_SIZE + 1):
+            exports.append(await services.export_history(user_id, 'csv'))
+            assert (await anext(exports[-1])).startswith('timestamp,')
+        summary = await asyncio.wait_for(services.get_summary(user_id), 5)
+        assert summary['water'] == 0
+    finally:
+        for chunks in exports:
+            await chunks.aclose()
+        await close_writer()
+        await close_router()
+
+
+@pytest.mark.asyncio
+async def test_export_without_free_slot_is_rejected(monkeypatch):
+    monkeypatch.setattr(export, '_slots', asyncio.Semaphore(1))
+    monkeypatch.setattr(export, 'EXPORT_ACQUIRE_TIMEOUT', 0.05)
+    await init_db()
+    try:
+        user_id = await create_user('export-busy', 'hash')
+        held = await services.export_history(user_id, 'csv')
+        with pytest.raises(services.ServiceError) as error:
+            await services.export_history(user_id, 'csv')
+        assert error.value.status_code == 503
+        await held.aclose()
+        # A vaga volta quando a exportação termina
+        await (await services.export_history(user_id, 'csv')).aclose()
+    finally:
+        await close_writer()
+        await close_router()
+
+
+@pytest.mark.asyncio
+async def test_route_releases_export_when_client_disconnects(monkeypatch):
+    monkeypatch.setattr(export, '_slots', asyncio.Semaphore(1))
+    monkeypatch.setattr(export, 'EXPORT_ACQUIRE_TIMEOUT', 0.05)
+    await init_db()
+    try:
+        user_id = await create_user('export-disconnect', 'hash')
+        response = await routes.export_history(user_id, 'csv', user_id)
+
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            # O cliente sumiu antes de receber qualquer bloco
+            await asyncio.Event().wait()
+
+        await asyncio.wait_for(response({'type': 'http'}, receive, send), 5)
+        await (await services.export_history(user_id, 'csv')).aclose()
+    finally:
+        await close_writer()
+        await close_router()
@@ -0,0 +1,49 @@
+import json
+import os
+from src.telegram_food_boot.food_store import open_food_store
+
+
+def write_foods(path, energy):
+    foods = [
+        {'id': 1, 'description': 'Arroz, integral, cozido', 'category': 'Cereais', 'energy_kcal': energy, 'protein_g': 'Tr'},
+        {'id': 3, 'description': 'Feijão, carioca, cozido', 'category': 'Leguminosas', 'energy_kcal': 76, 'protein_g': 4.8},
+    ]
+    path.write_text(json.dumps(foods), encoding='utf-8')
+
+
+def test_reads_values_per_gram(tmp_path):
+    source = tmp_path / 'foods.json'
+    write_foods(source, 124)
+    store = open_food_store(str(tmp_path / 'foods.cols'), str(source))
+    assert store.fields == ('energy_kcal', 'protein_g')
+    assert store.column(2) == -1
+    assert store.description(store.column(3)) == 'Feijão, carioca, cozido'
+    assert store.value('energy_kcal', store.column(1)) == 1.24
+    assert store.value('protein_g', store.column(1)) == 0.0
+
+
+def test_rebuilds_when_source_is_touched(tmp_path):
+    source, path = tmp_path / 'foods.json', str(tmp_path / 'foods.cols')
+    write_foods(source, 124)
+    first = open_food_store(path, str(source))
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    store = open_food_store(path, str(source))
+    assert store.source_mtime_ns == stat.st_mtime_ns + 10 ** 9
+    assert store.version == first.version
+    # O store antigo continua utilizável por quem ainda o referencia
+    assert first.value('energy_kcal', first.column(1)) == 1.24
+
+
+def test_rebuilds_when_source_changes(tmp_path):
+    source, path = tmp_path / 'foods.json', str(tmp_path / 'foods.cols')
+    write_foods(source, 124)
+    first = open_food_store(path, str(source))
+    write_foods(source, 1300)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    store = open_food_store(path, str(source))
+    assert store.version != first.version
+    assert store.value('energy_kcal', store.column(1)) == 13.0
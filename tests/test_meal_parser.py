@@ -0,0 +1,52 @@
+from datetime import datetime
+from src.telegram_food_boot.meal_parser import parse_meal_message, resolve_food
+
+NOON = datetime(2024, 1, 1, 12)
+
+
+def descriptions(parsed):
+    return [(food['description'], grams) for food, grams in parsed.items]
+
+
+def test_count_without_unit_is_not_a_meal():
+    assert parse_meal_message('2 ovos', NOON) is None
+
+
+def test_count_without_unit_asks_for_quantity():
+    parsed = parse_meal_message('cafe: 1 pao', NOON)
+    assert parsed.meal_type == 'breakfast'
+    assert parsed.items == []
+    assert parsed.needs_unit == ['1 pao']
+
+
+def test_generic_names_use_default_foods():
+    assert descriptions(parse_meal_message('leite 200ml', NOON)) == [('Leite, de vaca, integral', 200)]
+    assert descriptions(parse_meal_message('frango 120g', NOON)) == [('Frango, peito, sem pele, grelhado', 120)]
+    assert descriptions(parse_meal_message('ovos 100g', NOON)) == [('Ovo, de galinha, inteiro, cozido/10minutos', 100)]
+
+
+def test_all_typed_words_must_match_before_preparation():
+    assert resolve_food('leite de coco')['description'] == 'Leite, de coco'
+    assert resolve_food('arroz integral')['description'] == 'Arroz, integral, cozido'
+    assert resolve_food('xyzzy') is None
+
+
+def test_multi_item_message():
+    parsed = parse_meal_message('almoço: arroz integral 150g, feijão 100g, frango grelhado 120g', NOON)
+    assert parsed.meal_type == 'lunch'
+    assert descriptions(parsed) == [
+        ('Arroz, integral, cozido', 150),
+        ('Feijão, carioca, cozido', 100),
+        ('Frango, peito, sem pele, grelhado', 120),
+    ]
+
+
+def test_mixed_units_and_unknown_parts():
+    parsed = parse_meal_message('jantar: frango 120 e arroz 1,5kg; xyzzy 30g', NOON)
+    assert descriptions(parsed) == [('Arroz, tipo 1, cozido', 1500)]
+    assert parsed.needs_unit == ['frango 120']
+    assert parsed.unresolved == ['xyzzy 30g']
+
+
+def test_plain_chat_is_ignored():
+    assert parse_meal_message('oi, tudo bem?', NOON) is None
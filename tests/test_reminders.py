@@ -0,0 +1,54 @@
+import asyncio
+from datetime import datetime
+import aiosqlite
+import pytest
+from src.telegram_food_boot.config import DB_PATH
+from src.telegram_food_boot.database import init_db
+from src.telegram_food_boot.migrations import MIGRATIONS, run_migrations
+from src.telegram_food_boot.reminders import ReminderScheduler
+from src.telegram_food_boot.shards import close_router
+
+
+@pytest.mark.asyncio
+async def test_migration_pads_reminder_times(tmp_path):
+    async with aiosqlite.connect(tmp_path / 'old.db') as db:
+        await run_migrations(db, [migration for migration in MIGRATIONS if migration[0] < 4])
+        await db.executemany('INSERT INTO reminders (user_id, type, time) VALUES (?, ?, ?)',
+                             [(1, 'meal_reminder', '9:00'), (2, 'meal_reminder', '12:5'), (3, 'water_reminder', 'manhã')])
+        await db.commit()
+        await run_migrations(db)
+        async with db.execute('SELECT time FROM reminders ORDER BY user_id') as cursor:
+            assert [row[0] for row in await cursor.fetchall()] == ['09:00', '12:05', 'manhã']
+
+
+@pytest.mark.asyncio
+async def test_tick_does_not_wait_for_delivery():
+    await init_db()
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.executemany('INSERT OR REPLACE INTO reminders (user_id, type, time) VALUES (?, ?, ?)',
+                                 [(user_id, 'water_reminder', '09:00') for user_id in range(1, 6)])
+            await db.commit()
+        loop = asyncio.get_running_loop()
+        queued = []
+
+        def send(user_id, text):
+            queued.append(loop.create_future())
+            return queued[-1]
+
+        scheduler = ReminderScheduler(send, batch_size=2)
+        # Nenhum envio é concluído: o tique só enfileira
+        await asyncio.wait_for(scheduler.tick(datetime(2024, 1, 1, 9, 0, 30)), 5)
+        assert len(queued) == 5 and scheduler.stats['queued'] == 5
+        queued[0].set_result(None)
+        queued[1].set_exception(RuntimeError('blocked'))
+        await asyncio.sleep(0)
+        assert (scheduler.stats['sent'], scheduler.stats['failed']) == (1, 1)
+
+        # Um atraso maior que o limite de recuperação pula os minutos intermediários
+        await scheduler.tick(datetime(2024, 1, 1, 9, 30))
+        assert scheduler.stats['skipped_minutes'] == 29
+        for future in queued[2:]:
+            future.cancel()
+    finally:
+        await close_router()
@@ -0,0 +1,26 @@
+from src.telegram_food_boot.search import fold, search_foods
+
+
+def descriptions(query, limit=10):
+    return [food['description'] for food in search_foods(query, limit)]
+
+
+def test_accents_and_case_are_ignored():
+    assert fold('Feijão') == 'feijao'
+    assert descriptions('FEIJÃO') == descriptions('feijao')
+
+
+def test_typo_falls_back_to_trigrams():
+    results = descriptions('fejao')
+    assert results and all(description.startswith('Feijão') for description in results)
+
+
+def test_prefix_of_every_word_must_match():
+    assert descriptions('arroz integ') == ['Arroz, integral, cru', 'Arroz, integral, cozido']
+    # Descrições que começam com o primeiro termo vêm antes das que só o contêm
+    assert all(description.startswith('Arroz') for description in descriptions('arroz', 3))
+
+
+def test_unknown_query_returns_nothing():
+    assert descriptions('xyzzy') == []
+    assert descriptions('  ') == []
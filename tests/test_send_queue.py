@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from telegram.error import BadRequest
+from src.telegram_food_boot.metrics import SEND_LATENCY, SEND_RESULTS
+from src.telegram_food_boot.send_queue import BROADCAST, INTERACTIVE, NOTIFICATION, SendQueue, TokenBucket
+
+UNLIMITED = 1e9
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=2, capacity=2, now=0)
+    bucket.consume(0)
+    bucket.consume(0)
+    assert bucket.wait_time(0) == pytest.approx(0.5)
+    assert bucket.wait_time(0.5) == 0
+    bucket.block(until=3)
+    assert bucket.wait_time(1) == pytest.approx(2)
+
+
+async def _send_times(queue, chat_ids):
+    loop = asyncio.get_running_loop()
+    times = []
+
+    async def send():
+        times.append(loop.time())
+
+    await asyncio.gather(*(queue.submit(chat_id, send) for chat_id in chat_ids))
+    await queue.stop()
+    return times
+
+
+@pytest.mark.asyncio
+async def test_global_rate_limits_sends():
+    queue = SendQueue(global_rate=20, chat_rate=UNLIMITED, chat_burst=UNLIMITED)
+    times = await _send_times(queue, range(6))
+    # Sem rajada global: 6 envios a 20/s ocupam pelo menos 5 intervalos de 50 ms
+    assert times[-1] - times[0] >= 5 / 20 * 0.9
+
+
+@pytest.mark.asyncio
+async def test_chat_rate_allows_burst_then_limits():
+    queue = SendQueue(global_rate=UNLIMITED, chat_rate=10, chat_burst=2)
+    times = await _send_times(queue, [1] * 4)
+    assert times[1] - times[0] < 0.05
+    assert times[3] - times[0] >= 2 / 10 * 0.9
+
+
+@pytest.mark.asyncio
+async def test_interactive_lane_goes_first():
+    queue = SendQueue(global_rate=UNLIMITED, chat_rate=UNLIMITED, chat_burst=UNLIMITED, concurrency=1)
+    started, release = asyncio.Event(), asyncio.Event()
+    order = []
+
+    async def blocker():
+        started.set()
+        await release.wait()
+
+    def record(name):
+        async def send():
+            order.append(name)
+        return send
+
+    first = queue.submit_nowait(0, blocker, BROADCAST)
+    await started.wait()
+    futures = [queue.submit_nowait(1, record('broadcast'), BROADCAST),
+               queue.submit_nowait(2, record('notification'), NOTIFICATION),
+               queue.submit_nowait(3, record('interactive'), INTERACTIVE)]
+    release.set()
+    await asyncio.gather(first, *futures)
+    await queue.stop()
+    assert order == ['interactive', 'notification', 'broadcast']
+
+
+@pytest.mark.asyncio
+async def test_results_and_latency_are_exported_per_lane():
+    queue = SendQueue(global_rate=UNLIMITED, chat_rate=UNLIMITED, chat_burst=UNLIMITED)
+    sent, failed = SEND_RESULTS.labels('notification', 'sent'), SEND_RESULTS.labels('notification', 'failed')
+    before = (sent.value, failed.value, SEND_LATENCY.labels('notification').count)
+
+    async def ok():
+        return 'ok'
+
+    async def bad():
+        raise BadRequest('chat not found')
+
+    assert await queue.submit(1, ok, NOTIFICATION) == 'ok'
+    with pytest.raises(BadRequest):
+        await queue.submit(2, bad, NOTIFICATION)
+    await queue.stop()
+    assert (sent.value, failed.value, SEND_LATENCY.labels('notification').count) == (
+        before[0] + 1, before[1] + 1, before[2] + 2)
+    assert queue.depth(NOTIFICATION) == 0
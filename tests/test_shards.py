@@ -0,0 +1,21 @@
+import aiosqlite
+import pytest
+from src.telegram_food_boot.migrations import run_migrations
+from src.telegram_food_boot.shards import ShardRouter
+
+
+@pytest.mark.asyncio
+async def test_verify_layout_rejects_a_different_shard_count(tmp_path):
+    global_path = str(tmp_path / 'global.db')
+    async with aiosqlite.connect(global_path) as db:
+        await run_migrations(db)
+    sharded = ShardRouter(global_path, [str(tmp_path / f'shard{n}.db') for n in range(2)])
+    unsharded = ShardRouter(global_path, [])
+    try:
+        await sharded.verify_layout()
+        await sharded.verify_layout()
+        with pytest.raises(RuntimeError, match='reshard 0'):
+            await unsharded.verify_layout()
+    finally:
+        await sharded.close()
+        await unsharded.close()
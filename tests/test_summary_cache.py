@@ -0,0 +1,36 @@
+import aiosqlite
+import pytest
+from src.telegram_food_boot import services
+from src.telegram_food_boot.config import DB_PATH
+from src.telegram_food_boot.database import create_user, init_db, save_water
+from src.telegram_food_boot.shards import close_router
+from src.telegram_food_boot.summary_cache import SummaryCache
+from src.telegram_food_boot.writer import close_writer
+
+
+@pytest.mark.asyncio
+async def test_write_from_another_process_invalidates_cached_summary():
+    await init_db()
+    try:
+        user_id = await create_user('summary-cache', 'hash')
+        etag, summary = await services.get_summary_entry(user_id)
+        assert await services.get_summary_entry(user_id) == (etag, summary)
+
+        # Outro processo (o bot, por exemplo) grava sem passar por este cache
+        async with aiosqlite.connect(DB_PATH) as db:
+            await save_water(user_id, 300, db)
+
+        new_etag, new_summary = await services.get_summary_entry(user_id)
+        assert new_etag != etag
+        assert new_summary['water'] == summary['water'] + 300
+    finally:
+        await close_writer()
+        await close_router()
+
+
+def test_stale_entry_is_dropped():
+    cache = SummaryCache(maxsize=10)
+    cache.set(1, '2024-01-01', {'water': 0}, version=3)
+    assert cache.get(1, '2024-01-01', 3) is not None
+    assert cache.get(1, '2024-01-01', 4) is None
+    assert cache.stats()['size'] == 0
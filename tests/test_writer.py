@@ -0,0 +1,33 @@
+import asyncio
+from functools import partial
+import pytest
+from src.telegram_food_boot.pool import ConnectionPool
+from src.telegram_food_boot.writer import GroupCommitWriter
+
+
+async def insert(value, db):
+    if value < 0:
+        raise ValueError('invalid value')
+    await db.execute('INSERT INTO items (value) VALUES (?)', (value,))
+    return value
+
+
+@pytest.mark.asyncio
+async def test_failed_write_does_not_roll_back_the_rest_of_its_batch(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'writer.db'), size=1)
+    async with pool.writer() as db:
+        await db.execute('CREATE TABLE items (value INTEGER)')
+        await db.commit()
+    writer = GroupCommitWriter(pool, max_batch=10, max_delay_ms=50)
+    try:
+        results = await asyncio.gather(*(writer.submit(partial(insert, value))
+                                         for value in (1, 2, -1, 3)), return_exceptions=True)
+        assert results[:2] == [1, 2] and results[3] == 3
+        assert isinstance(results[2], ValueError)
+        assert writer.stats == {'batches': 1, 'items': 4, 'failed_items': 1}
+        async with pool.reader() as db:
+            async with db.execute('SELECT value FROM items ORDER BY value') as cursor:
+                assert [row[0] for row in await cursor.fetchall()] == [1, 2, 3]
+    finally:
+        await writer.stop()
+        await pool.close()